@@ -0,0 +1,140 @@
+# agregacao_prf.py
+# Agregados incrementais: os scripts alimentam Agregados bloco a bloco (modo
+# streaming) ou com a base inteira de uma vez (modo em memória) e obtêm
+# exatamente os mesmos resultados. Somas e contagens de colunas inteiras são
+# exatas em int64 e as amostras de reservatório não dependem do tamanho do
+# bloco, só da ordem das linhas.
+
+import numpy as np
+import pandas as pd
+
+
+class Agregados:
+    def __init__(self, grupos=None, momentos=None, amostras=None, semente=42):
+        # grupos:   {nome: (chaves, coluna)} -> n, soma e soma dos quadrados de
+        #           `coluna` por combinação de chaves (coluna=None só conta linhas)
+        # momentos: colunas inteiras para correlação (n, Σx, Σxxᵀ exatos em int64)
+        # amostras: {nome: (colunas, tamanho)} -> amostra aleatória uniforme;
+        #           linhas com nulo nessas colunas não entram na amostra
+        self.grupos = grupos or {}
+        self.momentos = list(momentos or [])
+        self.amostras = amostras or {}
+        self.linhas = 0
+
+        self._grupos = {nome: None for nome in self.grupos}
+        self._n_momentos = 0
+        self._soma = np.zeros(len(self.momentos), dtype=np.int64)
+        self._produtos = np.zeros((len(self.momentos),) * 2, dtype=np.int64)
+        self._geradores = {nome: np.random.default_rng(semente) for nome in self.amostras}
+        self._reservatorios = {nome: None for nome in self.amostras}
+
+    # === Atualização ===
+    def atualizar(self, df):
+        for nome, (chaves, coluna) in self.grupos.items():
+            self._grupos[nome] = self._acumular_grupo(self._grupos[nome], df, chaves, coluna)
+
+        if self.momentos:
+            valores = df[self.momentos].dropna().to_numpy(dtype=np.int64)
+            self._n_momentos += len(valores)
+            self._soma += valores.sum(axis=0)
+            self._produtos += valores.T @ valores
+
+        for nome, (colunas, tamanho) in self.amostras.items():
+            self._acumular_amostra(nome, df, colunas, tamanho)
+
+        self.linhas += len(df)
+
+    @staticmethod
+    def _acumular_grupo(acumulado, df, chaves, coluna):
+        agrupado = df.groupby(chaves, observed=True)
+        if coluna is None:
+            parcial = agrupado.size().to_frame("n")
+        else:
+            valores = df[coluna]
+            inteiro = pd.api.types.is_integer_dtype(valores.dtype)
+            quadrados = valores.astype("int64" if inteiro else "float64") ** 2
+            parcial = pd.DataFrame({
+                "n": agrupado[coluna].count(),
+                "soma": agrupado[coluna].sum().astype("int64" if inteiro else "float64"),
+                "soma_quadrados": quadrados.groupby([df[c] for c in chaves], observed=True).sum(),
+            })
+        if len(chaves) == 1:
+            parcial.index = parcial.index.astype(object)   # categorias diferentes entre blocos
+        if acumulado is None:
+            return parcial
+        return pd.concat([acumulado, parcial]).groupby(level=list(range(len(chaves)))).sum()
+
+    def _acumular_amostra(self, nome, df, colunas, tamanho):
+        # Reservatório por chaves aleatórias: cada linha recebe uma chave
+        # uniforme (geradas na ordem das linhas) e ficam as `tamanho` menores.
+        chaves = self._geradores[nome].random(len(df))
+        posicoes = np.arange(self.linhas, self.linhas + len(df))
+        bloco = df[colunas].assign(_chave=chaves, _linha=posicoes).dropna(subset=colunas)
+
+        atual = self._reservatorios[nome]
+        candidatos = bloco if atual is None else pd.concat([atual, bloco], ignore_index=True)
+        if len(candidatos) > tamanho:
+            menores = np.argpartition(candidatos["_chave"].to_numpy(), tamanho - 1)[:tamanho]
+            candidatos = candidatos.iloc[menores]
+        self._reservatorios[nome] = candidatos.reset_index(drop=True)
+
+    # === Resultados ===
+    def tabela(self, nome):
+        # n, soma e soma_quadrados por grupo
+        return self._grupos[nome]
+
+    def soma(self, nome):
+        chaves, coluna = self.grupos[nome]
+        return self._grupos[nome]["soma"].rename(coluna)
+
+    def contagem(self, nome):
+        # Equivalente ao value_counts() (ordem decrescente)
+        return self._grupos[nome]["n"].rename("count").sort_values(ascending=False, kind="stable")
+
+    def media_variancia(self, nome):
+        tabela = self._grupos[nome]
+        media = tabela["soma"] / tabela["n"]
+        variancia = (tabela["soma_quadrados"] - tabela["n"] * media ** 2) / (tabela["n"] - 1)
+        return pd.DataFrame({"n": tabela["n"], "media": media, "variancia": variancia})
+
+    def correlacao(self):
+        n = self._n_momentos
+        media = self._soma / n
+        covariancia = (self._produtos - n * np.outer(media, media)) / (n - 1)
+        desvio = np.sqrt(np.diag(covariancia))
+        return pd.DataFrame(covariancia / np.outer(desvio, desvio), index=self.momentos, columns=self.momentos)
+
+    def amostra(self, nome):
+        colunas, _ = self.amostras[nome]
+        reservatorio = self._reservatorios[nome]
+        if reservatorio is None:
+            return pd.DataFrame(columns=colunas)
+        return reservatorio.sort_values("_linha")[colunas].reset_index(drop=True)
+
+
+# === Estatísticas a partir de contagens ===
+def percentil_contagens(valores, contagens, q):
+    # Igual a np.percentile(np.repeat(valores, contagens), q) sem expandir
+    ordem = np.argsort(valores)
+    valores, contagens = np.asarray(valores, dtype=np.float64)[ordem], np.asarray(contagens)[ordem]
+    acumulado = np.cumsum(contagens)
+    posicao = q / 100 * (acumulado[-1] - 1)
+    abaixo, acima = np.floor(posicao), np.ceil(posicao)
+    v_abaixo = valores[np.searchsorted(acumulado, abaixo, side="right")]
+    v_acima = valores[np.searchsorted(acumulado, acima, side="right")]
+    return v_abaixo + (v_acima - v_abaixo) * (posicao - abaixo)
+
+
+def resumo_boxplot(valores, contagens, rotulo, whis=1.5):
+    # Estatísticas no formato de matplotlib.cbook.boxplot_stats (para ax.bxp)
+    valores = np.asarray(valores, dtype=np.float64)
+    contagens = np.asarray(contagens)
+    q1, mediana, q3 = (percentil_contagens(valores, contagens, q) for q in (25, 50, 75))
+    iqr = q3 - q1
+    dentro = (valores >= q1 - whis * iqr) & (valores <= q3 + whis * iqr) & (contagens > 0)
+    return {
+        "label": rotulo, "med": mediana, "q1": q1, "q3": q3,
+        "whislo": valores[dentro].min(), "whishi": valores[dentro].max(),
+        "fliers": np.sort(valores[~dentro & (contagens > 0)]),
+        "mean": np.average(valores, weights=contagens),
+    }
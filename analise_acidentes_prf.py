@@ -1,73 +1,134 @@
+import argparse
+
 import pandas as pd
-import os
-import numpy as np
 import matplotlib.pyplot as plt
-import seaborn as sns
 import plotly.express as px
 
 import plotly.io as pio
 pio.renderers.default = 'browser'  # força abrir no navegador
 
+from cubo_prf import carregar_cubo
+from ingestao_prf import LINHAS_POR_BLOCO, TAMANHO_BLOCO_CSV, carregar_dados, iterar_blocos
+from densidade_prf import CacheDensidade, densidade, plotar_densidade
+from indice_espacial_prf import GradeHotspots, IndiceEspacial, haversine_km
+from trechos_prf import ARQUIVO_TRECHOS, JANELA_KM, PASSO_KM, ranking, rotulo_trecho, trechos_atualizados
+
 # === CONFIGURAÇÃO ===
-# Caminho onde estão os arquivos .csv (todos os anos)
-caminho = "dados"
+parser = argparse.ArgumentParser(description="Análise exploratória dos acidentes da PRF")
+parser.add_argument("--streaming", action="store_true",
+                    help="processa a base em blocos, sem carregá-la inteira na memória")
+parser.add_argument("--linhas-por-bloco", type=int, default=LINHAS_POR_BLOCO)
+parser.add_argument("--mapa-por-gravidade", action="store_true",
+                    help="mapa de calor ponderado pela gravidade em vez da contagem de acidentes")
+parser.add_argument("--sem-exibir", action="store_true",
+                    help="monta os gráficos sem abrir janelas/navegador (execução sem tela, benchmarks)")
+parser.add_argument("--recalcular-trechos", action="store_true",
+                    help="refaz os trechos críticos mesmo que o CSV salvo esteja atualizado")
+args = parser.parse_args()
+
+# Colunas lidas linha a linha (só o mapa de hotspots precisa delas); rankings
+# e séries saem do cubo de agregados
+colunas = ["gravidade", "latitude", "longitude"]
 
 # === 1. CARREGAR DADOS DE TODOS OS ANOS ===
-arquivos = [arq for arq in os.listdir(caminho) if arq.endswith(".csv") and "Radares" not in arq]
-todos_anos = []
+# === 2. LIMPEZA DE DADOS ===
+# A leitura e a limpeza de cada ano são feitas uma única vez por ingestao_prf,
+# e o cubo (cubo_prf) é montado uma vez por ano a partir do cache. No modo
+# streaming a base é percorrida em blocos (também na conversão e na montagem
+# do cubo); no modo em memória ela é um único bloco.
+if args.streaming:
+    cubo = carregar_cubo(processos=1, tamanho_bloco=TAMANHO_BLOCO_CSV, linhas_por_bloco=args.linhas_por_bloco)
 
-for arquivo in arquivos:
-    ano = arquivo[-8:-4]
-    df = pd.read_csv(os.path.join(caminho, arquivo), sep=';', encoding='latin1', low_memory=False)
-    df["ano"] = int(ano)
-    todos_anos.append(df)
+    def blocos():
+        return iterar_blocos(colunas, args.linhas_por_bloco)
+else:
+    cubo = carregar_cubo()
+    df_todos = carregar_dados(colunas)
 
-df_todos = pd.concat(todos_anos, ignore_index=True)
-print(f"Total de registros: {df_todos.shape[0]}")
+    def blocos():
+        return [df_todos]
 
-# === 2. LIMPEZA DE DADOS ===
-df_todos["mortos"] = pd.to_numeric(df_todos["mortos"], errors="coerce").fillna(0).astype(int)
-df_todos["feridos_graves"] = pd.to_numeric(df_todos["feridos_graves"], errors="coerce").fillna(0).astype(int)
-df_todos["gravidade"] = df_todos["mortos"] + df_todos["feridos_graves"]
-df_todos["br"] = pd.to_numeric(df_todos["br"], errors="coerce")
-df_todos["km"] = df_todos["km"].astype(str).str.replace(",", ".", regex=False).replace("(null)", np.nan).astype(float)
-df_todos["latitude"] = df_todos["latitude"].astype(str).str.replace(",", ".").astype(float)
-df_todos["longitude"] = df_todos["longitude"].astype(str).str.replace(",", ".").astype(float)
+if args.streaming:
+    grade_hotspots = GradeHotspots(celula_km=1.0, min_acidentes=20)
+    for bloco in blocos():
+        grade_hotspots.adicionar(bloco["latitude"].to_numpy(dtype=float), bloco["longitude"].to_numpy(dtype=float),
+                                 bloco["gravidade"].to_numpy(dtype=float))
+print(f"Total de registros: {cubo.total()['acidentes']}")
 
 # === 3. ANÁLISES EXPLORATÓRIAS ===
 print("\nTop 10 Rodovias mais perigosas:")
-print(df_todos.groupby("br")["gravidade"].sum().sort_values(ascending=False).head(10))
+print(cubo.top("br", "gravidade", 10))
 
 print("\nTop 10 Municípios mais perigosos:")
-print(df_todos.groupby("municipio")["gravidade"].sum().sort_values(ascending=False).head(10))
+print(cubo.top("municipio", "gravidade", 10))
 
 print("\nTop 10 Tipos de Acidente:")
-print(df_todos["tipo_acidente"].value_counts().head(10))
+print(cubo.top("tipo_acidente", "acidentes", 10))
 
 print("\nTop 10 Causas de Acidente:")
-print(df_todos["causa_acidente"].value_counts().head(10))
+print(cubo.top("causa_acidente", "acidentes", 10))
 
 # === 4. GRÁFICO DE LINHA - GRAVIDADE POR ANO ===
-acidentes_por_ano = df_todos.groupby("ano")["gravidade"].sum().reset_index()
+acidentes_por_ano = cubo.serie("ano", "gravidade").reset_index()
 
 fig = px.line(acidentes_por_ano, x="ano", y="gravidade",
               title="Gravidade dos Acidentes por Ano (2007–2023)",
               labels={"gravidade": "Mortos + Feridos Graves", "ano": "Ano"})
-fig.show()
+if not args.sem_exibir:
+    fig.show()
 
 # === 5. MAPA DE CALOR DOS ACIDENTES ===
-df_geo = df_todos.dropna(subset=["latitude", "longitude"])
+# KDE em grade: soma das grades anuais em cache (cache/densidade), suavizada
+# por FFT com a mesma largura de banda relativa do kdeplot (bw_adjust=0.3)
+contagens, gravidade = CacheDensidade().somar()
+densidade_mapa = densidade(contagens, gravidade if args.mapa_por_gravidade else None, ajuste=0.3)
 
 plt.figure(figsize=(10, 6))
-sns.kdeplot(
-    x=df_geo["longitude"],
-    y=df_geo["latitude"],
-    fill=True,
-    cmap="Reds",
-    bw_adjust=0.3,
-    alpha=0.5
-)
+plotar_densidade(plt.gca(), densidade_mapa, cmap="Reds", alpha=0.5)
 plt.title("Mapa de Calor dos Acidentes no Brasil (2007–2023)")
 plt.xlabel("Longitude")
 plt.ylabel("Latitude")
-plt.show()
+if not args.sem_exibir:
+    plt.show()
+
+# === 6. HOTSPOTS (AGRUPAMENTO POR DENSIDADE) ===
+# Índice espacial sobre todos os acidentes geolocalizados: células de 1 km com
+# pelo menos 20 acidentes, unidas às vizinhas, formam um hotspot.
+# No modo streaming a grade foi acumulada bloco a bloco; o raio de cada
+# hotspot e a busca em 5 km pedem uma segunda passada pelos blocos.
+if args.streaming:
+    grade_hotspots.fechar()
+    for bloco in blocos():
+        grade_hotspots.medir_raio(bloco["latitude"].to_numpy(dtype=float), bloco["longitude"].to_numpy(dtype=float))
+    hotspots = grade_hotspots.resultado(top=50)
+else:
+    indice_espacial = IndiceEspacial(df_todos.dropna(subset=["latitude", "longitude"]))
+    hotspots = indice_espacial.hotspots(celula_km=1.0, min_acidentes=20, top=50)
+
+print("\nTop 10 Hotspots (2007–2023):")
+print(hotspots.head(10).round({"latitude": 4, "longitude": 4, "raio_km": 2}).to_string())
+
+# Acidentes graves num raio de 5 km do principal hotspot
+if len(hotspots):
+    principal = hotspots.iloc[0]
+    if args.streaming:
+        graves = 0
+        for bloco in blocos():
+            distancia = haversine_km(principal["latitude"], principal["longitude"],
+                                     bloco["latitude"].to_numpy(dtype=float), bloco["longitude"].to_numpy(dtype=float))
+            graves += int(((distancia <= 5) & (bloco["gravidade"] >= 2).to_numpy()).sum())
+    else:
+        proximos = indice_espacial.raio(principal["latitude"], principal["longitude"], 5)
+        graves = (proximos["gravidade"] >= 2).sum()
+    print(f"\nAcidentes com gravidade >= 2 a até 5 km do principal hotspot: {graves}")
+
+# === 7. TRECHOS CRÍTICOS (BR + KM) ===
+# Janelas de 1 km a cada 100 m ao longo de cada BR, no país e em cada ano;
+# o arquivo gerado é lido pelo dashboard e pelos relatórios. A passada pela
+# base só é refeita quando algum ano mudou (ou com --recalcular-trechos).
+trechos, recalculados = trechos_atualizados(JANELA_KM, PASSO_KM, linhas_por_bloco=args.linhas_por_bloco,
+                                            recalcular=args.recalcular_trechos)
+situacao = "salvos em" if recalculados else "reaproveitados de"
+print(f"\nTop 10 Trechos mais graves (2007–2023), {situacao} '{ARQUIVO_TRECHOS}':")
+for linha in ranking(trechos).itertuples():
+    print(f"{rotulo_trecho(linha)}: {linha.acidentes} acidentes, gravidade {linha.gravidade}")
@@ -1,221 +1,418 @@
+import argparse
 import pandas as pd
 import numpy as np
 import os
-import seaborn as sns
-import matplotlib.pyplot as plt
 from scipy import stats
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
+from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import classification_report, confusion_matrix
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier
 
-import matplotlib
-matplotlib.use('Agg')
+from agregacao_prf import Agregados, resumo_boxplot
+from artefatos_prf import (caminho_artefato, carregar_artefato, carregar_textos, exportar_csv,
+                           gravar_artefato, iterar_artefato, salvar_textos)
+from features_prf import CATEGORICAS_MODELO, bytes_matriz, modelo_histograma, modelo_linear_hash
+from graficos_prf import (boxplot_gravidade_fds, correlacao_heatmap, dispersao_feridos_mortos,
+                          histograma_gravidade, importancia_features_rf, pizza_mortos, renderizar,
+                          serie_temporal_gravidade)
+from ingestao_prf import LINHAS_POR_BLOCO, atualizar_cache, iterar_tabelas, numero_processos
+from instrumentacao_prf import ARQUIVO_DESEMPENHO, Instrumentacao
+from modelos_prf import salvar_modelos
+from testes_prf import CORRECOES, REAMOSTRAS, comparar_lados
+from treino_prf import (MAX_LINHAS_TREINO, MODOS_BUSCA, Dobras, buscar, curva_subamostra, custo_subamostra,
+                        descrever_busca, subamostra_estratificada, tabela_tempos, validar)
+
+# Cada etapa grava seus resultados em artefatos/ e pode ser executada sozinha
+# (ex.: --etapas modelagem refaz só o ML sobre a base limpa já gravada)
+ETAPAS = ["limpeza", "estatistica", "modelagem"]
+BASE_LIMPA = "base_limpa"
+
+parser = argparse.ArgumentParser(description="Análise estatística e modelagem dos acidentes da PRF")
+parser.add_argument("--etapas", nargs="+", choices=ETAPAS, default=ETAPAS,
+                    help="etapas a executar (padrão: todas)")
+parser.add_argument("--exportar-csv", action="store_true",
+                    help="exporta também a base limpa como df_limpo.csv")
+parser.add_argument("--streaming", action="store_true",
+                    help="limpeza e estatísticas em blocos, sem carregar a base inteira na memória")
+parser.add_argument("--linhas-por-bloco", type=int, default=LINHAS_POR_BLOCO)
+parser.add_argument("--busca", choices=MODOS_BUSCA, default="halving",
+                    help="busca de hiperparâmetros: grade exaustiva, halving sucessivo ou limitada por tempo")
+parser.add_argument("--orcamento-busca", type=float, default=60,
+                    help="segundos para a busca no modo 'tempo'")
+parser.add_argument("--max-linhas-treino", type=int, default=MAX_LINHAS_TREINO,
+                    help="acima disso o treino usa uma subamostra estratificada")
+parser.add_argument("--sem-custo-subamostra", action="store_true",
+                    help="não ajusta o melhor modelo na base de treino inteira para medir o custo da subamostra")
+parser.add_argument("--reamostras", type=int, default=REAMOSTRAS,
+                    help="reamostras bootstrap dos testes por UF × ano e por BR")
+parser.add_argument("--correcao", choices=CORRECOES, default="bh",
+                    help="correção para múltiplos testes nos testes por grupo (padrão: Benjamini-Hochberg)")
+parser.add_argument("--perfil", nargs="+", metavar="ETAPA",
+                    help="etapas a perfilar por amostragem (ex.: modelagem/busca ou graficos); padrão: PRF_PERFIL")
+args = parser.parse_args()
+
+# Tempo, CPU, pico de memória e linhas de cada etapa, gravados em desempenho.json
+inst = Instrumentacao(args.perfil)
 
 # Cria pasta para salvar imagens
 output_dir = "resultados"
 os.makedirs(output_dir, exist_ok=True)
 
-plt.rcParams['font.family'] = 'DejaVu Sans'
-sns.set(style="whitegrid", palette="Set2")
-plt.rcParams["axes.titlesize"] = 14
-plt.rcParams["axes.labelsize"] = 12
 
-# === Captura de texto para relatório ===
-relatorio_texto = {}
+def salvar_graficos(graficos):
+    # Cada gráfico é desenhado em paralelo e só se os seus dados mudaram;
+    # o tempo de cada um é medido no processo que o desenhou
+    medidas = {}
+    with inst.etapa("graficos"):
+        situacoes = renderizar(graficos, output_dir, medidas=medidas)
+        for arquivo, medida in medidas.items():
+            inst.registrar(arquivo, medida)
+    for arquivo, situacao in sorted(situacoes.items()):
+        print(f"🖼️ {arquivo}: {situacao}")
 
-# === Parte 1: Coleta, Limpeza e Pré-processamento ===
-caminho = "dados"
-arquivos = [arq for arq in os.listdir(caminho) if arq.endswith(".csv") and "Radares" not in arq]
-df_lista = []
-
-for arq in arquivos:
-    ano = arq[-8:-4]
-    df_temp = pd.read_csv(os.path.join(caminho, arq), sep=';', encoding='latin1', low_memory=False)
-    df_temp["ano"] = int(ano)
-    df_lista.append(df_temp)
-
-df = pd.concat(df_lista, ignore_index=True)
-df.replace("(null)", np.nan, inplace=True)
-
-if 'condicao_metereologica' in df.columns:
-    df["condicao_metereologica"] = df["condicao_metereologica"].fillna("Ignorado")
-
-for col in ["latitude", "longitude"]:
-    df[col] = df[col].astype(str).str.replace(",", ".").astype(float)
 
-for col in ["mortos", "feridos_graves"]:
-    df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(int)
-
-df["gravidade"] = df["mortos"] + df["feridos_graves"]
-
-if 'data_inversa' in df.columns:
-    df['data_inversa'] = pd.to_datetime(df['data_inversa'], errors='coerce')
-    df["mes"] = df["data_inversa"].dt.month
-    df["dia_semana"] = df["data_inversa"].dt.day_name()
+# === Parte 1: Coleta, Limpeza e Pré-processamento ===
+def etapa_limpeza():
+    # Leitura e limpeza (tokens de nulo, vírgula decimal, datas, gravidade,
+    # mês, dia da semana e clima ausente como "Ignorado") vêm prontas do cache
+    # Parquet, gerado pela etapa compartilhada de limpeza_prf. A base limpa
+    # unificada é gravada bloco a bloco como artefato Arrow, com os tipos
+    # preservados; o CSV é só uma exportação opcional.
+    relatorio_texto = {}
+    if not args.streaming:
+        with inst.etapa("cache"):
+            atualizar_cache()   # anos pendentes convertidos em paralelo
+    with inst.etapa("base_limpa") as medida:
+        linhas = gravar_artefato(BASE_LIMPA, iterar_tabelas(linhas_por_bloco=args.linhas_por_bloco))
+        medida["linhas"] = linhas
+    relatorio_texto["limpeza"] = f"\u2705 Base limpa salva em '{caminho_artefato(BASE_LIMPA)}' ({linhas} linhas)"
+    if args.exportar_csv:
+        with inst.etapa("exportar_csv", linhas=linhas):
+            exportar_csv(BASE_LIMPA, "df_limpo.csv")
+        relatorio_texto["limpeza"] += "\n\u2705 Dataset limpo exportado como 'df_limpo.csv'"
+    print(relatorio_texto["limpeza"])
+    return relatorio_texto
 
-# Exporta base limpa
-df.to_csv("df_limpo.csv", index=False)
-relatorio_texto["limpeza"] = "\u2705 Dataset limpo salvo como 'df_limpo.csv'"
-print(relatorio_texto["limpeza"])
 
 # === Parte 2: Análise Estatística e Visualização ===
-relatorio_texto["normalidade"] = "\U0001F9EA Teste de Normalidade:\n"
-for col in ["mortos", "feridos_graves", "gravidade"]:
-    stat, p = stats.shapiro(df[col].sample(n=500, random_state=42))
-    resultado = "Não normal" if p < 0.05 else "Normal"
-    relatorio_texto["normalidade"] += f"{col}: stat={stat:.4f}, p={p:.4f} → {resultado}\n"
-print("\n" + relatorio_texto["normalidade"])
-
-corr = df[["mortos", "feridos_graves", "gravidade"]].corr()
-sns.heatmap(corr, annot=True, cmap="Reds", fmt=".2f")
-plt.title("Mapa de Calor")
-plt.tight_layout()
-plt.savefig(os.path.join(output_dir, "correlacao_heatmap.png"), dpi=300)
-plt.clf()
-
-df["fim_de_semana"] = df["dia_semana"].isin(["Saturday", "Sunday"])
-t_stat, p_valor = stats.ttest_ind(
-    df[df["fim_de_semana"]]["mortos"],
-    df[~df["fim_de_semana"]]["mortos"],
-    equal_var=False
-)
-relatorio_texto["ttest"] = f"\U0001F4CA Teste t:\nT={t_stat:.4f}, p={p_valor:.4f}"
-print("\n" + relatorio_texto["ttest"])
-
-sns.histplot(df["gravidade"], bins=20, kde=True, color="purple")
-plt.title("Distribuição da Gravidade")
-plt.tight_layout()
-plt.savefig(os.path.join(output_dir, "histograma_gravidade.png"), dpi=300)
-plt.clf()
-
-df["tipo_dia"] = df["fim_de_semana"].map({True: "Fim de Semana", False: "Dia Útil"})
-sns.boxplot(data=df, x="tipo_dia", y="gravidade", color="#4A90E2")
-plt.title("Gravidade por Tipo de Dia")
-plt.ylim(0, 30)
-plt.tight_layout()
-plt.savefig(os.path.join(output_dir, "boxplot_gravidade_fds.png"), dpi=300)
-plt.clf()
-
-sns.scatterplot(x="feridos_graves", y="mortos", data=df, alpha=0.5)
-plt.title("Feridos Graves vs Mortos")
-plt.tight_layout()
-plt.savefig(os.path.join(output_dir, "dispersao_feridos_mortos.png"), dpi=300)
-plt.clf()
-
-df_mensal = df.groupby(["ano", "mes"])["gravidade"].sum().reset_index()
-df_mensal["data"] = pd.to_datetime(df_mensal.rename(columns={"ano": "year", "mes": "month"}).assign(day=1)[["year", "month", "day"]])
-plt.plot(df_mensal["data"], df_mensal["gravidade"], marker='o', color='green')
-plt.title("Gravidade Mensal")
-plt.tight_layout()
-plt.savefig(os.path.join(output_dir, "serie_temporal_gravidade.png"), dpi=300)
-plt.clf()
-
-mortos = df["mortos"].gt(0).sum()
-sem_mortos = df["mortos"].eq(0).sum()
-plt.pie([mortos, sem_mortos], labels=["Com Mortos", "Sem Mortos"],
-        colors=["red", "lightgray"], autopct='%1.1f%%', startangle=90)
-plt.title("Acidentes com Mortes")
-plt.tight_layout()
-plt.savefig(os.path.join(output_dir, "pizza_mortos.png"), dpi=300)
-plt.clf()
+def etapa_estatistica():
+    # As estatísticas saem de agregados acumulados bloco a bloco sobre a base
+    # limpa; no modo em memória ela é um único bloco
+    relatorio_texto = {}
+    colunas = ["uf", "br", "ano", "mes", "dia_semana", "mortos", "feridos_graves", "gravidade"]
+    if args.streaming:
+        blocos = iterar_artefato(BASE_LIMPA, colunas, args.linhas_por_bloco)
+    else:
+        with inst.etapa("carregamento") as medida:
+            blocos = [carregar_artefato(BASE_LIMPA, colunas)]
+            medida["linhas"] = len(blocos[0])
+
+    agregados = Agregados(
+        grupos={
+            "mortos_tipo_dia": (["tipo_dia"], "mortos"),
+            "gravidade": (["gravidade"], None),
+            "tipo_dia": (["tipo_dia", "gravidade"], None),
+            "feridos_mortos": (["feridos_graves", "mortos"], None),
+            "mensal": (["ano", "mes"], "gravidade"),
+            # Distribuição dos mortos por tipo de dia em cada grupo (testes por grupo)
+            "mortos_uf_ano": (["uf", "ano", "tipo_dia", "mortos"], None),
+            "mortos_br": (["br", "tipo_dia", "mortos"], None),
+        },
+        momentos=["mortos", "feridos_graves", "gravidade"],
+        amostras={"normalidade": (["mortos", "feridos_graves", "gravidade"], 500)},
+    )
+    # No modo streaming a leitura de cada bloco entra no tempo da agregação
+    with inst.etapa("agregacao") as medida:
+        medida["linhas"] = 0
+        for bloco in blocos:
+            bloco["fim_de_semana"] = bloco["dia_semana"].isin(["Saturday", "Sunday"])
+            bloco["tipo_dia"] = bloco["fim_de_semana"].map({True: "Fim de Semana", False: "Dia Útil"})
+            agregados.atualizar(bloco)
+            medida["linhas"] += len(bloco)
+
+    relatorio_texto["normalidade"] = "\U0001F9EA Teste de Normalidade:\n"
+    amostra = agregados.amostra("normalidade")
+    with inst.etapa("normalidade", linhas=len(amostra)):
+        for col in ["mortos", "feridos_graves", "gravidade"]:
+            stat, p = stats.shapiro(amostra[col])
+            resultado = "Não normal" if p < 0.05 else "Normal"
+            relatorio_texto["normalidade"] += f"{col}: stat={stat:.4f}, p={p:.4f} → {resultado}\n"
+    print("\n" + relatorio_texto["normalidade"])
+
+    graficos = {"correlacao_heatmap.png": (correlacao_heatmap, {"corr": agregados.correlacao()})}
+
+    # Teste t de Welch a partir de n, média e variância de cada grupo
+    mortos_tipo_dia = agregados.media_variancia("mortos_tipo_dia")
+    fds, util = mortos_tipo_dia.loc["Fim de Semana"], mortos_tipo_dia.loc["Dia Útil"]
+    t_stat, p_valor = stats.ttest_ind_from_stats(
+        fds["media"], np.sqrt(fds["variancia"]), fds["n"],
+        util["media"], np.sqrt(util["variancia"]), util["n"],
+        equal_var=False
+    )
+    relatorio_texto["ttest"] = f"\U0001F4CA Teste t:\nT={t_stat:.4f}, p={p_valor:.4f}"
+    print("\n" + relatorio_texto["ttest"])
+
+    # O mesmo teste em cada UF × ano e em cada BR, a partir das contagens de
+    # mortos por tipo de dia de cada grupo: Welch, IC bootstrap da diferença
+    # e p-valores corrigidos, vetorizados sobre todos os grupos (testes_prf).
+    # A tabela completa vai para resultados/testes_fds_<grupo>.csv.
+    relatorio_texto["testes_por_grupo"] = "\U0001F4CA Teste t por grupo (mortos, fim de semana - dia útil):\n"
+    for nome, chaves in [("uf_ano", ["uf", "ano"]), ("br", ["br"])]:
+        contagens = agregados.tabela(f"mortos_{nome}")["n"].reset_index()
+        with inst.etapa(f"testes_{nome}", linhas=len(contagens)):
+            resultado = comparar_lados(contagens, chaves, "tipo_dia", "mortos", "Fim de Semana", "Dia Útil",
+                                       rotulos=("fds", "util"), reamostras=args.reamostras, correcao=args.correcao)
+        destino = os.path.join(output_dir, f"testes_fds_{nome}.csv")
+        resultado.to_csv(destino, index=False)
+        significativos = resultado[resultado["significativo"]]
+        relatorio_texto["testes_por_grupo"] += (
+            f"{' × '.join(chaves).upper()}: {resultado['p_valor'].notna().sum()} grupos testados, "
+            f"{len(significativos)} com diferença significativa (correção {args.correcao}, 5%) → '{destino}'\n"
+        )
+        maiores = significativos.loc[significativos["diferenca"].abs().sort_values(ascending=False).index[:3]]
+        for linha in maiores.itertuples():
+            grupo = ", ".join(f"{chave}={getattr(linha, chave)}" for chave in chaves)
+            relatorio_texto["testes_por_grupo"] += (
+                f"  {grupo}: diferença={linha.diferenca:+.4f} "
+                f"(IC 95%: {linha.ic_inferior:+.4f} a {linha.ic_superior:+.4f}), p ajustado={linha.p_ajustado:.4f}\n"
+            )
+    print("\n" + relatorio_texto["testes_por_grupo"])
+
+    contagem_gravidade = agregados.contagem("gravidade").sort_index()
+    graficos["histograma_gravidade.png"] = (histograma_gravidade, {
+        "valores": contagem_gravidade.index.to_numpy(dtype=float), "contagens": contagem_gravidade.to_numpy(),
+    })
+
+    contagem_tipo_dia = agregados.tabela("tipo_dia")["n"]
+    resumos = [
+        resumo_boxplot(contagens.index.get_level_values("gravidade"), contagens.to_numpy(), tipo_dia)
+        for tipo_dia, contagens in contagem_tipo_dia.groupby(level="tipo_dia", sort=True)
+    ]
+    graficos["boxplot_gravidade_fds.png"] = (boxplot_gravidade_fds, {"resumos": resumos})
+
+    pares = agregados.tabela("feridos_mortos").reset_index()
+    graficos["dispersao_feridos_mortos.png"] = (dispersao_feridos_mortos, {"pares": pares[["feridos_graves", "mortos"]]})
+
+    df_mensal = agregados.soma("mensal").reset_index().sort_values(["ano", "mes"])
+    df_mensal["data"] = pd.to_datetime(df_mensal.rename(columns={"ano": "year", "mes": "month"}).assign(day=1)[["year", "month", "day"]])
+    graficos["serie_temporal_gravidade.png"] = (serie_temporal_gravidade, {"mensal": df_mensal[["data", "gravidade"]]})
+
+    mortos = pares.loc[pares["mortos"] > 0, "n"].sum()
+    sem_mortos = pares.loc[pares["mortos"] == 0, "n"].sum()
+    graficos["pizza_mortos.png"] = (pizza_mortos, {"mortos": int(mortos), "sem_mortos": int(sem_mortos)})
+
+    salvar_graficos(graficos)
+
+    return relatorio_texto
+
 
 # === Parte 3: Modelagem e Machine Learning ===
-df = pd.read_csv("df_limpo.csv")
-df["gravidade_alta"] = (df["gravidade"] >= 2).astype(int)
-
-features = ["mortos", "feridos_graves", "latitude", "longitude", "mes"]
-relatorio_texto["ausentes_antes"] = "\U0001F50D Verificando valores ausentes nas features:\n"
-relatorio_texto["ausentes_antes"] += df[features + ["gravidade_alta"]].isna().sum().to_string()
-print("\n" + relatorio_texto["ausentes_antes"])
-
-for col in ["latitude", "longitude", "mes"]:
-    df[col] = df[col].fillna(df[col].median())
-
-relatorio_texto["ausentes_depois"] = "\n✅ Valores ausentes após preenchimento:\n"
-relatorio_texto["ausentes_depois"] += df[features + ["gravidade_alta"]].isna().sum().to_string()
-print(relatorio_texto["ausentes_depois"])
-
-df_final = df.dropna(subset=features)
-relatorio_texto["linhas_restantes"] = f"\n\U0001F50E Linhas restantes após dropna: {len(df_final)}"
-print(relatorio_texto["linhas_restantes"])
-
-X = df_final[features]
-y = df_final["gravidade_alta"]
-
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, stratify=y, random_state=42)
-
-scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test)
-
-log_model = LogisticRegression(max_iter=1000)
-rf_model = RandomForestClassifier(random_state=42)
-
-log_model.fit(X_train_scaled, y_train)
-rf_model.fit(X_train, y_train)
-
-y_pred_log = log_model.predict(X_test_scaled)
-y_pred_rf = rf_model.predict(X_test)
-
-relatorio_texto["logistica"] = "\U0001F4CA Regressão Logística:\n" + classification_report(y_test, y_pred_log)
-relatorio_texto["rf"] = "\U0001F332 Random Forest:\n" + classification_report(y_test, y_pred_rf)
-print("\n" + relatorio_texto["logistica"])
-print("\n" + relatorio_texto["rf"])
-
-log_scores = cross_val_score(log_model, X_train_scaled, y_train, cv=5, scoring='accuracy')
-rf_scores = cross_val_score(rf_model, X_train, y_train, cv=5, scoring='accuracy')
-
-relatorio_texto["validacao"] = (
-    f"\n\U0001F4C8 Validação Cruzada:\n"
-    f"  • Logística: {log_scores.mean():.3f} ± {log_scores.std():.3f}\n"
-    f"  • Random Forest: {rf_scores.mean():.3f} ± {rf_scores.std():.3f}"
-)
-print(relatorio_texto["validacao"])
-
-param_grid = {"n_estimators": [50, 100], "max_depth": [5, 10, None]}
-grid = GridSearchCV(RandomForestClassifier(random_state=42), param_grid, cv=3)
-grid.fit(X_train, y_train)
-relatorio_texto["melhor_modelo"] = f"\n\U0001F50D Melhor Random Forest: {grid.best_params_}"
-print(relatorio_texto["melhor_modelo"])
-
-importancia_df = pd.DataFrame({
-    'feature': X.columns,
-    'importancia': rf_model.feature_importances_
-}).sort_values(by='importancia', ascending=True)
-
-sns.barplot(data=importancia_df, x='importancia', y='feature', palette='viridis')
-plt.title("Importância das Variáveis")
-plt.tight_layout()
-plt.savefig(os.path.join(output_dir, "importancia_features_rf.png"), dpi=300)
-plt.clf()
-
-relatorio_texto["interpretacao"] = (
-    f"\n\U0001F4CC Interpretação dos Resultados:\n"
-    f"Acurácia média: Logística = {log_scores.mean():.3f}, RF = {rf_scores.mean():.3f}\n"
-    f"Variáveis mais importantes: feridos_graves, mortos"
-)
-print(relatorio_texto["interpretacao"])
-
-relatorio_texto["limitacoes"] = (
-    "\n⚠️ Limitações:\n"
-    "- Não usamos variáveis categóricas (ex: tipo_acidente)\n"
-    "- Classes desbalanceadas"
-)
-print(relatorio_texto["limitacoes"])
-
-relatorio_texto["melhorias"] = (
-    "\n\U0001F4A1 Melhorias:\n"
-    "- Incluir mais variáveis (clima, tipo acidente)\n"
-    "- Testar SMOTE, XGBoost, LightGBM"
-)
-print(relatorio_texto["melhorias"])
+def etapa_modelagem():
+    # Lê do artefato só as colunas usadas, já tipadas (sem reparsear CSV)
+    relatorio_texto = {}
+    features = ["mortos", "feridos_graves", "latitude", "longitude", "mes"]
+    with inst.etapa("carregamento") as medida:
+        df = carregar_artefato(BASE_LIMPA, features + CATEGORICAS_MODELO + ["gravidade"])
+        medida["linhas"] = len(df)
+    df["gravidade_alta"] = (df["gravidade"] >= 2).astype(int)
+
+    relatorio_texto["ausentes_antes"] = "\U0001F50D Verificando valores ausentes nas features:\n"
+    relatorio_texto["ausentes_antes"] += df[features + ["gravidade_alta"]].isna().sum().to_string()
+    print("\n" + relatorio_texto["ausentes_antes"])
+
+    medianas = {}
+    for col in ["latitude", "longitude", "mes"]:
+        df[col] = df[col].astype("float64")   # a mediana pode ser fracionária (mes é Int8)
+        medianas[col] = df[col].median()
+        df[col] = df[col].fillna(medianas[col])
+
+    relatorio_texto["ausentes_depois"] = "\n✅ Valores ausentes após preenchimento:\n"
+    relatorio_texto["ausentes_depois"] += df[features + ["gravidade_alta"]].isna().sum().to_string()
+    print(relatorio_texto["ausentes_depois"])
+
+    df_final = df.dropna(subset=features)
+    relatorio_texto["linhas_restantes"] = f"\n\U0001F50E Linhas restantes após dropna: {len(df_final)}"
+    print(relatorio_texto["linhas_restantes"])
+
+    X = df_final[features]
+    y = df_final["gravidade_alta"]
+
+    # Mesma divisão para os modelos numéricos (X_*) e os com categóricas (Xc_*)
+    with inst.etapa("divisao", linhas=len(df_final)):
+        Xc_train, Xc_test, y_train, y_test = train_test_split(df_final[features + CATEGORICAS_MODELO], y,
+                                                              test_size=0.3, stratify=y, random_state=42)
+        Xc_train_total, y_train_total = Xc_train, y_train
+        Xc_train, y_train, reduzida = subamostra_estratificada(Xc_train, y_train, args.max_linhas_treino)
+        X_train, X_test = Xc_train[features], Xc_test[features]
+
+    # Dobras estratificadas únicas para validação cruzada e busca de
+    # hiperparâmetros; dobras, candidatos e árvores usam todos os núcleos
+    dobras = Dobras(X_train, y_train, n_dobras=5)
+    processos = numero_processos()
+
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+
+    log_model = LogisticRegression(max_iter=1000)
+    rf_model = RandomForestClassifier(random_state=42, n_jobs=processos)
+
+    with inst.etapa("ajuste_logistica", linhas=len(X_train)):
+        log_model.fit(X_train_scaled, y_train)
+    with inst.etapa("ajuste_random_forest", linhas=len(X_train)):
+        rf_model.fit(X_train, y_train)
+
+    y_pred_log = log_model.predict(X_test_scaled)
+    y_pred_rf = rf_model.predict(X_test)
+
+    relatorio_texto["logistica"] = "\U0001F4CA Regressão Logística:\n" + classification_report(y_test, y_pred_log)
+    relatorio_texto["rf"] = "\U0001F332 Random Forest:\n" + classification_report(y_test, y_pred_rf)
+    print("\n" + relatorio_texto["logistica"])
+    print("\n" + relatorio_texto["rf"])
+
+    with inst.etapa("validacao_logistica", linhas=len(X_train)):
+        log_scores = validar(log_model, X_train_scaled, y_train, dobras)
+    with inst.etapa("validacao_random_forest", linhas=len(X_train)):
+        rf_scores = validar(rf_model, X_train, y_train, dobras)
+
+    relatorio_texto["validacao"] = (
+        f"\n\U0001F4C8 Validação Cruzada:\n"
+        f"  • Logística: {log_scores.mean():.3f} ± {log_scores.std():.3f}\n"
+        f"  • Random Forest: {rf_scores.mean():.3f} ± {rf_scores.std():.3f}"
+    )
+    print(relatorio_texto["validacao"])
+
+    param_grid = {"n_estimators": [50, 100], "max_depth": [5, 10, None]}
+    with inst.etapa("busca", linhas=len(X_train)):
+        grid = buscar(RandomForestClassifier(random_state=42), param_grid, X_train, y_train, dobras,
+                      modo=args.busca, orcamento_s=args.orcamento_busca)
+    # Sem emoji: o relatório em PDF usa esta frase na descrição da modelagem
+    relatorio_texto["busca"] = descrever_busca(args.busca, len(dobras), args.orcamento_busca)
+    print("\n" + relatorio_texto["busca"])
+    relatorio_texto["melhor_modelo"] = f"\n\U0001F50D Melhor Random Forest: {grid.best_params_}"
+    print(relatorio_texto["melhor_modelo"])
+
+    relatorio_texto["tempos_busca"] = (
+        f"\n\u23F1\uFE0F Tempo de ajuste por candidato (busca '{args.busca}', {len(dobras)} dobras, "
+        f"{processos} processo(s)):\n" + tabela_tempos(grid).round(3).to_string(index=False)
+    )
+    print(relatorio_texto["tempos_busca"])
+
+    if reduzida:
+        # Curva de aprendizado da subamostra: acurácia no teste com frações
+        # crescentes dela
+        with inst.etapa("curva_subamostra", linhas=len(X_train)):
+            curva = curva_subamostra(grid.best_estimator_, X_train, y_train, X_test, y_test)
+        ganho_ultima_dobra = curva["acuracia"].iloc[-1] - curva["acuracia"].iloc[-2]
+        relatorio_texto["subamostra"] = (
+            f"\n\U0001F4C9 Treino em subamostra estratificada de {len(X_train)} linhas "
+            f"(de {len(y_train_total)} disponíveis para treino; teste com {len(X_test)}):\n"
+            + curva.round(4).to_string(index=False)
+            + f"\nGanho de acurácia ao dobrar a subamostra (últimos dois pontos da curva): {ganho_ultima_dobra:+.4f}"
+        )
+        if not args.sem_custo_subamostra:
+            # O melhor modelo ajustado também com todas as linhas de treino,
+            # avaliado no mesmo conjunto de teste
+            with inst.etapa("custo_subamostra", linhas=len(y_train_total)):
+                custo = custo_subamostra(grid.best_estimator_, X_train, y_train,
+                                         Xc_train_total[features], y_train_total, X_test, y_test)
+            relatorio_texto["subamostra"] += (
+                f"\nAcurácia no teste: subamostra = {custo['acuracia_subamostra']:.4f} "
+                f"({custo['tempo_subamostra_s']:.1f} s), base de treino inteira = {custo['acuracia_completo']:.4f} "
+                f"({custo['tempo_completo_s']:.1f} s)"
+                f"\nCusto da subamostra (acurácia inteira - subamostra): {custo['custo']:+.4f}"
+            )
+        print(relatorio_texto["subamostra"])
+    del Xc_train_total, y_train_total   # só a subamostra segue para os modelos com categóricas
+
+    # Categóricas (municipio, causa, tipo, clima) com largura fixa: códigos
+    # das categorias mais frequentes no gradient boosting por histogramas e
+    # hash esparso na logística. A matriz não cresce com o número de
+    # categorias distintas.
+    modelos_categoricos = {"hist_gradient_boosting": modelo_histograma(features),
+                           "logistica_hash": modelo_linear_hash(features)}
+    linhas_categoricas = []
+    for nome, modelo in modelos_categoricos.items():
+        with inst.etapa(f"ajuste_{nome}", linhas=len(Xc_train)) as medida:
+            modelo.fit(Xc_train, y_train)
+        codificado = modelo[0].transform(Xc_test)
+        linhas_categoricas.append({
+            "modelo": nome, "largura": codificado.shape[1],
+            "bytes_por_linha": bytes_matriz(codificado) / max(len(Xc_test), 1),
+            "tempo_ajuste_s": medida["segundos"], "acuracia": accuracy_score(y_test, modelo.predict(Xc_test)),
+        })
+    relatorio_texto["categoricas"] = (
+        f"\n\U0001F9E9 Modelos com variáveis categóricas ({', '.join(CATEGORICAS_MODELO)}):\n"
+        + pd.DataFrame(linhas_categoricas).round(3).to_string(index=False)
+        + "\n\n" + classification_report(y_test, modelos_categoricos["hist_gradient_boosting"].predict(Xc_test))
+    )
+    print(relatorio_texto["categoricas"])
+
+    # Modelos, scaler e preenchimento de nulos salvos para o pontuar_prf.py
+    modelos = {"logistica": log_model, "random_forest": rf_model, "random_forest_otimizado": grid.best_estimator_}
+    acuracias = {
+        nome: float((modelo.predict(X_test_scaled if nome == "logistica" else X_test) == y_test).mean())
+        for nome, modelo in modelos.items()
+    }
+    acuracias.update({linha["modelo"]: float(linha["acuracia"]) for linha in linhas_categoricas})
+    modelos.update(modelos_categoricos)
+    metricas = {
+        "acuracia_teste": acuracias,
+        "linhas_treino": len(X_train),
+        "melhores_parametros": {chave: str(valor) for chave, valor in grid.best_params_.items()},
+    }
+    with inst.etapa("salvar_modelos"):
+        caminho_modelos = salvar_modelos(modelos, scaler, features, medianas, metricas, CATEGORICAS_MODELO)
+    relatorio_texto["modelos_salvos"] = f"\n\U0001F4BE Modelos salvos em '{caminho_modelos}'"
+    print(relatorio_texto["modelos_salvos"])
+
+    importancia_df = pd.DataFrame({
+        'feature': X.columns,
+        'importancia': rf_model.feature_importances_
+    }).sort_values(by='importancia', ascending=True)
+
+    salvar_graficos({"importancia_features_rf.png": (importancia_features_rf, {"importancia": importancia_df})})
+
+    relatorio_texto["interpretacao"] = (
+        f"\n\U0001F4CC Interpretação dos Resultados:\n"
+        f"Acurácia média: Logística = {log_scores.mean():.3f}, RF = {rf_scores.mean():.3f}\n"
+        f"Variáveis mais importantes: feridos_graves, mortos"
+    )
+    print(relatorio_texto["interpretacao"])
+
+    relatorio_texto["limitacoes"] = (
+        "\n⚠️ Limitações:\n"
+        "- Categóricas só nos modelos com largura fixa: no gradient boosting, categorias raras viram 'outras'\n"
+        "- Classes desbalanceadas"
+    )
+    print(relatorio_texto["limitacoes"])
+
+    relatorio_texto["melhorias"] = (
+        "\n\U0001F4A1 Melhorias:\n"
+        "- Incluir mais variáveis categóricas (fase_dia, tipo_pista, uso_solo)\n"
+        "- Testar SMOTE, XGBoost, LightGBM"
+    )
+    print(relatorio_texto["melhorias"])
+
+    return relatorio_texto
+
+
+# === Execução das etapas ===
+for etapa, executar in [("limpeza", etapa_limpeza), ("estatistica", etapa_estatistica), ("modelagem", etapa_modelagem)]:
+    if etapa in args.etapas:
+        with inst.etapa(etapa):
+            textos_etapa = executar()
+        salvar_textos(etapa, textos_etapa)
 
 print("\n✅ Script finalizado com sucesso!")
+print(f"\u23F1\uFE0F Tempo e memória de cada etapa salvos em '{inst.salvar(ARQUIVO_DESEMPENHO)}'")
 
 # === Salvar textos para PDF ===
+# Junta as seções de todas as etapas já executadas, nesta ou em rodadas anteriores
+textos = carregar_textos()
 with open("texto_analise.txt", "w", encoding="utf-8") as f:
-    for secao, conteudo in relatorio_texto.items():
-        f.write(f"=== {secao.upper()} ===\n{conteudo}\n\n")
+    for etapa in ETAPAS:
+        for secao, conteudo in textos.get(etapa, {}).items():
+            f.write(f"=== {secao.upper()} ===\n{conteudo}\n\n")
 print("\n📝 Texto de análise salvo como 'texto_analise.txt'")
@@ -0,0 +1,109 @@
+# artefatos_prf.py
+# Artefatos binários trocados entre as etapas do pipeline. A base limpa é
+# gravada em formato Arrow IPC sem compressão e lida por memory map: os tipos
+# (categorias, inteiros pequenos, datas) são preservados e a leitura não copia
+# nem reinterpreta os dados, ao contrário do CSV. Cada etapa pode então ser
+# executada sozinha a partir do artefato da etapa anterior.
+
+import json
+import os
+
+import pyarrow as pa
+
+from ingestao_prf import LINHAS_POR_BLOCO, para_pandas
+
+CAMINHO_ARTEFATOS = "artefatos"
+ARQUIVO_TEXTOS = "textos.json"   # seções do relatório textual, por etapa
+
+
+def caminho_artefato(nome, pasta=CAMINHO_ARTEFATOS):
+    return os.path.join(pasta, f"{nome}.arrow")
+
+
+# === Gravação ===
+def gravar_artefato(nome, tabelas, pasta=CAMINHO_ARTEFATOS):
+    # Grava uma sequência de tabelas Arrow (todas no mesmo esquema) bloco a
+    # bloco. O formato de stream aceita dicionários diferentes por bloco, então
+    # as categorias de cada ano não precisam ser conhecidas de antemão.
+    # Devolve o número de linhas gravadas.
+    os.makedirs(pasta, exist_ok=True)
+    destino = caminho_artefato(nome, pasta)
+    temporario = destino + ".tmp"
+    linhas = 0
+    escritor = None
+    try:
+        with pa.OSFile(temporario, "wb") as arquivo:
+            for tabela in tabelas:
+                if escritor is None:
+                    escritor = pa.ipc.new_stream(arquivo, tabela.schema)
+                escritor.write_table(tabela)
+                linhas += tabela.num_rows
+            if escritor is not None:
+                escritor.close()
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    if escritor is None:
+        os.remove(temporario)
+        raise ValueError(f"Artefato '{nome}' sem dados")
+    os.replace(temporario, destino)
+    return linhas
+
+
+# === Leitura ===
+def _abrir(nome, pasta):
+    origem = caminho_artefato(nome, pasta)
+    if not os.path.exists(origem):
+        raise FileNotFoundError(f"Artefato '{origem}' não encontrado; execute antes a etapa que o gera")
+    return pa.ipc.open_stream(pa.memory_map(origem))
+
+
+def esquema_artefato(nome, pasta=CAMINHO_ARTEFATOS):
+    return _abrir(nome, pasta).schema
+
+
+def ler_tabela(nome, colunas=None, pasta=CAMINHO_ARTEFATOS):
+    # Tabela Arrow apontando para o arquivo mapeado em memória (sem cópia);
+    # colunas não pedidas nunca são tocadas
+    tabela = _abrir(nome, pasta).read_all()
+    return tabela if colunas is None else tabela.select(colunas)
+
+
+def carregar_artefato(nome, colunas=None, pasta=CAMINHO_ARTEFATOS):
+    return para_pandas(ler_tabela(nome, colunas, pasta))
+
+
+def iterar_artefato(nome, colunas=None, linhas_por_bloco=LINHAS_POR_BLOCO, pasta=CAMINHO_ARTEFATOS):
+    # DataFrames de até `linhas_por_bloco` linhas, na ordem do artefato
+    for lote in _abrir(nome, pasta):
+        if colunas is not None:
+            lote = lote.select(colunas)
+        for inicio in range(0, lote.num_rows, linhas_por_bloco):
+            yield para_pandas(pa.Table.from_batches([lote.slice(inicio, linhas_por_bloco)]))
+
+
+def exportar_csv(nome, destino, pasta=CAMINHO_ARTEFATOS):
+    # Exportação opcional para CSV, bloco a bloco
+    for i, bloco in enumerate(iterar_artefato(nome, pasta=pasta)):
+        bloco.to_csv(destino, index=False, header=i == 0, mode="w" if i == 0 else "a")
+
+
+# === Textos do relatório ===
+def salvar_textos(etapa, textos, pasta=CAMINHO_ARTEFATOS):
+    # Guarda as seções de texto de uma etapa, preservando as das outras
+    os.makedirs(pasta, exist_ok=True)
+    todos = carregar_textos(pasta)
+    todos[etapa] = textos
+    caminho = os.path.join(pasta, ARQUIVO_TEXTOS)
+    with open(caminho + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(todos, f, ensure_ascii=False, indent=1)
+    os.replace(caminho + ".tmp", caminho)
+
+
+def carregar_textos(pasta=CAMINHO_ARTEFATOS):
+    caminho = os.path.join(pasta, ARQUIVO_TEXTOS)
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,168 @@
+# executar.py
+# Benchmark das etapas do projeto sobre dados sintéticos (gerar_dados.py).
+# Cada etapa roda como um processo separado numa pasta de trabalho isolada
+# (dados/, cache/, artefatos/, resultados/ próprios), na ordem em que
+# dependem umas das outras. Para cada uma são medidos o tempo de parede, o
+# tempo de CPU (usuário + sistema, incluindo os processos de trabalho) e o
+# pico de memória. Tudo é gravado em JSON, para comparar rodadas.
+#
+# Uso: python benchmarks/executar.py --linhas 200000 --anos 2019 2023
+#      python benchmarks/executar.py --comparar benchmarks/resultados/anterior.json
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from gerar_dados import gerar_anos
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTA_RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados")
+VERSAO_RESULTADOS = 1
+
+# Dashboard: carga de todos os anos em segundo plano e primeira resposta de
+# cada componente do último ano (fora de um callback do Dash, sem servidor)
+CODIGO_DASHBOARD = (
+    "import dashboard_prf as d; from binagem_espacial_prf import arredondar_limites, vista_do_mapa; "
+    "d.carga.join(); a = d.estado.anos_carregados()[-1]; d.indicadores_ano(a); d.hotspots_ano(a); "
+    "z, _, l = vista_do_mapa(None); r = d.estado.grades.resolucao_para_zoom(z); "
+    "d.mapa_ano(a, r, arredondar_limites(l, r))"
+)
+
+
+def _script(nome, *argumentos):
+    return [sys.executable, os.path.join(RAIZ, nome), *argumentos]
+
+
+def etapas_benchmark(arquivo_pontuacao):
+    # (nome, comando) na ordem de execução; o cache e os artefatos gerados por
+    # uma etapa são usados pelas seguintes, como numa execução real
+    return [
+        ("exploratoria_cache_frio", _script("analise_acidentes_prf.py", "--sem-exibir")),
+        ("exploratoria_cache_quente", _script("analise_acidentes_prf.py", "--sem-exibir")),
+        ("exploratoria_streaming", _script("analise_acidentes_prf.py", "--streaming", "--sem-exibir")),
+        ("trechos_criticos", _script("trechos_prf.py")),
+        ("completo_limpeza", _script("analise_prf_completo.py", "--etapas", "limpeza")),
+        ("completo_estatistica", _script("analise_prf_completo.py", "--etapas", "estatistica")),
+        ("completo_modelagem", _script("analise_prf_completo.py", "--etapas", "modelagem")),
+        ("pontuacao", _script("pontuar_prf.py", arquivo_pontuacao, "--saida", "pontuacoes")),
+        ("dashboard_inicializacao", [sys.executable, "-c", CODIGO_DASHBOARD]),
+        ("relatorio_pdf", _script("gerar_relatorio.py")),
+        ("relatorios_uf", _script("gerar_relatorio.py", "--por", "uf")),
+    ]
+
+
+def medir(comando, pasta, ambiente, log):
+    # Executa o comando em `pasta` e devolve as medidas do processo (e dos
+    # seus filhos) a partir do rusage devolvido por wait4
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(comando, cwd=pasta, env=ambiente, stdout=log, stderr=subprocess.STDOUT)
+    _, status, uso = os.wait4(processo.pid, 0)
+    processo.returncode = os.waitstatus_to_exitcode(status)
+    segundos = time.perf_counter() - inicio
+    # ru_maxrss vem em KiB no Linux e em bytes no macOS
+    pico = uso.ru_maxrss / (1 << 20) if sys.platform == "darwin" else uso.ru_maxrss / 1024
+    return {
+        "segundos": round(segundos, 3),
+        "cpu_s": round(uso.ru_utime + uso.ru_stime, 3),
+        "pico_mb": round(pico, 1),
+        "codigo_saida": processo.returncode,
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executar(linhas, anos, semente, pasta, etapas=None):
+    os.makedirs(pasta, exist_ok=True)
+    ambiente = dict(os.environ, MPLBACKEND="Agg",
+                    PYTHONPATH=os.pathsep.join(filter(None, [RAIZ, os.environ.get("PYTHONPATH")])))
+    resultado = {
+        "versao": VERSAO_RESULTADOS,
+        "inicio": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "nucleos": os.cpu_count(),
+        "prf_processos": os.environ.get("PRF_PROCESSOS"),
+        "parametros": {"linhas_por_ano": linhas, "anos": list(anos), "semente": semente},
+        "etapas": [],
+    }
+
+    inicio = time.perf_counter()
+    arquivos = gerar_anos(anos, linhas, os.path.join(pasta, "dados"), semente)
+    resultado["geracao_s"] = round(time.perf_counter() - inicio, 3)
+    print(f"🧪 {len(arquivos)} arquivo(s) sintético(s) com {linhas} linhas em {resultado['geracao_s']:.1f}s")
+
+    with open(os.path.join(pasta, "benchmark.log"), "w", encoding="utf-8") as log:
+        for nome, comando in etapas_benchmark(os.path.join("dados", os.path.basename(arquivos[-1]))):
+            if etapas and nome not in etapas:
+                continue
+            log.write(f"\n=== {nome}: {' '.join(comando)} ===\n")
+            log.flush()
+            medidas = medir(comando, pasta, ambiente, log)
+            resultado["etapas"].append({"etapa": nome, **medidas})
+            situacao = "✅" if medidas["codigo_saida"] == 0 else f"❌ (saída {medidas['codigo_saida']})"
+            print(f"{situacao} {nome}: {medidas['segundos']:.2f}s, CPU {medidas['cpu_s']:.2f}s, "
+                  f"pico {medidas['pico_mb']:.0f} MB")
+    return resultado
+
+
+def comparar(atual, anterior):
+    # Razão de tempo por etapa (atual / anterior): < 1 é mais rápido
+    anteriores = {e["etapa"]: e for e in anterior["etapas"]}
+    print(f"\n📊 Comparação com {anterior.get('commit')} ({anterior['inicio']}):")
+    for etapa in atual["etapas"]:
+        antes = anteriores.get(etapa["etapa"])
+        if antes is None:
+            continue
+        razao = etapa["segundos"] / max(antes["segundos"], 1e-9)
+        print(f"  {etapa['etapa']:<28} {antes['segundos']:>8.2f}s → {etapa['segundos']:>8.2f}s  ({razao:.2f}x)  "
+              f"pico {antes['pico_mb']:.0f} → {etapa['pico_mb']:.0f} MB")
+    if anterior["parametros"] != atual["parametros"]:
+        print("  ⚠️ Parâmetros diferentes entre as rodadas; a comparação é só indicativa")
+
+
+# === Linha de comando ===
+if __name__ == "__main__":
+    nomes = [nome for nome, _ in etapas_benchmark("")]
+    parser = argparse.ArgumentParser(description="Benchmark das etapas do projeto com dados sintéticos da PRF")
+    parser.add_argument("--linhas", type=int, default=100_000, help="linhas por ano")
+    parser.add_argument("--anos", type=int, nargs=2, default=[2019, 2023], metavar=("INICIO", "FIM"))
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--etapas", nargs="+", choices=nomes, help="subconjunto das etapas (padrão: todas)")
+    parser.add_argument("--pasta", help="pasta de trabalho (padrão: temporária, apagada no final)")
+    parser.add_argument("--saida", help="JSON de resultados (padrão: benchmarks/resultados/<data>.json)")
+    parser.add_argument("--comparar", help="JSON de uma rodada anterior para comparar")
+    args = parser.parse_args()
+
+    pasta = args.pasta or tempfile.mkdtemp(prefix="benchmark_prf_")
+    resultado = executar(args.linhas, range(args.anos[0], args.anos[1] + 1), args.semente, pasta, args.etapas)
+    falhou = any(etapa["codigo_saida"] != 0 for etapa in resultado["etapas"])
+    if falhou:
+        print(f"⚠️ Saída das etapas em '{os.path.join(pasta, 'benchmark.log')}'")
+    elif not args.pasta:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    saida = args.saida or os.path.join(PASTA_RESULTADOS, datetime.now().strftime("%Y%m%d_%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Resultados em '{saida}'")
+
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            comparar(resultado, json.load(f))
+    if falhou:
+        sys.exit(1)
@@ -0,0 +1,150 @@
+# gerar_dados.py
+# Gerador determinístico de CSVs no formato dos dados abertos da PRF
+# (datatranAAAA.csv): separador ";", latin1, vírgula decimal, tokens "(null)",
+# data_inversa em dd/mm/aaaa até 2016 e aaaa-mm-dd depois, e as mesmas
+# colunas dos arquivos reais. A mesma semente, ano e número de linhas geram
+# sempre o mesmo arquivo, byte a byte.
+#
+# Uso: python benchmarks/gerar_dados.py --linhas 100000 --anos 2019 2023 --pasta dados
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+COLUNAS = [
+    "id", "data_inversa", "dia_semana", "horario", "uf", "br", "km", "municipio", "causa_acidente",
+    "tipo_acidente", "classificacao_acidente", "fase_dia", "sentido_via", "condicao_metereologica",
+    "tipo_pista", "tracado_via", "uso_solo", "pessoas", "mortos", "feridos_leves", "feridos_graves",
+    "ilesos", "ignorados", "feridos", "veiculos", "latitude", "longitude", "regional", "delegacia", "uop",
+]
+
+DIAS = ["segunda-feira", "terça-feira", "quarta-feira", "quinta-feira", "sexta-feira", "sábado", "domingo"]
+UFS = ["MG", "PR", "SC", "RS", "SP", "RJ", "BA", "GO", "PE", "ES", "MT", "MS", "CE", "PB", "RN",
+       "PI", "MA", "PA", "RO", "TO", "AL", "SE", "DF", "AC", "AM", "AP", "RR"]
+BRS = [116, 101, 381, 40, 153, 364, 277, 163, 230, 282, 262, 376, 470, 20, 60, 50, 365, 324, 232, 369]
+CAUSAS = ["Falta de Atenção à Condução", "Velocidade Incompatível", "Ingestão de Álcool",
+          "Desobediência às normas de trânsito", "Não guardar distância de segurança",
+          "Defeito Mecânico no Veículo", "Pista Escorregadia", "Animais na Pista", "Condutor Dormindo",
+          "Ultrapassagem Indevida", "Defeito na Via", "Falta de Atenção do Pedestre"]
+TIPOS = ["Colisão traseira", "Saída de leito carroçável", "Colisão transversal", "Tombamento",
+         "Colisão lateral", "Colisão frontal", "Queda de ocupante de veículo", "Atropelamento de Pedestre",
+         "Capotamento", "Colisão com objeto", "Engavetamento", "Incêndio"]
+FASES = ["Pleno dia", "Plena Noite", "Anoitecer", "Amanhecer"]
+CLIMAS = ["Céu Claro", "Nublado", "Chuva", "Sol", "Garoa/Chuvisco", "Nevoeiro/Neblina", "Vento", "Ignorado"]
+PISTAS = ["Simples", "Dupla", "Múltipla"]
+TRACADOS = ["Reta", "Curva", "Interseção de vias", "Aclive", "Declive", "Rotatória", "Ponte", "Viaduto"]
+SENTIDOS = ["Crescente", "Decrescente"]
+USOS_SOLO = ["Sim", "Não"]
+
+FRACAO_NULOS = 0.01            # "(null)" nas colunas que aparecem vazias nos dados reais
+MUNICIPIOS_POR_UF = 60
+
+
+def _escolher(rng, opcoes, n, concentracao=1.2):
+    # Frequências desiguais (lei de potência), como nas categorias reais
+    pesos = 1.0 / np.arange(1, len(opcoes) + 1) ** concentracao
+    return np.asarray(opcoes, dtype=object)[rng.choice(len(opcoes), size=n, p=pesos / pesos.sum())]
+
+
+def _decimal(valores, casas):
+    # Texto com vírgula decimal, como nos CSVs da PRF (810,3; -14,326164)
+    return pd.Series(valores).map(f"{{:.{casas}f}}".format).str.replace(".", ",", regex=False).to_numpy(dtype=object)
+
+
+def _numerado(prefixo, numeros, largura):
+    return (prefixo + pd.Series(numeros).astype(str).str.zfill(largura)).to_numpy(dtype=object)
+
+
+def _horarios(minutos):
+    horas = pd.Series(minutos // 60).astype(str).str.zfill(2)
+    return (horas + ":" + pd.Series(minutos % 60).astype(str).str.zfill(2) + ":00").to_numpy()
+
+
+def gerar_ano(ano, linhas, semente=0):
+    # DataFrame com as colunas do CSV original, já com os nulos marcados
+    rng = np.random.default_rng([semente, ano])
+    datas = pd.Timestamp(f"{ano}-01-01") + pd.to_timedelta(rng.integers(0, 365, linhas), unit="D")
+    uf_idx = rng.choice(len(UFS), size=linhas, p=np.linspace(2, 1, len(UFS)) / np.linspace(2, 1, len(UFS)).sum())
+    municipio_idx = (rng.zipf(1.6, linhas) - 1) % MUNICIPIOS_POR_UF
+
+    mortos = rng.choice([0, 1, 2, 3], size=linhas, p=[0.92, 0.06, 0.015, 0.005])
+    feridos_graves = rng.choice([0, 1, 2, 3], size=linhas, p=[0.75, 0.18, 0.05, 0.02])
+    feridos_leves = rng.poisson(0.9, linhas)
+    ilesos = rng.poisson(1.1, linhas)
+    ignorados = rng.choice([0, 1], size=linhas, p=[0.9, 0.1])
+    pessoas = mortos + feridos_graves + feridos_leves + ilesos + ignorados
+
+    classificacao = np.where(mortos > 0, "Com Vítimas Fatais",
+                             np.where(feridos_graves + feridos_leves > 0, "Com Vítimas Feridas", "Sem Vítimas"))
+    # Coordenadas agrupadas em torno de um centro por UF, com ruído
+    centros = rng.uniform([-30.0, -57.0], [-3.0, -36.0], size=(len(UFS), 2))
+    latitude = centros[uf_idx, 0] + rng.normal(0, 1.2, linhas)
+    longitude = centros[uf_idx, 1] + rng.normal(0, 1.2, linhas)
+    uf = np.asarray(UFS, dtype=object)[uf_idx]
+    delegacia = _numerado("DEL", uf_idx + 1, 2)
+
+    df = pd.DataFrame({
+        "id": np.arange(linhas) + (ano - 2000) * 10_000_000,
+        "data_inversa": datas.strftime("%d/%m/%Y" if ano <= 2016 else "%Y-%m-%d"),
+        "dia_semana": np.asarray(DIAS, dtype=object)[datas.dayofweek],
+        "horario": _horarios(rng.integers(0, 24 * 60, linhas)),
+        "uf": uf,
+        "br": pd.array(_escolher(rng, BRS, linhas), dtype="Int64"),
+        "km": _decimal(rng.uniform(0, 900, linhas), 1),
+        "municipio": _numerado("MUNICIPIO " + uf + " ", municipio_idx, 3),
+        "causa_acidente": _escolher(rng, CAUSAS, linhas),
+        "tipo_acidente": _escolher(rng, TIPOS, linhas),
+        "classificacao_acidente": classificacao,
+        "fase_dia": _escolher(rng, FASES, linhas),
+        "sentido_via": _escolher(rng, SENTIDOS, linhas, 0.3),
+        "condicao_metereologica": _escolher(rng, CLIMAS, linhas),
+        "tipo_pista": _escolher(rng, PISTAS, linhas),
+        "tracado_via": _escolher(rng, TRACADOS, linhas),
+        "uso_solo": _escolher(rng, USOS_SOLO, linhas, 0.3),
+        "pessoas": pessoas,
+        "mortos": mortos,
+        "feridos_leves": feridos_leves,
+        "feridos_graves": feridos_graves,
+        "ilesos": ilesos,
+        "ignorados": ignorados,
+        "feridos": feridos_leves + feridos_graves,
+        "veiculos": rng.choice([1, 2, 3, 4], size=linhas, p=[0.35, 0.5, 0.1, 0.05]),
+        "latitude": _decimal(latitude, 6),
+        "longitude": _decimal(longitude, 6),
+        "regional": "SPRF-" + uf,
+        "delegacia": delegacia + "-" + uf,
+        "uop": _numerado("UOP", municipio_idx % 5 + 1, 2) + "-" + delegacia + "/" + uf,
+    }, columns=COLUNAS)
+
+    # Nulos como nos arquivos reais: br, km, coordenadas e clima às vezes vêm "(null)"
+    for col in ["br", "km", "latitude", "longitude", "condicao_metereologica", "uop"]:
+        df.loc[rng.random(linhas) < FRACAO_NULOS, col] = None
+    return df
+
+
+def gravar_ano(ano, linhas, pasta, semente=0):
+    os.makedirs(pasta, exist_ok=True)
+    destino = os.path.join(pasta, f"datatran{ano}.csv")
+    gerar_ano(ano, linhas, semente).to_csv(
+        destino, sep=";", encoding="latin1", index=False, na_rep="(null)",
+    )
+    return destino
+
+
+def gerar_anos(anos, linhas, pasta, semente=0):
+    return [gravar_ano(ano, linhas, pasta, semente) for ano in anos]
+
+
+# === Linha de comando ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera CSVs sintéticos no formato dos dados da PRF")
+    parser.add_argument("--linhas", type=int, default=100_000, help="linhas por ano")
+    parser.add_argument("--anos", type=int, nargs=2, default=[2019, 2023], metavar=("INICIO", "FIM"))
+    parser.add_argument("--pasta", default="dados")
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    for destino in gerar_anos(range(args.anos[0], args.anos[1] + 1), args.linhas, args.pasta, args.semente):
+        print(f"✅ {destino}")
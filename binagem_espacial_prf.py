@@ -0,0 +1,112 @@
+# binagem_espacial_prf.py
+# Agregação espacial dos acidentes em grades de várias resoluções. O mapa do
+# dashboard recebe só as células da resolução adequada ao zoom e dentro da
+# área visível, em vez de todos os pontos do ano.
+
+import math
+
+import numpy as np
+import pandas as pd
+
+# === CONFIGURAÇÃO ===
+RESOLUCOES = [2.0, 1.0, 0.5, 0.25, 0.1, 0.05, 0.025, 0.01]  # tamanho da célula, em graus
+PIXELS_POR_CELULA = 8          # tamanho aproximado de uma célula na tela
+TAMANHO_TILE = 512             # pixels de um tile do mapbox no zoom 0
+TELA_PADRAO = (1200, 450)      # usado quando o navegador não informa a área visível
+ZOOM_PADRAO = 4
+CENTRO_PADRAO = {"lat": -15.5, "lon": -47.5}
+
+DESLOCAMENTO = 50_000          # > 180 / menor resolução
+BASE_CHAVE = 2 * DESLOCAMENTO
+
+
+# === Binagem ===
+def agregar_celulas(latitude, longitude, gravidade, resolucao):
+    # Soma acidentes e gravidade por célula de `resolucao` graus; devolve o
+    # centro de cada célula ordenado por latitude.
+    validos = ~(np.isnan(latitude) | np.isnan(longitude))
+    # Índices de linha/coluna deslocados para ficarem positivos e caberem em uma chave int64
+    linha = np.floor(latitude[validos] / resolucao).astype(np.int64) + DESLOCAMENTO
+    coluna = np.floor(longitude[validos] / resolucao).astype(np.int64) + DESLOCAMENTO
+
+    celulas, inverso = np.unique(linha * BASE_CHAVE + coluna, return_inverse=True)
+    linhas, colunas = np.divmod(celulas, BASE_CHAVE)
+    linhas -= DESLOCAMENTO
+    colunas -= DESLOCAMENTO
+    return pd.DataFrame({
+        "latitude": ((linhas + 0.5) * resolucao).astype(np.float32),
+        "longitude": ((colunas + 0.5) * resolucao).astype(np.float32),
+        "acidentes": np.bincount(inverso, minlength=len(celulas)).astype(np.int32),
+        "gravidade": np.bincount(inverso, weights=gravidade[validos], minlength=len(celulas)).astype(np.float32),
+    }).sort_values("latitude", ignore_index=True)
+
+
+class GradesPorAno:
+    # Guarda, para cada ano, a agregação em todas as resoluções de RESOLUCOES
+    def __init__(self, resolucoes=RESOLUCOES):
+        self.resolucoes = sorted(resolucoes, reverse=True)
+        self.grades = {}   # ano -> {resolucao: DataFrame de células}
+
+    def adicionar_ano(self, ano, df_ano):
+        latitude = df_ano["latitude"].to_numpy(dtype=np.float64, na_value=np.nan)
+        longitude = df_ano["longitude"].to_numpy(dtype=np.float64, na_value=np.nan)
+        gravidade = df_ano["gravidade"].to_numpy(dtype=np.float64)
+        self.grades[ano] = {r: agregar_celulas(latitude, longitude, gravidade, r) for r in self.resolucoes}
+
+    def resolucao_para_zoom(self, zoom):
+        # Maior detalhe cuja célula ainda ocupa ~PIXELS_POR_CELULA na tela
+        graus_por_pixel = 360 / (TAMANHO_TILE * 2 ** zoom)
+        alvo = graus_por_pixel * PIXELS_POR_CELULA
+        candidatas = [r for r in self.resolucoes if r >= alvo]
+        return candidatas[-1] if candidatas else self.resolucoes[0]
+
+    def celulas(self, ano, resolucao, limites=None):
+        # Células do ano na resolução pedida, opcionalmente só as dentro de
+        # limites = (lat_min, lat_max, lon_min, lon_max)
+        grade = self.grades.get(ano, {}).get(resolucao)
+        if grade is None:
+            return pd.DataFrame(columns=["latitude", "longitude", "acidentes", "gravidade"])
+        if limites is not None:
+            lat_min, lat_max, lon_min, lon_max = limites
+            inicio, fim = np.searchsorted(grade["latitude"].to_numpy(), [lat_min, lat_max])
+            grade = grade.iloc[inicio:fim]
+            grade = grade[(grade["longitude"] >= lon_min) & (grade["longitude"] <= lon_max)]
+        return grade
+
+
+# === Área visível do mapa ===
+def vista_do_mapa(relayout_data):
+    # Extrai (zoom, centro, limites) do relayoutData do dcc.Graph. Os limites
+    # vêm de mapbox._derived quando o navegador os envia; senão são estimados
+    # a partir do centro e do zoom.
+    relayout_data = relayout_data or {}
+    zoom = relayout_data.get("mapbox.zoom", ZOOM_PADRAO)
+    centro = relayout_data.get("mapbox.center", CENTRO_PADRAO)
+
+    cantos = relayout_data.get("mapbox._derived", {}).get("coordinates")
+    if cantos:
+        lons, lats = zip(*cantos)
+        limites = (min(lats), max(lats), min(lons), max(lons))
+    else:
+        graus_por_pixel = 360 / (TAMANHO_TILE * 2 ** zoom)
+        meia_largura = TELA_PADRAO[0] / 2 * graus_por_pixel
+        meia_altura = TELA_PADRAO[1] / 2 * graus_por_pixel
+        limites = (centro["lat"] - meia_altura, centro["lat"] + meia_altura,
+                   centro["lon"] - meia_largura, centro["lon"] + meia_largura)
+    return zoom, centro, limites
+
+
+def arredondar_limites(limites, resolucao, margem=0.5):
+    # Alinha os limites à grade com uma margem de meia tela: pequenos
+    # deslocamentos do mapa caem na mesma chave de cache e já têm as células
+    # vizinhas carregadas.
+    lat_min, lat_max, lon_min, lon_max = limites
+    folga_lat = (lat_max - lat_min) * margem
+    folga_lon = (lon_max - lon_min) * margem
+    passo = resolucao * 4
+    return (
+        math.floor((lat_min - folga_lat) / passo) * passo,
+        math.ceil((lat_max + folga_lat) / passo) * passo,
+        math.floor((lon_min - folga_lon) / passo) * passo,
+        math.ceil((lon_max + folga_lon) / passo) * passo,
+    )
@@ -0,0 +1,252 @@
+# cubo_prf.py
+# Cubo de agregados (rollup) sobre a base limpa: acidentes, mortos, feridos
+# graves e gravidade somados por combinação de ano × mês × dia da semana ×
+# UF × BR × município × tipo × causa. Só as combinações que ocorrem são
+# guardadas (formato esparso: um código por dimensão e as somas, em arrays
+# numpy compactos), então o cubo nunca é maior que a base e costuma ser bem
+# menor. Rankings, contagens e séries de qualquer recorte saem de um
+# bincount sobre os códigos, em milissegundos, sem voltar às linhas.
+#
+# Cada ano tem o seu cubo em cache/cubo/, gerado a partir do Parquet do ano
+# (ingestao_prf) e refeito só quando ele muda; o cubo completo é a junção
+# dos cubos anuais. `python cubo_prf.py --conferir` compara os totais de
+# alguns recortes (fatia + somar) com um groupby sobre as linhas da base.
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ingestao_prf import (CAMINHO_CACHE, CAMINHO_DADOS, LINHAS_POR_BLOCO, TAMANHO_BLOCO_CSV, atualizar_cache,
+                          carregar_dados, listar_arquivos, remover_versoes_antigas, versao_parquet)
+
+CAMINHO_CUBO = os.path.join("cache", "cubo")
+DIMENSOES = ["ano", "mes", "dia_semana", "uf", "br", "municipio", "tipo_acidente", "causa_acidente"]
+MEDIDAS = ["acidentes", "mortos", "feridos_graves", "gravidade"]
+MAX_CHAVES_DENSAS = 1 << 22              # acima disso as chaves de grupo são compactadas com np.unique
+
+
+def _lista(valores):
+    return list(valores) if isinstance(valores, (list, tuple, set, np.ndarray, pd.Index)) else [valores]
+
+
+class Cubo:
+    # codigos: {dimensão: array de códigos (-1 = nulo)}; categorias:
+    # {dimensão: pd.Index com o valor de cada código}; medidas: {medida: array}
+    def __init__(self, codigos, categorias, medidas):
+        self.codigos = codigos
+        self.categorias = categorias
+        self.medidas = medidas
+
+    def __len__(self):
+        return len(self.medidas["acidentes"])
+
+    @property
+    def dimensoes(self):
+        return list(self.codigos)
+
+    @classmethod
+    def de_tabela(cls, tabela):
+        # Tabela Arrow com as DIMENSOES (dicionário) e as MEDIDAS
+        codigos, categorias = {}, {}
+        for dimensao in DIMENSOES:
+            coluna = tabela.column(dimensao).combine_chunks()
+            categorias[dimensao] = pd.Index(coluna.dictionary.to_pandas())
+            indices = coluna.indices.to_numpy(zero_copy_only=False)
+            if coluna.null_count:
+                indices = np.where(coluna.is_null().to_numpy(zero_copy_only=False), -1, indices)
+            codigos[dimensao] = indices.astype(np.min_scalar_type(-max(len(categorias[dimensao]), 1)))
+        medidas = {medida: tabela.column(medida).to_numpy() for medida in MEDIDAS}
+        return cls(codigos, categorias, medidas)
+
+    # === Consultas ===
+    def fatia(self, **filtros):
+        # Ex.: fatia(uf="MG", ano=[2022, 2023]). Valores inexistentes não
+        # selecionam nada; o cubo devolvido compartilha as categorias.
+        selecao = np.ones(len(self), dtype=bool)
+        for dimensao, valores in filtros.items():
+            alvos = self.categorias[dimensao].get_indexer(_lista(valores))
+            selecao &= np.isin(self.codigos[dimensao], alvos[alvos >= 0])
+        return Cubo({d: c[selecao] for d, c in self.codigos.items()}, self.categorias,
+                    {m: v[selecao] for m, v in self.medidas.items()})
+
+    def total(self):
+        return {medida: int(valores.sum()) for medida, valores in self.medidas.items()}
+
+    def somar(self, por):
+        # Somas das medidas por uma ou mais dimensões (índice simples ou
+        # MultiIndex), só para os grupos com acidentes e sem valores nulos
+        por = [por] if isinstance(por, str) else list(por)
+        tamanhos = [len(self.categorias[d]) + 1 for d in por]          # +1: código do nulo
+        chave = np.ravel_multi_index([self.codigos[d].astype(np.int64) + 1 for d in por], tamanhos)
+        if np.prod(tamanhos, dtype=np.float64) <= max(MAX_CHAVES_DENSAS, len(self)):
+            n_chaves, grupos = int(np.prod(tamanhos)), None
+        else:
+            grupos, chave = np.unique(chave, return_inverse=True)
+            n_chaves = len(grupos)
+        somas = {medida: np.rint(np.bincount(chave, weights=valores, minlength=n_chaves)).astype(np.int64)
+                 for medida, valores in self.medidas.items()}
+
+        presentes = np.flatnonzero(somas["acidentes"])
+        codigos = np.unravel_index(presentes if grupos is None else grupos[presentes], tamanhos)
+        validos = np.all([c > 0 for c in codigos], axis=0)
+        niveis = [self.categorias[d][c[validos] - 1] for d, c in zip(por, codigos)]
+        indice = niveis[0].rename(por[0]) if len(por) == 1 else pd.MultiIndex.from_arrays(niveis, names=por)
+        resultado = pd.DataFrame({medida: valores[presentes][validos] for medida, valores in somas.items()},
+                                 index=indice)
+        return resultado.sort_index()
+
+    def top(self, por, medida="gravidade", n=10):
+        # Ranking dos `n` maiores grupos pela medida (ordem estável nos empates)
+        return self.somar(por)[medida].sort_values(ascending=False, kind="stable").head(n)
+
+    def serie(self, por, medida="gravidade"):
+        # Série na ordem das dimensões (ex.: serie(["ano", "mes"]))
+        return self.somar(por)[medida]
+
+    @staticmethod
+    def juntar(cubos):
+        # Junta cubos de anos diferentes num só, com as categorias unificadas
+        cubos = list(cubos)
+        codigos, categorias = {}, {}
+        for dimensao in DIMENSOES:
+            unificadas = pd.Index(pd.concat([c.categorias[dimensao].to_series() for c in cubos]).unique()) \
+                if cubos else pd.Index([])
+            if pd.api.types.is_numeric_dtype(unificadas.dtype):
+                unificadas = unificadas.sort_values()
+            categorias[dimensao] = unificadas
+            partes = []
+            for cubo in cubos:
+                mapa = np.append(unificadas.get_indexer(cubo.categorias[dimensao]), -1)  # -1 continua nulo
+                partes.append(mapa[cubo.codigos[dimensao]])
+            codigos[dimensao] = np.concatenate(partes).astype(np.min_scalar_type(-max(len(unificadas), 1))) \
+                if partes else np.empty(0, dtype=np.int8)
+        medidas = {medida: np.concatenate([c.medidas[medida] for c in cubos]) if cubos else np.empty(0, np.int32)
+                   for medida in MEDIDAS}
+        return Cubo(codigos, categorias, medidas)
+
+
+# === Construção ===
+MAX_LINHAS_PARCIAIS = 4 * LINHAS_POR_BLOCO    # parciais acumuladas antes de serem recombinadas
+
+
+def _parcial(lote):
+    # Bloco de linhas (Arrow) -> agregado parcial: uma linha por combinação
+    # das dimensões presente no bloco. Dimensões ausentes ficam nulas.
+    colunas = [lote.column(d) if d in lote.column_names else pa.nulls(lote.num_rows, pa.string()) for d in DIMENSOES]
+    base = pa.table(colunas + [lote.column(m) for m in MEDIDAS[1:]], names=DIMENSOES + MEDIDAS[1:])
+    agregado = base.group_by(DIMENSOES).aggregate([([], "count_all")] + [(m, "sum") for m in MEDIDAS[1:]])
+    return pa.table([agregado.column(d) for d in DIMENSOES] + [agregado.column("count_all")]
+                    + [agregado.column(f"{m}_sum") for m in MEDIDAS[1:]], names=DIMENSOES + MEDIDAS)
+
+
+def _combinar(parciais):
+    # Soma agregados parciais (dicionários de blocos diferentes são unificados)
+    tabela = pa.concat_tables(parciais).unify_dictionaries()
+    agregado = tabela.group_by(DIMENSOES).aggregate([(m, "sum") for m in MEDIDAS])
+    return pa.table([agregado.column(d) for d in DIMENSOES] + [agregado.column(f"{m}_sum") for m in MEDIDAS],
+                    names=DIMENSOES + MEDIDAS)
+
+
+def montar_tabela(lotes):
+    # Blocos de linhas -> tabela do cubo. Cada bloco é agregado assim que
+    # chega e as parciais são recombinadas quando passam de
+    # MAX_LINHAS_PARCIAIS, então a memória fica limitada ao bloco e ao tamanho
+    # do próprio cubo. Inteiros (ano, mês, BR) viram dicionários, como as
+    # categorias, e as medidas são guardadas como int32.
+    parciais, linhas = [], 0
+    for lote in lotes:
+        parciais.append(_parcial(lote))
+        linhas += parciais[-1].num_rows
+        if linhas > MAX_LINHAS_PARCIAIS and len(parciais) > 1:
+            parciais = [_combinar(parciais)]
+            linhas = parciais[0].num_rows
+    agregado = _combinar(parciais)
+
+    saida = []
+    for dimensao in DIMENSOES:
+        coluna = agregado.column(dimensao)
+        if not pa.types.is_dictionary(coluna.type):
+            coluna = coluna.dictionary_encode()
+        saida.append(coluna)
+    saida += [agregado.column(m).cast(pa.int32()) for m in MEDIDAS]
+    return pa.table(saida, names=DIMENSOES + MEDIDAS)
+
+
+def cubo_ano(arquivo, caminho=CAMINHO_DADOS, cache=CAMINHO_CACHE, pasta=CAMINHO_CUBO, linhas_por_bloco=LINHAS_POR_BLOCO):
+    # Cubo de um ano (ex.: "datatran2023.csv"), montado na primeira vez a
+    # partir do Parquet do ano, lido em blocos de `linhas_por_bloco` linhas,
+    # e lido do cache (memory map) nas seguintes. Um ano ainda não convertido
+    # é convertido também em blocos, como no modo streaming.
+    destino, = atualizar_cache(caminho, cache, processos=1, tamanho_bloco=TAMANHO_BLOCO_CSV, arquivos=[arquivo])
+    prefixo = f"{os.path.splitext(arquivo)[0]}-"
+    arquivo_cubo = os.path.join(pasta, f"{prefixo}{versao_parquet(destino)}.arrow")
+    if not os.path.exists(arquivo_cubo):
+        os.makedirs(pasta, exist_ok=True)
+        parquet = pq.ParquetFile(destino, memory_map=True)
+        disponiveis = set(parquet.schema_arrow.names)
+        lotes = parquet.iter_batches(batch_size=linhas_por_bloco,
+                                     columns=[c for c in DIMENSOES + MEDIDAS[1:] if c in disponiveis])
+        tabela = montar_tabela(pa.Table.from_batches([lote]) for lote in lotes)
+        temporario = f"{arquivo_cubo}.{os.getpid()}.tmp"
+        with pa.OSFile(temporario, "wb") as saida, pa.ipc.new_file(saida, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+        os.replace(temporario, arquivo_cubo)
+        remover_versoes_antigas(pasta, prefixo, arquivo_cubo)
+    return Cubo.de_tabela(pa.ipc.open_file(pa.memory_map(arquivo_cubo)).read_all())
+
+
+def carregar_cubo(caminho=CAMINHO_DADOS, cache=CAMINHO_CACHE, pasta=CAMINHO_CUBO, processos=None, tamanho_bloco=None,
+                  linhas_por_bloco=LINHAS_POR_BLOCO):
+    # Cubo de todos os anos: converte antes os anos pendentes (em paralelo,
+    # ou em blocos com tamanho_bloco, como no modo streaming) e então junta
+    # os cubos anuais, montando os que faltam
+    atualizar_cache(caminho, cache, processos, tamanho_bloco)
+    return Cubo.juntar(cubo_ano(arquivo, caminho, cache, pasta, linhas_por_bloco) for arquivo in listar_arquivos(caminho))
+
+
+# === Conferência ===
+def _por_chave(tabela, por):
+    # Grupos identificados pelo texto dos valores: o cubo e o groupby podem
+    # usar tipos diferentes para a mesma dimensão (ex.: int16 e Int16)
+    tabela = tabela.reset_index()
+    chave = tabela[por].astype(str).agg("|".join, axis=1)
+    return tabela[MEDIDAS].astype(np.int64).set_axis(chave).sort_index()
+
+
+def conferir(cubo, df, filtros, por):
+    # True quando cubo.fatia(**filtros).somar(por) tem os mesmos grupos e
+    # totais que um groupby sobre as linhas (df: base limpa com as DIMENSOES
+    # e as medidas mortos, feridos_graves e gravidade)
+    por = [por] if isinstance(por, str) else list(por)
+    selecao = np.ones(len(df), dtype=bool)
+    for dimensao, valores in filtros.items():
+        selecao &= df[dimensao].isin(_lista(valores)).to_numpy()
+    grupos = df[selecao].groupby(por, observed=True)
+    esperado = grupos.size().rename("acidentes").to_frame().join(grupos[MEDIDAS[1:]].sum())
+    return _por_chave(cubo.fatia(**filtros).somar(por), por).equals(_por_chave(esperado, por))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cubo de agregados dos acidentes da PRF")
+    parser.add_argument("--conferir", action="store_true",
+                        help="compara recortes do cubo com um groupby sobre a base inteira")
+    args = parser.parse_args()
+
+    cubo = carregar_cubo()
+    print(f"Cubo com {len(cubo):,} combinações de {cubo.total()['acidentes']:,} acidentes".replace(",", "."))
+    if args.conferir:
+        df = carregar_dados(DIMENSOES + MEDIDAS[1:])
+        uf, ano = cubo.top("uf", "acidentes", 1).index[0], int(cubo.somar("ano").index.max())
+        recortes = [({}, ["uf", "ano"]), ({"uf": uf}, "br"), ({"ano": ano}, "mes"),
+                    ({"uf": uf, "ano": ano}, ["tipo_acidente", "dia_semana"]), ({"uf": "XX"}, "br")]
+        falhas = 0
+        for filtros, por in recortes:
+            igual = conferir(cubo, df, filtros, por)
+            falhas += not igual
+            print(f"{'✅' if igual else '❌'} fatia({filtros}).somar({por})")
+        if falhas:
+            raise SystemExit(f"{falhas} recorte(s) diferente(s) da base")
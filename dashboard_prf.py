@@ -1,69 +1,183 @@
 # dashboard_prf.py
 
+import os                               # Caminhos e variáveis de ambiente
+import threading                        # Carga dos dados em segundo plano
+from functools import lru_cache         # Cache das respostas do callback
+
 import dash                             # Framework para criar dashboards web em Python
-from dash import html, dcc, Input, Output  # Componentes do Dash
-import pandas as pd                    # Manipulação de dados
-import plotly.express as px            # Gráficos interativos
-import os                              # Acesso a arquivos e diretórios
-
-# === Carregamento e união dos dados de todos os anos ===
-caminho = "dados"  # Pasta onde estão os arquivos .csv
-arquivos = [arq for arq in os.listdir(caminho) if arq.endswith(".csv") and "Radares" not in arq]
-dfs = []
-
-for arq in arquivos:
-    ano = arq[-8:-4]  # Extrai o ano do nome do arquivo
-    df = pd.read_csv(os.path.join(caminho, arq), sep=';', encoding='latin1', low_memory=False)
-    
-    df["ano"] = int(ano)
-    df["mortos"] = pd.to_numeric(df["mortos"], errors="coerce").fillna(0).astype(int)
-    df["feridos_graves"] = pd.to_numeric(df["feridos_graves"], errors="coerce").fillna(0).astype(int)
-    df["gravidade"] = df["mortos"] + df["feridos_graves"]
-    
-    dfs.append(df)
-
-df = pd.concat(dfs, ignore_index=True)  # Une todos os anos em um único DataFrame
-anos = sorted(df["ano"].unique())       # Lista de anos únicos para o dropdown
+from dash import html, dcc, Input, Output, State, ctx  # Componentes do Dash
+from dash.exceptions import PreventUpdate
+from flask import jsonify               # Resposta do endpoint de prontidão
+
+# pandas, plotly.express, pyarrow (ingestao_prf) e scipy (indice_espacial_prf)
+# só são importados na thread de carga ou no primeiro callback que os usa:
+# o servidor sobe sem esperar por eles.
+
+# === Carregamento dos dados em segundo plano ===
+# Os CSVs de dados/ são convertidos uma única vez para Parquet (ingestao_prf)
+# e as colunas usadas pelo dashboard são gravadas, também uma única vez, num
+# arquivo Arrow por ano aberto por memory map (mapear_ano). Os DataFrames dos
+# anos apontam para esse arquivo, sem cópia: com vários workers (gunicorn
+# -w N dashboard_prf:server) todos leem as mesmas páginas de memória, e cada
+# um só guarda as suas estruturas derivadas (grades, índice espacial). Os
+# KPIs e a gravidade por ano vêm do cubo de agregados do ano (cubo_prf), que
+# também responde aos filtros de UF e BR; os hotspots filtrados saem das
+# linhas do ano pelo índice de partições (particoes_prf), sem varrer o ano.
+# O servidor começa a responder na hora; uma thread carrega um ano por vez,
+# do mais recente (a visão padrão) para o mais antigo, e a página mostra
+# "carregando" até o primeiro ano chegar e vai ganhando os anteriores.
+colunas = ["ano", "uf", "br", "gravidade", "latitude", "longitude"]
+TAMANHO_CACHE = 32                      # Respostas por ano guardadas em memória (LRU)
+INTERVALO_CARGA_MS = 1000               # Frequência com que a página verifica anos novos
+
+
+class EstadoCarga:
+    # Preenchido só pela thread de carga; os callbacks apenas leem (os dados
+    # dos anos são somente leitura). Um ano só aparece em `particoes` depois
+    # de estar com KPIs e grades prontos.
+    def __init__(self):
+        self.trava = threading.Lock()
+        self.anos_previstos = []        # anos encontrados em dados/, do mais recente ao mais antigo
+        self.particoes = {}             # ano -> IndiceParticoes sobre o DataFrame do ano (mapeado em memória)
+        self.cubos = {}                 # ano -> Cubo do ano (KPIs e opções dos filtros de UF/BR)
+        self.gravidade_ano = {}         # ano -> soma da gravidade
+        self.grades = None              # GradesPorAno (mapa de calor)
+        self.erro = None
+        self.concluida = False
+
+    def anos_carregados(self):
+        with self.trava:
+            return sorted(self.particoes)
+
+    def carregado(self, ano):
+        with self.trava:
+            return ano in self.particoes
+
+    def situacao(self):
+        with self.trava:
+            return {
+                "pronto": bool(self.particoes),            # a visão padrão (ano mais recente) já responde
+                "completo": self.concluida and self.erro is None,
+                "anos_carregados": sorted(self.particoes),
+                "anos_pendentes": [ano for ano in self.anos_previstos if ano not in self.particoes],
+                "erro": self.erro,
+            }
+
+
+estado = EstadoCarga()
+
+
+def carregar_anos(caminho="dados"):
+    # Executado na thread de carga. Os anos são convertidos aqui mesmo, um
+    # por vez: um pool de processos com fork a partir de um servidor com
+    # threads poderia herdar travas em uso. Entre workers, o primeiro a pedir
+    # um ano o converte e os demais esperam e reaproveitam o arquivo.
+    try:
+        from binagem_espacial_prf import GradesPorAno
+        from cubo_prf import cubo_ano
+        from ingestao_prf import ano_do_arquivo, listar_arquivos, mapear_ano
+        from particoes_prf import IndiceParticoes
+
+        arquivos = sorted(listar_arquivos(caminho), key=ano_do_arquivo, reverse=True)
+        with estado.trava:
+            estado.anos_previstos = [ano_do_arquivo(arq) for arq in arquivos]
+            estado.grades = GradesPorAno()
+
+        for arq in arquivos:
+            ano = ano_do_arquivo(arq)
+            df_ano = mapear_ano(arq, colunas, caminho)
+            estado.grades.adicionar_ano(ano, df_ano)
+            cubo = cubo_ano(arq, caminho)
+            with estado.trava:
+                estado.cubos[ano] = cubo
+                estado.gravidade_ano[ano] = cubo.total()["gravidade"]
+                estado.particoes[ano] = IndiceParticoes(df_ano)
+            print(f"📅 Ano {ano} carregado ({len(df_ano):,} acidentes)".replace(",", "."))
+    except Exception as erro:           # a página e o /pronto mostram o erro em vez de carregar para sempre
+        with estado.trava:
+            estado.erro = f"{type(erro).__name__}: {erro}"
+        raise
+    finally:
+        with estado.trava:
+            estado.concluida = True
+
+
+def iniciar_carga():
+    thread = threading.Thread(target=carregar_anos, name="carga-dados", daemon=True)
+    thread.start()
+    return thread
+
 
 # === Iniciar o app Dash ===
 app = dash.Dash(__name__)
 app.title = "Dashboard PRF"
+server = app.server                     # aplicação WSGI (gunicorn dashboard_prf:server)
+
+
+# === Prontidão ===
+# 200 assim que o ano mais recente responde (503 antes disso ou em caso de
+# erro); o corpo traz o andamento da carga dos demais anos
+@app.server.route("/pronto")
+def pronto():
+    situacao = estado.situacao()
+    codigo = 200 if situacao["pronto"] and situacao["erro"] is None else 503
+    return jsonify(situacao), codigo
+
 
 # === Layout do Dashboard ===
 app.layout = html.Div([
     html.H1("📊 Acidentes Rodoviários PRF (2007–2023)", style={'textAlign': 'center'}),
 
+    # Verifica anos novos até a carga terminar (e então se desliga)
+    dcc.Interval(id="intervalo-carga", interval=INTERVALO_CARGA_MS),
+    html.Div(id="situacao-carga", children="⏳ Carregando dados...",
+             style={'textAlign': 'center', 'color': '#666'}),
+
     html.Div([
         html.Label("Selecione o Ano:"),
         dcc.Dropdown(
             id='dropdown-ano',
-            options=[{"label": str(ano), "value": ano} for ano in anos],
-            value=anos[-1],  # último ano como padrão
-            clearable=False
+            options=[],             # preenchido conforme os anos são carregados
+            value=None,             # último ano como padrão, assim que disponível
+            clearable=False,
+            placeholder="Carregando anos..."
         )
     ], style={'width': '30%', 'margin': 'auto'}),
 
+    # Filtros opcionais: indicadores, hotspots e trechos do recorte (o mapa
+    # de calor continua com o ano inteiro)
+    html.Div([
+        dcc.Dropdown(id='dropdown-uf', options=[], value=None, placeholder="Todas as UFs"),
+        dcc.Dropdown(id='dropdown-br', options=[], value=None, placeholder="Todas as BRs"),
+    ], style={'width': '30%', 'margin': 'auto', 'marginTop': 10}),
+
     html.Div(id="indicadores", style={'display': 'flex', 'justifyContent': 'space-around', 'marginTop': 30}),
 
+    # A série anual não depende do ano escolhido: só muda quando chegam anos novos
     dcc.Graph(id="grafico_linha"),
-    dcc.Graph(id="mapa_calor")
+    dcc.Graph(id="mapa_calor"),
+
+    html.H3("🔥 Principais Hotspots do Ano", style={'textAlign': 'center'}),
+    html.Div(id="hotspots", style={'width': '70%', 'margin': 'auto'}),
+
+    html.H3("🛣️ Trechos Críticos do Ano (BR + km)", style={'textAlign': 'center'}),
+    html.Div(id="trechos", style={'width': '70%', 'margin': 'auto'})
 ])
 
-# === Callback para atualizar os componentes interativos ===
-@app.callback(
-    Output("indicadores", "children"),
-    Output("grafico_linha", "figure"),
-    Output("mapa_calor", "figure"),
-    Input("dropdown-ano", "value")
-)
-def atualizar_dashboard(ano_selecionado):
-    df_ano = df[df["ano"] == ano_selecionado]
+# === Indicadores de um ano (memoizados) ===
+# Os callbacks só chamam as funções memoizadas para anos já carregados neste
+# processo, cujos dados não mudam mais. Com gunicorn -w N cada worker carrega
+# os anos no seu ritmo e o navegador pode pedir um ano que este worker ainda
+# não tem: a resposta é um aviso, que não fica em cache.
+def _filtros(uf, br):
+    return {chave: valor for chave, valor in (("uf", uf), ("br", br)) if valor is not None}
 
-    total_acidentes = len(df_ano)
-    total_mortos = df_ano["mortos"].sum()
-    total_feridos = df_ano["feridos_graves"].sum()
+@lru_cache(maxsize=TAMANHO_CACHE)
+def indicadores_ano(ano_selecionado, uf=None, br=None):
+    total = estado.cubos[ano_selecionado].fatia(**_filtros(uf, br)).total()
+    total_acidentes, total_mortos, total_feridos = total["acidentes"], total["mortos"], total["feridos_graves"]
 
-    indicadores = [
+    return [
         html.Div([
             html.H3("Total de Acidentes"),
             html.P(f"{total_acidentes:,}".replace(",", ".")),
@@ -80,26 +194,186 @@ def atualizar_dashboard(ano_selecionado):
         ], style={"textAlign": "center"}),
     ]
 
-    # Gráfico de linha: gravidade por ano
-    df_agrupado = df.groupby("ano")["gravidade"].sum().reset_index()
-    fig_linha = px.line(
-        df_agrupado, x="ano", y="gravidade",
+# === Série anual (memoizada pelo conjunto de anos carregados) ===
+@lru_cache(maxsize=4)
+def grafico_linha(anos_carregados):
+    import plotly.express as px
+    return px.line(
+        x=list(anos_carregados), y=[estado.gravidade_ano[ano] for ano in anos_carregados],
         title="Gravidade Total por Ano",
-        labels={"gravidade": "Mortos + Feridos Graves", "ano": "Ano"}
+        labels={"y": "Mortos + Feridos Graves", "x": "Ano"}
     )
 
-    # Mapa de calor: localização dos acidentes
-    df_mapa = df_ano.dropna(subset=["latitude", "longitude"])
+# === Mapa de calor de um ano/resolução/área (memoizado) ===
+@lru_cache(maxsize=TAMANHO_CACHE)
+def mapa_ano(ano_selecionado, resolucao, limites):
+    # Só as células agregadas visíveis vão para o navegador
+    import plotly.express as px
+    from binagem_espacial_prf import PIXELS_POR_CELULA
+    df_mapa = estado.grades.celulas(ano_selecionado, resolucao, limites)
     fig_mapa = px.density_mapbox(
         df_mapa, lat="latitude", lon="longitude", z="gravidade",
-        radius=5,
+        radius=PIXELS_POR_CELULA * 1.5,
         center=dict(lat=-15.5, lon=-47.5), zoom=4,
         mapbox_style="open-street-map",
         title="Mapa de Calor de Acidentes"
     )
+    fig_mapa.update_layout(uirevision="mapa")  # mantém o zoom/posição do usuário ao atualizar
+    return fig_mapa
+
+# === Opções dos filtros de um ano (memoizadas): UFs do ano, BRs da UF ===
+@lru_cache(maxsize=TAMANHO_CACHE)
+def opcoes_filtros(ano_selecionado, uf=None):
+    cubo = estado.cubos[ano_selecionado]
+    ufs = cubo.somar("uf").index
+    brs = cubo.fatia(**_filtros(uf, None)).somar("br").index
+    return ([{"label": str(valor), "value": valor} for valor in ufs],
+            [{"label": f"BR-{int(valor):03d}", "value": int(valor)} for valor in brs])
+
+# === Hotspots de um ano (memoizados) ===
+@lru_cache(maxsize=TAMANHO_CACHE)
+def hotspots_ano(ano_selecionado, uf=None, br=None):
+    from indice_espacial_prf import IndiceEspacial
+    linhas = estado.particoes[ano_selecionado].filtrar(ano_selecionado, **_filtros(uf, br))
+    if linhas.empty:
+        return html.P("Nenhum acidente neste recorte.", style={'textAlign': 'center'})
+    hotspots = IndiceEspacial(linhas).hotspots(top=10)
+    colunas_tabela = ["Latitude", "Longitude", "Acidentes", "Gravidade", "Raio (km)"]
+    return html.Table([
+        html.Tr([html.Th(col) for col in colunas_tabela])
+    ] + [
+        html.Tr([
+            html.Td(f"{linha.latitude:.4f}"),
+            html.Td(f"{linha.longitude:.4f}"),
+            html.Td(f"{linha.acidentes:,}".replace(",", ".")),
+            html.Td(f"{linha.gravidade:,.0f}".replace(",", ".")),
+            html.Td(f"{linha.raio_km:.2f}"),
+        ]) for linha in hotspots.itertuples()
+    ], style={'width': '100%', 'textAlign': 'center'})
+
+# === Trechos críticos de um ano (memoizados) ===
+# Lidos de resultados/trechos_criticos.csv (trechos_prf.py), se já calculados.
+# A data de modificação do arquivo entra na chave: um novo cálculo aparece
+# sem reiniciar o servidor.
+@lru_cache(maxsize=1)
+def trechos_salvos(versao):
+    from trechos_prf import carregar_trechos
+    return carregar_trechos()
+
+@lru_cache(maxsize=TAMANHO_CACHE)
+def tabela_trechos(ano_selecionado, br, versao):
+    from trechos_prf import ranking, rotulo_trecho
+    trechos = trechos_salvos(versao)
+    colunas_tabela = ["Trecho", "Acidentes", "Mortos", "Feridos Graves", "Gravidade"]
+    return html.Table([
+        html.Tr([html.Th(col) for col in colunas_tabela])
+    ] + [
+        html.Tr([
+            html.Td(rotulo_trecho(linha)),
+            html.Td(f"{linha.acidentes:,}".replace(",", ".")),
+            html.Td(f"{linha.mortos:,}".replace(",", ".")),
+            html.Td(f"{linha.feridos_graves:,}".replace(",", ".")),
+            html.Td(f"{linha.gravidade:,}".replace(",", ".")),
+        ]) for linha in ranking(trechos, ano=ano_selecionado, br=br).itertuples()
+    ], style={'width': '100%', 'textAlign': 'center'})
+
+def trechos_ano(ano_selecionado, br=None):
+    # Os trechos são por BR: o filtro de UF não se aplica a eles
+    from trechos_prf import ARQUIVO_TRECHOS
+    if not os.path.exists(ARQUIVO_TRECHOS):
+        return html.P("Trechos ainda não calculados: execute python trechos_prf.py.", style={'textAlign': 'center'})
+    return tabela_trechos(ano_selecionado, br, os.path.getmtime(ARQUIVO_TRECHOS))
+
+# === Callbacks para atualizar os componentes interativos ===
+@app.callback(
+    Output("situacao-carga", "children"),
+    Output("dropdown-ano", "options"),
+    Output("dropdown-ano", "value"),
+    Output("grafico_linha", "figure"),
+    Output("intervalo-carga", "disabled"),
+    Input("intervalo-carga", "n_intervals"),
+    State("dropdown-ano", "value"),
+    State("dropdown-ano", "options"),
+)
+def acompanhar_carga(_, ano_selecionado, opcoes):
+    # Acrescenta os anos que ficaram prontos desde a última verificação
+    situacao = estado.situacao()
+    anos = tuple(situacao["anos_carregados"])
+    if situacao["erro"]:
+        texto = f"❌ Erro ao carregar os dados: {situacao['erro']}"
+    elif situacao["anos_pendentes"] or not situacao["completo"]:
+        total = len(anos) + len(situacao["anos_pendentes"])
+        texto = f"⏳ Carregando dados: {len(anos)} de {total or '?'} anos prontos..."
+    else:
+        texto = ""
+    terminou = situacao["completo"] or situacao["erro"] is not None
+    if len(anos) == len(opcoes or []) and not terminou:
+        raise PreventUpdate
+
+    novas_opcoes = [{"label": str(ano), "value": ano} for ano in anos]
+    if ano_selecionado is None and anos:
+        ano_selecionado = anos[-1]      # último ano como padrão
+    figura = grafico_linha(anos) if anos else {}
+    return texto, novas_opcoes, ano_selecionado, figura, terminou
+
+@app.callback(
+    Output("dropdown-uf", "options"),
+    Output("dropdown-br", "options"),
+    Output("dropdown-br", "value"),
+    Input("dropdown-ano", "value"),
+    Input("dropdown-uf", "value"),
+    State("dropdown-br", "value"),
+)
+def atualizar_filtros(ano_selecionado, uf, br):
+    # A BR escolhida é mantida só se ainda existir no novo recorte
+    if ano_selecionado is None or not estado.carregado(ano_selecionado):
+        raise PreventUpdate
+    opcoes_uf, opcoes_br = opcoes_filtros(ano_selecionado, uf)
+    return opcoes_uf, opcoes_br, br if any(opcao["value"] == br for opcao in opcoes_br) else None
+
+@app.callback(
+    Output("indicadores", "children"),
+    Output("hotspots", "children"),
+    Output("trechos", "children"),
+    Input("dropdown-ano", "value"),
+    Input("dropdown-uf", "value"),
+    Input("dropdown-br", "value"),
+)
+def atualizar_dashboard(ano_selecionado, uf, br):
+    if ano_selecionado is None:         # nenhum ano carregado ainda
+        raise PreventUpdate
+    if not estado.carregado(ano_selecionado):
+        aviso = html.P(f"⏳ Ano {ano_selecionado} ainda carregando...", style={'textAlign': 'center'})
+        return aviso, aviso, trechos_ano(ano_selecionado, br)
+    return (indicadores_ano(ano_selecionado, uf, br), hotspots_ano(ano_selecionado, uf, br),
+            trechos_ano(ano_selecionado, br))
+
+@app.callback(
+    Output("mapa_calor", "figure"),
+    Input("dropdown-ano", "value"),
+    Input("mapa_calor", "relayoutData")
+)
+def atualizar_mapa(ano_selecionado, relayout_data):
+    # Eventos de relayout sem mudança de zoom/posição (ex.: autosize) não redesenham o mapa
+    if ano_selecionado is None or not estado.carregado(ano_selecionado):
+        raise PreventUpdate
+    if ctx.triggered_id == "mapa_calor" and "mapbox.zoom" not in (relayout_data or {}) \
+            and "mapbox.center" not in (relayout_data or {}):
+        raise PreventUpdate
+
+    from binagem_espacial_prf import arredondar_limites, vista_do_mapa
+    zoom, centro, limites = vista_do_mapa(relayout_data)
+    resolucao = estado.grades.resolucao_para_zoom(zoom)
+    return mapa_ano(ano_selecionado, resolucao, arredondar_limites(limites, resolucao))
 
-    return indicadores, fig_linha, fig_mapa
+# === Início da carga ===
+# Com debug=True o werkzeug executa este arquivo duas vezes; o processo que
+# só observa mudanças nos arquivos não serve páginas e não precisa carregar
+DEBUG = True
+carga = None
+if not (__name__ == "__main__" and DEBUG and os.environ.get("WERKZEUG_RUN_MAIN") != "true"):
+    carga = iniciar_carga()
 
 # === Rodar o app ===
 if __name__ == "__main__":
-    app.run(debug=True)
+    app.run(debug=DEBUG)
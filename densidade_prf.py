@@ -0,0 +1,174 @@
+# densidade_prf.py
+# Mapa de densidade (KDE) dos acidentes em grade: os pontos são contados numa
+# grade fixa de latitude/longitude e a grade é suavizada por convolução com um
+# núcleo gaussiano via FFT. O custo da suavização depende só do tamanho da
+# grade, não do número de acidentes.
+#
+# As grades (sem suavização) de cada ano ficam em cache no disco; o mapa de
+# vários anos é a soma das grades dos anos, suavizada uma única vez.
+
+import json
+import os
+
+import numpy as np
+import pyarrow.parquet as pq
+from scipy.signal import fftconvolve
+
+from ingestao_prf import CAMINHO_CACHE, CAMINHO_DADOS, anos_em_cache
+
+# === CONFIGURAÇÃO ===
+LIMITES_BRASIL = (-34.0, 6.0, -74.5, -34.0)   # lat_min, lat_max, lon_min, lon_max
+RESOLUCAO_DENSIDADE = 0.05                     # graus por célula (~5,5 km)
+CAMINHO_DENSIDADE = os.path.join("cache", "densidade")
+LINHAS_POR_LOTE = 500_000
+
+
+# === Grade ===
+def forma_grade(limites=LIMITES_BRASIL, resolucao=RESOLUCAO_DENSIDADE):
+    lat_min, lat_max, lon_min, lon_max = limites
+    return round((lat_max - lat_min) / resolucao), round((lon_max - lon_min) / resolucao)
+
+
+def centros_grade(limites=LIMITES_BRASIL, resolucao=RESOLUCAO_DENSIDADE):
+    # Latitudes (linhas) e longitudes (colunas) do centro de cada célula
+    n_lat, n_lon = forma_grade(limites, resolucao)
+    return (limites[0] + (np.arange(n_lat) + 0.5) * resolucao,
+            limites[2] + (np.arange(n_lon) + 0.5) * resolucao)
+
+
+def binar(latitude, longitude, pesos=None, limites=LIMITES_BRASIL, resolucao=RESOLUCAO_DENSIDADE):
+    # Soma (ou conta) os acidentes por célula; pontos sem coordenada ou fora
+    # dos limites são ignorados
+    lat_min, _, lon_min, _ = limites
+    n_lat, n_lon = forma_grade(limites, resolucao)
+    latitude = np.asarray(latitude, dtype=np.float64)
+    longitude = np.asarray(longitude, dtype=np.float64)
+
+    linha = np.floor((latitude - lat_min) / resolucao)
+    coluna = np.floor((longitude - lon_min) / resolucao)
+    dentro = (linha >= 0) & (linha < n_lat) & (coluna >= 0) & (coluna < n_lon)   # NaN fica fora
+    indice = linha[dentro].astype(np.int64) * n_lon + coluna[dentro].astype(np.int64)
+    if pesos is not None:
+        pesos = np.asarray(pesos, dtype=np.float64)[dentro]
+    return np.bincount(indice, weights=pesos, minlength=n_lat * n_lon).reshape(n_lat, n_lon).astype(np.float64)
+
+
+# === Suavização ===
+def largura_banda(contagens, ajuste=0.3, limites=LIMITES_BRASIL, resolucao=RESOLUCAO_DENSIDADE):
+    # Regra de Scott, como no kdeplot (gaussian_kde): desvio padrão dos pontos
+    # * n^(-1/6) * ajuste, por eixo. Calculada a partir da grade de contagens.
+    # Devolve (sigma_lat, sigma_lon) em células.
+    latitudes, longitudes = centros_grade(limites, resolucao)
+    n = contagens.sum()
+    if n < 2:
+        return 1.0, 1.0
+    por_lat, por_lon = contagens.sum(axis=1), contagens.sum(axis=0)
+    desvio_lat = np.sqrt(np.average((latitudes - np.average(latitudes, weights=por_lat)) ** 2, weights=por_lat))
+    desvio_lon = np.sqrt(np.average((longitudes - np.average(longitudes, weights=por_lon)) ** 2, weights=por_lon))
+    fator = n ** (-1 / 6) * ajuste
+    return max(desvio_lat * fator / resolucao, 0.5), max(desvio_lon * fator / resolucao, 0.5)
+
+
+def _nucleo(sigma):
+    raio = int(np.ceil(4 * sigma))
+    eixo = np.arange(-raio, raio + 1)
+    nucleo = np.exp(-0.5 * (eixo / sigma) ** 2)
+    return nucleo / nucleo.sum()
+
+
+def suavizar(grade, sigma_lat, sigma_lon):
+    # Convolução gaussiana (sigma em células) via FFT
+    nucleo = np.outer(_nucleo(sigma_lat), _nucleo(sigma_lon))
+    return np.clip(fftconvolve(grade, nucleo, mode="same"), 0, None)   # ruído numérico da FFT < 0
+
+
+def densidade(contagens, pesos=None, ajuste=0.3, limites=LIMITES_BRASIL, resolucao=RESOLUCAO_DENSIDADE):
+    # Densidade suavizada de `contagens` (ou de `pesos`, ex.: gravidade por
+    # célula), com a largura de banda calculada sobre as contagens
+    sigma_lat, sigma_lon = largura_banda(contagens, ajuste, limites, resolucao)
+    return suavizar(contagens if pesos is None else pesos, sigma_lat, sigma_lon)
+
+
+def niveis_proporcao(densidade_grade, niveis=10, limiar=0.05):
+    # Níveis de isoproporção como no kdeplot: cada contorno delimita a região
+    # que contém uma fração fixa da massa total
+    valores = np.sort(densidade_grade.ravel())[::-1]
+    acumulado = np.cumsum(valores) / valores.sum()
+    proporcoes = np.linspace(limiar, 1, niveis)
+    limites_niveis = np.take(valores, np.searchsorted(acumulado, 1 - proporcoes), mode="clip")
+    return np.unique(np.append(limites_niveis, valores[0]))
+
+
+def plotar_densidade(ax, densidade_grade, cmap="Reds", alpha=0.5, niveis=10, limiar=0.05,
+                     limites=LIMITES_BRASIL, resolucao=RESOLUCAO_DENSIDADE):
+    # Contornos preenchidos no mesmo estilo do kdeplot(fill=True)
+    latitudes, longitudes = centros_grade(limites, resolucao)
+    ax.contourf(longitudes, latitudes, densidade_grade, levels=niveis_proporcao(densidade_grade, niveis, limiar),
+                cmap=cmap, alpha=alpha)
+    return ax
+
+
+# === Cache por ano ===
+class CacheDensidade:
+    # Grades de contagem e de gravidade de cada ano, gravadas em .npz e
+    # refeitas só quando o Parquet do ano muda (ou a grade muda)
+    def __init__(self, pasta=CAMINHO_DENSIDADE, limites=LIMITES_BRASIL, resolucao=RESOLUCAO_DENSIDADE):
+        self.pasta = pasta
+        self.limites = tuple(limites)
+        self.resolucao = resolucao
+        self._indice_arquivo = os.path.join(self.pasta, "indice.json")
+
+    def _ler_indice(self):
+        try:
+            with open(self._indice_arquivo, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _salvar_indice(self, indice):
+        with open(self._indice_arquivo + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(indice, f, indent=2)
+        os.replace(self._indice_arquivo + ".tmp", self._indice_arquivo)
+
+    def _binar_ano(self, parquet):
+        # Lê só latitude, longitude e gravidade, em lotes
+        contagens = np.zeros(forma_grade(self.limites, self.resolucao))
+        gravidade = np.zeros_like(contagens)
+        arquivo = pq.ParquetFile(parquet, memory_map=True)
+        for lote in arquivo.iter_batches(batch_size=LINHAS_POR_LOTE, columns=["latitude", "longitude", "gravidade"]):
+            lat = lote.column("latitude").to_numpy(zero_copy_only=False)
+            lon = lote.column("longitude").to_numpy(zero_copy_only=False)
+            contagens += binar(lat, lon, None, self.limites, self.resolucao)
+            gravidade += binar(lat, lon, lote.column("gravidade").to_numpy(zero_copy_only=False),
+                               self.limites, self.resolucao)
+        return contagens, gravidade
+
+    def grades(self, anos=None, caminho=CAMINHO_DADOS, cache=CAMINHO_CACHE):
+        # {ano: (contagens, gravidade)}; anos=None usa todos os anos disponíveis
+        os.makedirs(self.pasta, exist_ok=True)
+        indice = self._ler_indice()
+        disponiveis = anos_em_cache(caminho, cache)
+        resultado = {}
+        for ano in sorted(disponiveis if anos is None else anos):
+            parquet, versao = disponiveis[ano]
+            chave = f"{versao}|{self.limites}|{self.resolucao}"
+            arquivo = os.path.join(self.pasta, f"{ano}.npz")
+            if indice.get(str(ano)) == chave and os.path.exists(arquivo):
+                with np.load(arquivo) as dados:
+                    resultado[ano] = (dados["contagens"], dados["gravidade"])
+                continue
+            contagens, gravidade = self._binar_ano(parquet)
+            np.savez_compressed(arquivo, contagens=contagens, gravidade=gravidade)
+            indice[str(ano)] = chave
+            resultado[ano] = (contagens, gravidade)
+        self._salvar_indice(indice)
+        return resultado
+
+    def somar(self, anos=None, caminho=CAMINHO_DADOS, cache=CAMINHO_CACHE):
+        # Grades de vários anos: soma das grades em cache
+        contagens = np.zeros(forma_grade(self.limites, self.resolucao))
+        gravidade = np.zeros_like(contagens)
+        for grade_contagens, grade_gravidade in self.grades(anos, caminho, cache).values():
+            contagens += grade_contagens
+            gravidade += grade_gravidade
+        return contagens, gravidade
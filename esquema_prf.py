@@ -0,0 +1,65 @@
+# esquema_prf.py
+# Esquema declarado das colunas dos CSVs da PRF: texto de baixa cardinalidade
+# vira "category", contagens viram int8/int16 e coordenadas float32. A
+# conversão em si é feita por limpeza_prf, que reporta os valores que não se
+# encaixam no esquema em vez de descartá-los em silêncio.
+
+import pandas as pd
+
+# === Tipos declarados ===
+CATEGORICAS = [
+    "dia_semana", "horario", "uf", "municipio", "causa_acidente", "tipo_acidente",
+    "classificacao_acidente", "fase_dia", "sentido_via", "condicao_metereologica",
+    "tipo_pista", "tracado_via", "uso_solo", "regional", "delegacia", "uop",
+]
+
+CONTAGENS = {
+    "mortos": "int8",
+    "feridos_graves": "int8",
+    "feridos_leves": "int16",
+    "feridos": "int16",
+    "ilesos": "int16",
+    "ignorados": "int16",
+    "pessoas": "int16",
+    "veiculos": "int16",
+}
+
+INTEIROS_OPCIONAIS = {   # podem vir vazios, por isso usam os inteiros nulos do pandas
+    "id": "Int32",
+    "br": "Int16",
+}
+
+DECIMAIS = ["km", "latitude", "longitude"]  # vírgula decimal, guardados como float32
+
+DATAS = ["data_inversa"]
+
+DIAS_SEMANA = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Colunas derivadas na limpeza
+DERIVADAS = {
+    "ano": "int16",
+    "gravidade": "int16",
+    "mes": "Int8",
+    "dia_semana": pd.CategoricalDtype(DIAS_SEMANA),
+}
+
+COLUNAS_ESPERADAS = CATEGORICAS + list(CONTAGENS) + list(INTEIROS_OPCIONAIS) + DECIMAIS + DATAS
+
+# Contagens sem as quais a gravidade não pode ser calculada
+OBRIGATORIAS = ["mortos", "feridos_graves"]
+
+# Maior tipo usado quando uma contagem estoura o tipo declarado
+PROMOCAO_INTEIROS = {"int8": "int16", "int16": "int32", "int32": "int64"}
+
+# Colunas inteiras que aceitam nulo (restauradas como Int* do pandas na leitura)
+NULAVEIS = {**INTEIROS_OPCIONAIS, "mes": "Int8"}
+
+
+def formatar_problemas(problemas, origem=""):
+    linhas = []
+    for item in problemas:
+        texto = f"⚠️ {origem}: '{item['coluna']}' → {item['problema']}"
+        if "quantidade" in item:
+            texto += f" ({item['quantidade']} valores, ex: {', '.join(item['exemplos'])})"
+        linhas.append(texto)
+    return "\n".join(linhas)
@@ -0,0 +1,125 @@
+# features_prf.py
+# Features categóricas de largura limitada para os modelos de gravidade. Um
+# one-hot de municipio (milhares de valores) sobre milhões de linhas não cabe
+# na memória; aqui a largura não depende do número de categorias:
+#
+# - CodificadorFrequente: cada coluna vira um único código inteiro (as
+#   `max_categorias` mais frequentes do treino + "outras"), no formato que o
+#   HistGradientBoostingClassifier usa como feature categórica nativa.
+# - HashCategorico: as categorias são espalhadas por hashing numa matriz
+#   esparsa de `n_features` colunas (um valor não nulo por coluna de origem),
+#   junto das features numéricas padronizadas, para modelos lineares.
+#
+# Nos dois casos o trabalho é vetorizado por categoria distinta (não por
+# linha): cada valor é codificado ou tem seu hash calculado uma única vez.
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.utils import murmurhash3_32
+
+CATEGORICAS_MODELO = ["municipio", "causa_acidente", "tipo_acidente", "condicao_metereologica"]
+MAX_CATEGORIAS = 254          # + 1 código para "outras": cabe nos 255 bins do HistGradientBoosting
+LARGURA_HASH = 2 ** 16
+
+
+def _codigos(serie, categorias):
+    # Código de cada linha em `categorias` (-1 se ausente), sem converter a coluna inteira para texto
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        serie = serie.cat.set_categories(categorias)
+        return serie.cat.codes.to_numpy()
+    return pd.Categorical(serie, categories=categorias).codes
+
+
+class CodificadorFrequente(BaseEstimator, TransformerMixin):
+    # Numéricas passam direto; cada categórica vira o código da categoria
+    # entre as `max_categorias` mais frequentes, `max_categorias` para as
+    # demais (inclusive as nunca vistas) e NaN para nulos
+    def __init__(self, numericas, categoricas=CATEGORICAS_MODELO, max_categorias=MAX_CATEGORIAS):
+        self.numericas = numericas
+        self.categoricas = categoricas
+        self.max_categorias = max_categorias
+
+    def fit(self, X, y=None):
+        self.categorias_ = {
+            col: pd.Index(X[col].value_counts(sort=True).index[:self.max_categorias].astype(str))
+            for col in self.categoricas
+        }
+        return self
+
+    def transform(self, X):
+        saida = np.empty((len(X), len(self.numericas) + len(self.categoricas)), dtype=np.float32)
+        for i, col in enumerate(self.numericas):
+            saida[:, i] = X[col].to_numpy(dtype=np.float32, na_value=np.nan)
+        for j, col in enumerate(self.categoricas, start=len(self.numericas)):
+            serie = X[col]
+            if isinstance(serie.dtype, pd.CategoricalDtype):
+                serie = serie.cat.rename_categories(serie.cat.categories.astype(str))
+            codigos = _codigos(serie, self.categorias_[col]).astype(np.float32)
+            codigos[codigos < 0] = self.max_categorias
+            codigos[serie.isna().to_numpy()] = np.nan
+            saida[:, j] = codigos
+        return saida
+
+    def mascara_categoricas(self):
+        return [False] * len(self.numericas) + [True] * len(self.categoricas)
+
+
+class HashCategorico(BaseEstimator, TransformerMixin):
+    # Matriz esparsa [numéricas padronizadas | hash das categóricas]. Nulos
+    # das categóricas não geram coluna; o sinal alternado do hash (como no
+    # FeatureHasher) reduz o viés das colisões.
+    def __init__(self, numericas, categoricas=CATEGORICAS_MODELO, n_features=LARGURA_HASH):
+        self.numericas = numericas
+        self.categoricas = categoricas
+        self.n_features = n_features
+
+    def fit(self, X, y=None):
+        self.escala_ = StandardScaler().fit(X[self.numericas].to_numpy(dtype=np.float64, na_value=np.nan))
+        return self
+
+    def _hash(self, coluna, valores):
+        hashes = np.array([murmurhash3_32(f"{coluna}={valor}", seed=0) for valor in valores], dtype=np.int64)
+        return np.abs(hashes) % self.n_features, np.where(hashes >= 0, 1.0, -1.0)
+
+    def transform(self, X):
+        numericas = self.escala_.transform(X[self.numericas].to_numpy(dtype=np.float64, na_value=np.nan))
+        linhas, colunas, valores = [], [], []
+        for col in self.categoricas:
+            codigos, categorias = pd.factorize(X[col], use_na_sentinel=True)
+            balde, sinal = self._hash(col, categorias)
+            presentes = np.flatnonzero(codigos >= 0)
+            linhas.append(presentes)
+            colunas.append(balde[codigos[presentes]])
+            valores.append(sinal[codigos[presentes]])
+        hash_categorias = sparse.csr_matrix(
+            (np.concatenate(valores), (np.concatenate(linhas), np.concatenate(colunas))),
+            shape=(len(X), self.n_features),
+        )
+        return sparse.hstack([sparse.csr_matrix(numericas), hash_categorias], format="csr")
+
+
+# === Modelos ===
+def modelo_histograma(numericas, categoricas=CATEGORICAS_MODELO, semente=42):
+    # Gradient boosting por histogramas com as categóricas nativas
+    codificador = CodificadorFrequente(numericas, categoricas)
+    return make_pipeline(codificador, HistGradientBoostingClassifier(
+        categorical_features=codificador.mascara_categoricas(), random_state=semente,
+    ))
+
+
+def modelo_linear_hash(numericas, categoricas=CATEGORICAS_MODELO):
+    # Regressão logística sobre a matriz esparsa com hash
+    return make_pipeline(HashCategorico(numericas, categoricas), LogisticRegression(max_iter=1000))
+
+
+def bytes_matriz(matriz):
+    # Memória ocupada por uma matriz densa ou esparsa (CSR)
+    if sparse.issparse(matriz):
+        return matriz.data.nbytes + matriz.indices.nbytes + matriz.indptr.nbytes
+    return matriz.nbytes
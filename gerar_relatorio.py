@@ -1,12 +1,67 @@
 from fpdf import FPDF
 from datetime import datetime
+import argparse
+import hashlib
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from PIL import Image
+
+from artefatos_prf import carregar_textos
+from ingestao_prf import numero_processos
+from instrumentacao_prf import carregar_desempenho
+from trechos_prf import carregar_trechos, ranking, rotulo_trecho
+
+# recortes_prf e graficos_prf (matplotlib, seaborn, scipy) só são importados
+# no modo regional: o relatório nacional não desenha nada e sobe sem eles.
+
+TITULO = "Relatório de Análise de Acidentes - PRF"
+RECORTES = ["uf", "br"]                                 # colunas pelas quais os relatórios regionais são separados
+ARQUIVO_NACIONAL = "relatorio_acidentes_prf.pdf"
+PASTA_REGIONAIS = "relatorios"                          # relatorios/<uf|br>/relatorio_<recorte>.pdf
+CAMINHO_ASSETS = os.path.join("cache", "relatorios")    # imagens reduzidas e gráficos dos recortes
+LOGO = "logo.png"
+
+# Imagens entram no PDF no tamanho de impressão (largura em mm a DPI_IMPRESSAO),
+# não na resolução dos PNGs de resultados/ (300 dpi)
+DPI_IMPRESSAO = 150
+LARGURA_IMAGEM_MM = 160
+
+
+# === Imagens no tamanho de impressão ===
+def imagem_para_impressao(caminho, largura_mm=LARGURA_IMAGEM_MM, dpi=DPI_IMPRESSAO, cache=CAMINHO_ASSETS):
+    # Reduz a imagem à largura em que será impressa e a grava como PNG de
+    # paleta (gráficos têm poucas cores). O resultado fica em cache,
+    # indexado pelo conteúdo da original: capa, logo e gráficos comuns são
+    # reduzidos uma vez e reaproveitados por todos os relatórios e execuções.
+    with open(caminho, "rb") as f:
+        chave = hashlib.sha1(f.read() + f"-{largura_mm}-{dpi}".encode()).hexdigest()[:16]
+    destino = os.path.join(cache, f"{chave}.png")
+    if os.path.exists(destino):
+        return destino
+    os.makedirs(cache, exist_ok=True)
+    largura_px = round(largura_mm / 25.4 * dpi)
+    with Image.open(caminho) as original:
+        imagem = original.convert("RGB")
+    if imagem.width > largura_px:
+        imagem = imagem.resize((largura_px, round(imagem.height * largura_px / imagem.width)), Image.LANCZOS)
+    temporario = f"{destino}.{os.getpid()}.tmp"
+    imagem.quantize(colors=256).save(temporario, format="PNG", optimize=True)
+    os.replace(temporario, destino)
+    return destino
+
 
 class PDF(FPDF):
+    def __init__(self, titulo=TITULO):
+        super().__init__()
+        self.titulo = titulo
+        self.set_auto_page_break(auto=True, margin=15)
+
     def header(self):
         if self.page_no() != 1:
             self.set_font("Helvetica", 'B', 14)
-            self.cell(0, 10, "Relatório de Análise de Acidentes - PRF", ln=True, align="C")
+            self.cell(0, 10, self.titulo, ln=True, align="C")
             self.set_font("Helvetica", '', 10)
             self.cell(0, 10, f"Página {self.page_no()} - Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}", ln=True, align="C")
             self.ln(5)
@@ -22,133 +77,328 @@ class PDF(FPDF):
         self.multi_cell(0, 8, text)
         self.ln()
 
-    def insert_image(self, path, w=160):
+    def insert_image(self, path, w=LARGURA_IMAGEM_MM):
         if os.path.exists(path):
-            self.image(path, w=w)
+            self.image(imagem_para_impressao(path, w), w=w)
             self.ln(5)
         else:
             self.chapter_body(f"[Imagem '{path}' não encontrada]")
 
+    def table(self, header, rows, widths, aligns):
+        self.set_font("Helvetica", 'B', 9)
+        self.set_fill_color(240, 240, 240)
+        for texto, largura, alinhamento in zip(header, widths, aligns):
+            self.cell(largura, 7, texto, border=1, align=alinhamento, fill=True)
+        self.ln()
+        self.set_font("Helvetica", '', 9)
+        for row in rows:
+            for texto, largura, alinhamento in zip(row, widths, aligns):
+                self.cell(largura, 6, texto, border=1, align=alinhamento)
+            self.ln()
+        self.ln(4)
+
+    def cover(self, title, subtitle):
+        self.add_page()
+        self.set_font("Helvetica", 'B', 20)
+        self.ln(80)
+        self.cell(0, 10, title, ln=True, align="C")
+        self.set_font("Helvetica", '', 14)
+        self.cell(0, 10, subtitle, ln=True, align="C")
+        self.ln(20)
+
+        # (Opcional) Logo
+        if os.path.exists(LOGO):
+            self.image(imagem_para_impressao(LOGO, 50), x=80, w=50)
+
 def clean_text_for_pdf(text):
     return text.encode('latin-1', errors='ignore').decode('latin-1')
 
-# === Criação do PDF ===
-pdf = PDF()
-pdf.set_auto_page_break(auto=True, margin=15)
-
-# === Capa ===
-pdf.add_page()
-pdf.set_font("Helvetica", 'B', 20)
-pdf.ln(80)
-pdf.cell(0, 10, "Análise de Acidentes da PRF", ln=True, align="C")
-pdf.set_font("Helvetica", '', 14)
-pdf.cell(0, 10, f"Relatório Técnico Gerado em {datetime.now().strftime('%d/%m/%Y %H:%M')}", ln=True, align="C")
-pdf.ln(20)
-
-# (Opcional) Logo
-logo_path = "logo.png"
-if os.path.exists(logo_path):
-    pdf.image(logo_path, x=80, w=50)
-
-# === Relatório Executivo ===
-pdf.add_page()
-pdf.chapter_title("Relatório Executivo")
-executivo_text = (
-    "Resumo:\n"
-    "Este relatório apresenta uma análise detalhada dos acidentes reportados pela Polícia Rodoviária Federal (PRF), "
-    "identificando padrões e fatores que influenciam a gravidade dos acidentes.\n\n"
-
-    "Insights:\n"
-    "- A maior gravidade dos acidentes está associada a condições climáticas adversas e períodos noturnos.\n"
-    "- Existe uma correlação significativa entre o número de feridos graves e o total de mortes.\n\n"
-
-    "Recomendações:\n"
-    "- Implementar campanhas educativas focadas em direção segura durante condições de risco.\n"
-    "- Reforçar fiscalização e sinalização em trechos com histórico elevado de acidentes graves.\n"
-    "- Investir em monitoramento em tempo real para rápida resposta em acidentes."
-)
-pdf.chapter_body(clean_text_for_pdf(executivo_text))
-
-# === Sumário ===
-pdf.add_page()
-pdf.chapter_title("Sumário")
-pdf.set_font("Helvetica", '', 11)
-pdf.multi_cell(0, 8,
-    "1. Coleta, Limpeza e Pré-processamento\n"
-    "2. Análise Estatística e Visualização\n"
-    "3. Modelagem e Machine Learning\n"
-    "4. Interpretação e Conclusões"
-)
-pdf.ln()
-
-# === Parte 1 ===
-pdf.add_page()
-pdf.chapter_title("1. Coleta, Limpeza e Pré-processamento")
-pdf.chapter_body(
-    "Os dados foram carregados a partir de arquivos CSV contendo informações sobre acidentes reportados pela Polícia Rodoviária Federal (PRF).\n"
-    "Foram tratados valores nulos, convertidas colunas para tipos adequados e criadas novas variáveis, como 'gravidade' e 'dia da semana'.\n"
-    "O dataset limpo foi salvo como 'df_limpo.csv'."
-)
-
-# === Parte 2 ===
-pdf.chapter_title("2. Análise Estatística e Visualização")
-pdf.chapter_body(
-    "Realizamos testes de normalidade, análise de correlação e visualizações como histograma, boxplot, série temporal e gráfico de dispersão.\n"
-    "Também fizemos um teste t para verificar diferença significativa no número de mortos entre finais de semana e dias úteis."
-)
-
-# === Imagens ===
-caminho_imagens = "resultados"
-imagens = [
-    "correlacao_heatmap.png",
-    "histograma_gravidade.png",
-    "boxplot_gravidade_fds.png",
-    "dispersao_feridos_mortos.png",
-    "serie_temporal_gravidade.png",
-    "pizza_mortos.png"
-]
-for img in imagens:
-    pdf.insert_image(os.path.join(caminho_imagens, img))
-
-# === Parte 3 ===
-pdf.chapter_title("3. Modelagem e Machine Learning")
-pdf.chapter_body(
-    "Foi aplicada classificação binária para prever se um acidente teve gravidade alta (mortos + feridos graves >= 2).\n"
-    "Modelos utilizados:\n"
-    "- Regressão Logística\n"
-    "- Random Forest\n"
-    "A validação cruzada (5-fold) foi usada para avaliar a performance dos modelos.\n"
-    "Além disso, um Grid Search foi aplicado para encontrar os melhores parâmetros da Random Forest."
-)
-
-pdf.insert_image(os.path.join(caminho_imagens, "importancia_features_rf.png"))
-
-# === Resultados Dinâmicos do Script ===
-pdf.chapter_title("3.1 Resultados Detalhados da Análise")
-
-texto_resultados = "texto_analise.txt"
-if os.path.exists(texto_resultados):
-    with open(texto_resultados, "r", encoding="utf-8") as f:
-        conteudo = f.read()
-    conteudo = clean_text_for_pdf(conteudo)
-    pdf.chapter_body(conteudo)
-else:
-    pdf.chapter_body("Nenhum resultado encontrado. Execute o script de análise para gerar os dados.")
-
-# === Parte 4 ===
-pdf.chapter_title("4. Interpretação e Conclusões")
-pdf.chapter_body(
-    "A Random Forest teve desempenho superior em relação à Regressão Logística.\n"
-    "As variáveis com maior importância foram: 'feridos_graves' e 'mortos'.\n\n"
-    "Limitações:\n"
-    "- Não foram consideradas variáveis categóricas como tipo de acidente, clima, etc.\n"
-    "- Dados desbalanceados podem impactar a performance.\n\n"
-    "Melhorias Futuras:\n"
-    "- Adicionar variáveis categóricas\n"
-    "- Usar técnicas de balanceamento como SMOTE\n"
-    "- Testar outros modelos como XGBoost ou LightGBM"
-)
-
-# === Salvar PDF ===
-pdf.output("relatorio_acidentes_prf.pdf")
-print("PDF gerado com sucesso: relatorio_acidentes_prf.pdf")
+def _inteiro(valor):
+    return f"{int(valor):,}".replace(",", ".")
+
+def _decimal(valor, casas=2):
+    return f"{valor:.{casas}f}".replace(".", ",")
+
+def _tabela_trechos(pdf, trechos):
+    pdf.table(["Trecho", "Acidentes", "Mortos", "Feridos graves", "Gravidade"], [
+        [rotulo_trecho(linha), _inteiro(linha.acidentes), _inteiro(linha.mortos), _inteiro(linha.feridos_graves),
+         _inteiro(linha.gravidade)]
+        for linha in trechos.itertuples()
+    ], widths=[60, 28, 28, 32, 28], aligns=["L", "R", "R", "R", "R"])
+
+
+# === Relatório nacional ===
+def relatorio_nacional(destino=ARQUIVO_NACIONAL):
+    pdf = PDF()
+
+    # === Capa ===
+    pdf.cover("Análise de Acidentes da PRF",
+              f"Relatório Técnico Gerado em {datetime.now().strftime('%d/%m/%Y %H:%M')}")
+
+    # === Relatório Executivo ===
+    pdf.add_page()
+    pdf.chapter_title("Relatório Executivo")
+    executivo_text = (
+        "Resumo:\n"
+        "Este relatório apresenta uma análise detalhada dos acidentes reportados pela Polícia Rodoviária Federal (PRF), "
+        "identificando padrões e fatores que influenciam a gravidade dos acidentes.\n\n"
+
+        "Insights:\n"
+        "- A maior gravidade dos acidentes está associada a condições climáticas adversas e períodos noturnos.\n"
+        "- Existe uma correlação significativa entre o número de feridos graves e o total de mortes.\n\n"
+
+        "Recomendações:\n"
+        "- Implementar campanhas educativas focadas em direção segura durante condições de risco.\n"
+        "- Reforçar fiscalização e sinalização em trechos com histórico elevado de acidentes graves.\n"
+        "- Investir em monitoramento em tempo real para rápida resposta em acidentes."
+    )
+    pdf.chapter_body(clean_text_for_pdf(executivo_text))
+
+    # === Sumário ===
+    pdf.add_page()
+    pdf.chapter_title("Sumário")
+    pdf.set_font("Helvetica", '', 11)
+    pdf.multi_cell(0, 8,
+        "1. Coleta, Limpeza e Pré-processamento\n"
+        "2. Análise Estatística e Visualização\n"
+        "3. Modelagem e Machine Learning\n"
+        "4. Interpretação e Conclusões\n"
+        "Apêndice A. Desempenho do Pipeline"
+    )
+    pdf.ln()
+
+    # === Parte 1 ===
+    pdf.add_page()
+    pdf.chapter_title("1. Coleta, Limpeza e Pré-processamento")
+    pdf.chapter_body(
+        "Os dados foram carregados a partir de arquivos CSV contendo informações sobre acidentes reportados pela Polícia Rodoviária Federal (PRF).\n"
+        "Foram tratados valores nulos, convertidas colunas para tipos adequados e criadas novas variáveis, como 'gravidade' e 'dia da semana'.\n"
+        "O dataset limpo foi salvo como artefato binário em 'artefatos/base_limpa.arrow' (exportável para CSV com --exportar-csv)."
+    )
+
+    # === Parte 2 ===
+    pdf.chapter_title("2. Análise Estatística e Visualização")
+    pdf.chapter_body(
+        "Realizamos testes de normalidade, análise de correlação e visualizações como histograma, boxplot, série temporal e gráfico de dispersão.\n"
+        "Também fizemos um teste t para verificar diferença significativa no número de mortos entre finais de semana e dias úteis."
+    )
+
+    # === Imagens ===
+    caminho_imagens = "resultados"
+    imagens = [
+        "correlacao_heatmap.png",
+        "histograma_gravidade.png",
+        "boxplot_gravidade_fds.png",
+        "dispersao_feridos_mortos.png",
+        "serie_temporal_gravidade.png",
+        "pizza_mortos.png"
+    ]
+    for img in imagens:
+        pdf.insert_image(os.path.join(caminho_imagens, img))
+
+    # Trechos de 1 km mais graves (janelas deslizantes ao longo de cada BR)
+    pdf.chapter_title("2.1 Trechos Críticos (BR + km)")
+    trechos = carregar_trechos()
+    if trechos is None:
+        pdf.chapter_body("Nenhum trecho encontrado. Execute o trechos_prf.py (ou o analise_acidentes_prf.py).")
+    else:
+        pdf.chapter_body("Trechos de rodovia com maior gravidade (mortos + feridos graves) em todos os anos, sem sobreposição.")
+        _tabela_trechos(pdf, ranking(trechos))
+
+    # === Parte 3 ===
+    pdf.chapter_title("3. Modelagem e Machine Learning")
+    pdf.chapter_body(clean_text_for_pdf(
+        "Foi aplicada classificação binária para prever se um acidente teve gravidade alta (mortos + feridos graves >= 2).\n"
+        "Modelos utilizados:\n"
+        "- Regressão Logística\n"
+        "- Random Forest\n"
+        "- Gradient Boosting por histogramas e Regressão Logística com variáveis categóricas\n"
+        "A validação cruzada (5-fold) foi usada para avaliar a performance dos modelos.\n"
+        "Os parâmetros da Random Forest foram escolhidos por busca de hiperparâmetros. "
+        + carregar_textos().get("modelagem", {}).get(
+            "busca", "(Tipo de busca desconhecido: execute a etapa modelagem do analise_prf_completo.py.)")
+    ))
+
+    pdf.insert_image(os.path.join(caminho_imagens, "importancia_features_rf.png"))
+
+    # === Resultados Dinâmicos do Script ===
+    pdf.chapter_title("3.1 Resultados Detalhados da Análise")
+
+    texto_resultados = "texto_analise.txt"
+    if os.path.exists(texto_resultados):
+        with open(texto_resultados, "r", encoding="utf-8") as f:
+            conteudo = f.read()
+        conteudo = clean_text_for_pdf(conteudo)
+        pdf.chapter_body(conteudo)
+    else:
+        pdf.chapter_body("Nenhum resultado encontrado. Execute o script de análise para gerar os dados.")
+
+    # === Parte 4 ===
+    pdf.chapter_title("4. Interpretação e Conclusões")
+    pdf.chapter_body(
+        "A Random Forest teve desempenho superior em relação à Regressão Logística.\n"
+        "As variáveis com maior importância foram: 'feridos_graves' e 'mortos'.\n\n"
+        "Variáveis categóricas (município, causa, tipo de acidente e condição meteorológica) entram em dois "
+        "modelos com largura fixa: no Gradient Boosting por histogramas cada uma vira um código de frequência "
+        "(as categorias mais frequentes no treino; as demais agrupadas em 'outras'); na Regressão Logística elas são "
+        "codificadas por hash numa matriz esparsa. A acurácia e a memória de cada um estão na seção 3.1.\n\n"
+        "Limitações:\n"
+        "- No Gradient Boosting, categorias raras são agrupadas em 'outras'; no hash, categorias diferentes "
+        "podem colidir.\n"
+        "- Dados desbalanceados podem impactar a performance.\n\n"
+        "Melhorias Futuras:\n"
+        "- Incluir mais variáveis categóricas (fase do dia, tipo de pista, uso do solo)\n"
+        "- Usar técnicas de balanceamento como SMOTE\n"
+        "- Testar outros modelos como XGBoost ou LightGBM"
+    )
+
+    # === Apêndice: Desempenho ===
+    # Tempo, CPU, pico de memória e linhas de cada etapa, lidos do desempenho.json
+    # gravado pelo analise_prf_completo.py; subetapas aparecem recuadas
+    pdf.add_page()
+    pdf.chapter_title("Apêndice A. Desempenho do Pipeline")
+    desempenho = carregar_desempenho()
+    if desempenho:
+        pdf.chapter_body(
+            "Medições da última execução de cada etapa. CPU acima do tempo indica trabalho em paralelo; "
+            "o pico de memória é o maior RSS do processo durante a etapa (gráficos: do processo que o desenhou)."
+        )
+        linhas_tabela = []
+        for registro in desempenho:
+            nivel = registro["etapa"].count("/")
+            nome = "    " * nivel + registro["etapa"].rsplit("/", 1)[-1]
+            linhas_tabela.append([
+                clean_text_for_pdf(nome),
+                f"{registro['segundos']:.2f}",
+                f"{registro['cpu_s']:.2f}",
+                f"{registro['pico_mb']:.0f}",
+                f"{registro['linhas']:,}".replace(",", ".") if registro["linhas"] is not None else "-",
+            ])
+        pdf.table(["Etapa", "Tempo (s)", "CPU (s)", "Pico (MB)", "Linhas"], linhas_tabela,
+                  widths=[85, 25, 25, 25, 30], aligns=["L", "R", "R", "R", "R"])
+    else:
+        pdf.chapter_body("Nenhuma medição encontrada (desempenho.json). Execute o analise_prf_completo.py.")
+
+    # === Salvar PDF ===
+    pdf.output(destino)
+    return destino
+
+
+# === Relatórios regionais (um por UF ou por BR) ===
+def relatorio_recorte(por, recorte, fatia, nacional, pasta=PASTA_REGIONAIS, trechos=None):
+    # Executado em um processo de trabalho: recebe só a fatia agregada do
+    # recorte, o resumo do país e (relatórios por BR) os trechos críticos da
+    # rodovia, desenha os gráficos do recorte no tamanho de impressão (só os
+    # que mudaram desde a última execução) e monta o PDF
+    from graficos_prf import renderizar
+    from recortes_prf import graficos_fatia, principais_causas, resumo, rotulo, tabela_anual, teste_t_fim_de_semana
+
+    nome = rotulo(por, recorte)
+    arquivo = nome.replace(" ", "_")
+    pasta_graficos = os.path.join(CAMINHO_ASSETS, por, arquivo)
+    graficos = graficos_fatia(fatia)
+    renderizar(graficos, pasta_graficos, processos=1, dpi=DPI_IMPRESSAO)
+
+    pdf = PDF(clean_text_for_pdf(f"Acidentes em {nome} - PRF"))
+    pdf.cover(clean_text_for_pdf(f"Acidentes da PRF - {nome}"),
+              f"Relatório Regional Gerado em {datetime.now().strftime('%d/%m/%Y %H:%M')}")
+
+    # === Indicadores, comparados com o país ===
+    pdf.add_page()
+    pdf.chapter_title("1. Indicadores")
+    regional = resumo(fatia)
+    pdf.table(["Indicador", nome, "Brasil"], [
+        ["Acidentes", _inteiro(regional["acidentes"]), _inteiro(nacional["acidentes"])],
+        ["Mortos", _inteiro(regional["mortos"]), _inteiro(nacional["mortos"])],
+        ["Feridos graves", _inteiro(regional["feridos_graves"]), _inteiro(nacional["feridos_graves"])],
+        ["Gravidade média por acidente", _decimal(regional["gravidade_media"]), _decimal(nacional["gravidade_media"])],
+        ["Mortos por 100 acidentes", _decimal(regional["mortos_por_100"]), _decimal(nacional["mortos_por_100"])],
+    ], widths=[80, 50, 50], aligns=["L", "R", "R"])
+
+    teste = teste_t_fim_de_semana(fatia)
+    if teste is None:
+        pdf.chapter_body("Teste t (mortos, fim de semana x dia útil): acidentes insuficientes em um dos grupos.")
+    else:
+        conclusao = "diferença significativa" if teste.pvalue < 0.05 else "sem diferença significativa"
+        pdf.chapter_body(clean_text_for_pdf(
+            f"Teste t de Welch (mortos, fim de semana x dia útil): T={teste.statistic:.4f}, "
+            f"p={teste.pvalue:.4f} - {conclusao} ao nível de 5%."
+        ))
+
+    # === Tabelas ===
+    pdf.chapter_title("2. Evolução Anual")
+    pdf.table(["Ano", "Acidentes", "Mortos", "Feridos graves"], [
+        [str(linha.Index), _inteiro(linha.acidentes), _inteiro(linha.mortos), _inteiro(linha.feridos_graves)]
+        for linha in tabela_anual(fatia).itertuples()
+    ], widths=[30, 40, 40, 40], aligns=["C", "R", "R", "R"])
+
+    pdf.chapter_title("3. Principais Causas")
+    pdf.table(["Causa", "Acidentes", "Gravidade média"], [
+        [clean_text_for_pdf(str(linha.Index)), _inteiro(linha.acidentes), _decimal(linha.gravidade_media)]
+        for linha in principais_causas(fatia).itertuples()
+    ], widths=[100, 35, 35], aligns=["L", "R", "R"])
+
+    if trechos is not None:
+        pdf.chapter_title("4. Trechos Críticos")
+        _tabela_trechos(pdf, trechos)
+
+    # === Gráficos ===
+    pdf.add_page()
+    pdf.chapter_title("5. Gráficos" if trechos is not None else "4. Gráficos")
+    for img in graficos:
+        pdf.insert_image(os.path.join(pasta_graficos, img))
+
+    os.makedirs(os.path.join(pasta, por), exist_ok=True)
+    destino = os.path.join(pasta, por, f"relatorio_{arquivo}.pdf")
+    pdf.output(destino)
+    return destino
+
+
+def relatorios_regionais(por, recortes=None, processos=None, pasta=PASTA_REGIONAIS):
+    # Uma passada sobre a base limpa agrega todos os recortes; depois cada
+    # PDF é montado em paralelo (um recorte por processo) a partir da sua fatia
+    from recortes_prf import agregar_recortes, fatia_total, fatiar, resumo
+
+    agregados = agregar_recortes(por)
+    fatias = fatiar(agregados)
+    nacional = resumo(fatia_total(agregados))
+    if recortes:
+        pedidos = {str(r).upper() for r in recortes}
+        fatias = {recorte: fatia for recorte, fatia in fatias.items() if str(recorte).upper() in pedidos}
+    print(f"📑 {len(fatias)} relatório(s) por {por.upper()}...")
+    # Trechos críticos de cada BR (só no relatório por BR: um trecho pode cruzar UFs)
+    trechos = carregar_trechos() if por == "br" else None
+    trechos_recorte = {recorte: ranking(trechos, br=recorte) if trechos is not None else None for recorte in fatias}
+
+    gerados = []
+    processos = min(numero_processos(processos), len(fatias))
+    if processos > 1 and "fork" in multiprocessing.get_all_start_methods():
+        # Mesmo critério da ingestão e dos gráficos: com "spawn" o script seria reexecutado
+        contexto = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as executor:
+            futuros = [executor.submit(relatorio_recorte, por, recorte, fatia, nacional, pasta, trechos_recorte[recorte])
+                       for recorte, fatia in fatias.items()]
+            for futuro in as_completed(futuros):
+                gerados.append(futuro.result())
+    else:
+        for recorte, fatia in fatias.items():
+            gerados.append(relatorio_recorte(por, recorte, fatia, nacional, pasta, trechos_recorte[recorte]))
+    return sorted(gerados)
+
+
+# === Linha de comando ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Relatório em PDF dos acidentes da PRF")
+    parser.add_argument("--por", choices=RECORTES,
+                        help="gera um relatório por UF ou por BR em relatorios/<uf|br>/ (padrão: só o nacional)")
+    parser.add_argument("--recortes", nargs="+", metavar="RECORTE",
+                        help="só estes recortes (ex.: SP MG ou 116 101)")
+    parser.add_argument("--processos", type=int, help="relatórios montados em paralelo (padrão: PRF_PROCESSOS ou núcleos)")
+    args = parser.parse_args()
+
+    if args.por is None:
+        relatorio_nacional()
+        print(f"PDF gerado com sucesso: {ARQUIVO_NACIONAL}")
+    else:
+        gerados = relatorios_regionais(args.por, args.recortes, args.processos)
+        print(f"PDFs gerados com sucesso em '{os.path.join(PASTA_REGIONAIS, args.por)}' ({len(gerados)} arquivos)")
@@ -0,0 +1,183 @@
+# graficos_prf.py
+# Etapa de renderização dos gráficos de resultados/. Cada gráfico é desenhado
+# a partir de dados já agregados (contagens, resumos de boxplot, somas), numa
+# figura própria e num processo separado. Um gráfico só é redesenhado quando
+# o hash dos seus dados, do código que o desenha ou do estilo (rcParams,
+# paleta, DPI, versões das bibliotecas e VERSAO_GRAFICOS) muda desde a
+# última execução.
+
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+from ingestao_prf import numero_processos
+from instrumentacao_prf import medir_chamada
+
+DPI = 300
+ARQUIVO_HASHES = ".graficos.json"
+VERSAO_GRAFICOS = 1                      # incrementar quando o desenho mudar fora das funções de gráfico
+
+
+def _aplicar_estilo():
+    plt.rcParams['font.family'] = 'DejaVu Sans'
+    sns.set(style="whitegrid", palette="Set2")
+    plt.rcParams["axes.titlesize"] = 14
+    plt.rcParams["axes.labelsize"] = 12
+
+
+# === Gráficos ===
+# Cada função recebe os dados agregados e o eixo onde desenhar
+def correlacao_heatmap(ax, corr):
+    sns.heatmap(corr, annot=True, cmap="Reds", fmt=".2f", ax=ax)
+    ax.set_title("Mapa de Calor")
+
+
+def histograma_gravidade(ax, valores, contagens):
+    sns.histplot(x=np.asarray(valores, dtype=float), weights=contagens, bins=20, kde=True, color="purple", ax=ax)
+    ax.set_title("Distribuição da Gravidade")
+    ax.set_xlabel("gravidade")
+
+
+def boxplot_gravidade_fds(ax, resumos):
+    ax.bxp(resumos, patch_artist=True, boxprops={"facecolor": "#4A90E2"}, medianprops={"color": "black"})
+    ax.set_title("Gravidade por Tipo de Dia")
+    ax.set_xlabel("tipo_dia")
+    ax.set_ylabel("gravidade")
+    ax.set_ylim(0, 30)
+
+
+def dispersao_feridos_mortos(ax, pares):
+    # Pares distintos (feridos_graves, mortos): o gráfico é o mesmo de todos os pontos
+    sns.scatterplot(x="feridos_graves", y="mortos", data=pares, alpha=0.5, ax=ax)
+    ax.set_title("Feridos Graves vs Mortos")
+
+
+def serie_temporal_gravidade(ax, mensal):
+    ax.plot(mensal["data"], mensal["gravidade"], marker='o', color='green')
+    ax.set_title("Gravidade Mensal")
+
+
+def pizza_mortos(ax, mortos, sem_mortos):
+    ax.pie([mortos, sem_mortos], labels=["Com Mortos", "Sem Mortos"],
+           colors=["red", "lightgray"], autopct='%1.1f%%', startangle=90)
+    ax.set_title("Acidentes com Mortes")
+
+
+def importancia_features_rf(ax, importancia):
+    sns.barplot(data=importancia, x='importancia', y='feature', hue='feature', palette='viridis', legend=False, ax=ax)
+    ax.set_title("Importância das Variáveis")
+
+
+# === Hash dos dados ===
+def _atualizar_hash(h, valor):
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        colunas = list(valor.columns) if isinstance(valor, pd.DataFrame) else [valor.name]
+        h.update(repr((valor.shape, colunas, valor.index.names)).encode())
+        h.update(pd.util.hash_pandas_object(valor, index=True).to_numpy().tobytes())
+    elif isinstance(valor, np.ndarray):
+        h.update(repr((valor.dtype.str, valor.shape)).encode())
+        h.update(np.ascontiguousarray(valor).tobytes())
+    elif isinstance(valor, dict):
+        for chave in sorted(valor, key=str):
+            h.update(repr(chave).encode())
+            _atualizar_hash(h, valor[chave])
+    elif isinstance(valor, (list, tuple)):
+        h.update(f"{type(valor).__name__}{len(valor)}".encode())
+        for item in valor:
+            _atualizar_hash(h, item)
+    else:
+        h.update(repr(valor).encode())
+
+
+def assinatura_estilo():
+    # Estilo efetivo depois de _aplicar_estilo (fonte, paleta, tamanhos),
+    # versões do matplotlib e do seaborn e VERSAO_GRAFICOS. O estilo de quem
+    # chama é restaurado ao sair do rc_context.
+    with plt.rc_context():
+        _aplicar_estilo()
+        parametros = sorted((chave, repr(valor)) for chave, valor in plt.rcParams.items()
+                            if not chave.startswith("backend"))
+    h = hashlib.sha1(f"{VERSAO_GRAFICOS}|{matplotlib.__version__}|{sns.__version__}".encode())
+    h.update(repr(parametros).encode())
+    return h.hexdigest()
+
+
+def hash_grafico(funcao, dados, estilo=""):
+    # Dados + código da função + estilo: mudar o desenho também invalida o gráfico
+    h = hashlib.sha1(estilo.encode())
+    h.update(funcao.__name__.encode())
+    h.update(funcao.__code__.co_code)
+    h.update(repr(funcao.__code__.co_consts).encode())
+    _atualizar_hash(h, dados)
+    return h.hexdigest()
+
+
+# === Renderização ===
+def desenhar(funcao, dados, destino, dpi=DPI):
+    # Executado em um processo de trabalho: uma figura por gráfico, sem
+    # depender do estado global do pyplot de quem chamou
+    _aplicar_estilo()
+    fig, ax = plt.subplots()
+    try:
+        funcao(ax, **dados)
+        fig.tight_layout()
+        fig.savefig(destino, dpi=dpi)
+    finally:
+        plt.close(fig)
+    return destino
+
+
+def renderizar(graficos, pasta, processos=None, dpi=DPI, medidas=None):
+    # graficos: {arquivo: (funcao, dados)}. Devolve {arquivo: "gerado" | "inalterado"};
+    # `medidas` (dict), se passado, recebe o tempo/CPU/memória de cada gráfico desenhado
+    medidas = {} if medidas is None else medidas
+    os.makedirs(pasta, exist_ok=True)
+    caminho_hashes = os.path.join(pasta, ARQUIVO_HASHES)
+    try:
+        with open(caminho_hashes, "r", encoding="utf-8") as f:
+            hashes = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        hashes = {}
+
+    situacao = {}
+    pendentes = {}
+    estilo = assinatura_estilo()
+    for arquivo, (funcao, dados) in graficos.items():
+        atual = hash_grafico(funcao, dados, estilo) + f"-{dpi}"
+        destino = os.path.join(pasta, arquivo)
+        if hashes.get(arquivo) == atual and os.path.exists(destino):
+            situacao[arquivo] = "inalterado"
+        else:
+            pendentes[arquivo] = (funcao, dados, destino, atual)
+
+    processos = min(numero_processos(processos), len(pendentes))
+    if processos > 1 and "fork" in multiprocessing.get_all_start_methods():
+        # Mesmo critério da ingestão: com "spawn" o script principal seria reexecutado
+        contexto = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as executor:
+            futuros = {
+                executor.submit(medir_chamada, desenhar, funcao, dados, destino, dpi): arquivo
+                for arquivo, (funcao, dados, destino, _) in pendentes.items()
+            }
+            for futuro in as_completed(futuros):
+                _, medidas[futuros[futuro]] = futuro.result()
+    else:
+        for arquivo, (funcao, dados, destino, _) in pendentes.items():
+            _, medidas[arquivo] = medir_chamada(desenhar, funcao, dados, destino, dpi, zerar_pico=False)
+
+    for arquivo, (_, _, _, atual) in pendentes.items():
+        hashes[arquivo] = atual
+        situacao[arquivo] = "gerado"
+    with open(caminho_hashes + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(hashes, f, indent=2)
+    os.replace(caminho_hashes + ".tmp", caminho_hashes)
+    return situacao
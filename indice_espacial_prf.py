@@ -0,0 +1,210 @@
+# indice_espacial_prf.py
+# Índice espacial sobre latitude/longitude dos acidentes: consultas por raio,
+# por retângulo e k vizinhos mais próximos (distâncias em km pela fórmula de
+# haversine) e detecção de hotspots por densidade.
+#
+# Os pontos são guardados como vetores unitários 3D numa KD-tree: a distância
+# em linha reta (corda) entre dois vetores é função monotônica da distância
+# sobre a esfera, então as buscas da árvore são exatas em haversine.
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+
+RAIO_TERRA_KM = 6371.0088
+
+
+def _para_xyz(latitude, longitude):
+    lat = np.radians(latitude)
+    lon = np.radians(longitude)
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def _km_para_corda(km):
+    return 2 * np.sin(np.asarray(km) / (2 * RAIO_TERRA_KM))
+
+
+def _corda_para_km(corda):
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.clip(np.asarray(corda) / 2, 0, 1))
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(a))
+
+
+class IndiceEspacial:
+    def __init__(self, df):
+        # df precisa das colunas latitude e longitude; linhas sem coordenada
+        # ficam fora do índice. As consultas devolvem linhas de df.
+        latitude = df["latitude"].to_numpy(dtype=np.float64, na_value=np.nan)
+        longitude = df["longitude"].to_numpy(dtype=np.float64, na_value=np.nan)
+        validos = ~(np.isnan(latitude) | np.isnan(longitude))
+
+        self.df = df
+        self.linhas = np.flatnonzero(validos)           # posição em df de cada ponto indexado
+        self.latitude = latitude[validos]
+        self.longitude = longitude[validos]
+        self.arvore = cKDTree(_para_xyz(self.latitude, self.longitude))
+        self._ordem_lat = np.argsort(self.latitude, kind="stable")
+        self._lat_ordenada = self.latitude[self._ordem_lat]
+
+    def __len__(self):
+        return len(self.linhas)
+
+    def _resultado(self, pontos, distancias=None):
+        resultado = self.df.iloc[self.linhas[pontos]]
+        if distancias is not None:
+            resultado = resultado.assign(distancia_km=distancias)
+        return resultado
+
+    # === Consultas ===
+    def raio(self, latitude, longitude, km):
+        # Acidentes a até `km` do ponto, do mais próximo ao mais distante
+        centro = _para_xyz(latitude, longitude)[0]
+        pontos = np.asarray(self.arvore.query_ball_point(centro, _km_para_corda(km)), dtype=np.intp)
+        distancias = haversine_km(latitude, longitude, self.latitude[pontos], self.longitude[pontos])
+        ordem = np.argsort(distancias, kind="stable")
+        return self._resultado(pontos[ordem], distancias[ordem])
+
+    def vizinhos(self, latitude, longitude, k=10):
+        # Os k acidentes mais próximos do ponto
+        k = min(k, len(self))
+        if k == 0:
+            return self._resultado(np.empty(0, dtype=np.intp), np.empty(0))
+        cordas, pontos = self.arvore.query(_para_xyz(latitude, longitude)[0], k=k)
+        pontos = np.atleast_1d(pontos)
+        return self._resultado(pontos, _corda_para_km(np.atleast_1d(cordas)))
+
+    def caixa(self, lat_min, lat_max, lon_min, lon_max):
+        # Acidentes dentro do retângulo (busca binária na latitude + filtro na longitude)
+        inicio = np.searchsorted(self._lat_ordenada, lat_min, side="left")
+        fim = np.searchsorted(self._lat_ordenada, lat_max, side="right")
+        candidatos = self._ordem_lat[inicio:fim]
+        lon = self.longitude[candidatos]
+        return self._resultado(np.sort(candidatos[(lon >= lon_min) & (lon <= lon_max)]))
+
+    # === Hotspots ===
+    def hotspots(self, celula_km=1.0, min_acidentes=20, top=50, peso="gravidade"):
+        # Agrupamento por densidade em grade (ver GradeHotspots) sobre todos
+        # os pontos do índice
+        pesos = np.ones(len(self))
+        if peso in self.df.columns:
+            pesos = self.df[peso].to_numpy(dtype=np.float64)[self.linhas]
+        grade = GradeHotspots(celula_km, min_acidentes)
+        grade.adicionar(self.latitude, self.longitude, pesos)
+        grade.fechar()
+        grade.medir_raio(self.latitude, self.longitude)
+        return grade.resultado(top, peso)
+
+
+class GradeHotspots:
+    # Agrupamento por densidade em grade: os pontos são projetados (projeção
+    # senoidal, que preserva distâncias locais) em células de `celula_km`;
+    # células com pelo menos `min_acidentes` são densas e células densas
+    # vizinhas (8-vizinhança) formam um hotspot. Custo O(n log n), sem matriz
+    # de distâncias.
+    #
+    # A grade é acumulável: adicionar() pode ser chamado bloco a bloco (modo
+    # streaming). O raio de cada hotspot depende do centroide final, por isso
+    # é medido numa segunda passada com medir_raio(), depois de fechar().
+    def __init__(self, celula_km=1.0, min_acidentes=20):
+        self.celula_km = celula_km
+        self.min_acidentes = min_acidentes
+        self.chaves = np.empty(0, dtype=np.int64)
+        self.somas = np.empty((0, 4))          # acidentes, peso, Σlatitude, Σlongitude por célula
+        self.rotulo_celula = None
+
+    def _chaves(self, latitude, longitude):
+        lat_rad = np.radians(latitude)
+        x = RAIO_TERRA_KM * np.radians(longitude) * np.cos(lat_rad)
+        y = RAIO_TERRA_KM * lat_rad
+        coluna = np.floor(x / self.celula_km).astype(np.int64)
+        linha = np.floor(y / self.celula_km).astype(np.int64)
+        return (linha << 32) + (coluna + (1 << 31))
+
+    def adicionar(self, latitude, longitude, pesos):
+        latitude = np.asarray(latitude, dtype=np.float64)
+        longitude = np.asarray(longitude, dtype=np.float64)
+        validos = ~(np.isnan(latitude) | np.isnan(longitude))
+        latitude, longitude = latitude[validos], longitude[validos]
+        pesos = np.asarray(pesos, dtype=np.float64)[validos]
+
+        valores = np.column_stack([np.ones(len(latitude)), pesos, latitude, longitude])
+        chaves, inverso = np.unique(np.concatenate([self.chaves, self._chaves(latitude, longitude)]), return_inverse=True)
+        somas = np.zeros((len(chaves), 4))
+        np.add.at(somas, inverso, np.concatenate([self.somas, valores]))
+        self.chaves, self.somas = chaves, somas
+
+    def fechar(self):
+        # Arestas entre células densas vizinhas -> componentes conexos
+        densas = np.flatnonzero(self.somas[:, 0] >= self.min_acidentes)
+        self.rotulo_celula = np.full(len(self.chaves), -1)
+        self.n = 0
+        if len(densas) == 0:
+            return
+        chaves_densas = self.chaves[densas]
+        origem, destino = [], []
+        for d_linha in (-1, 0, 1):
+            for d_coluna in (-1, 0, 1):
+                vizinha = chaves_densas + (d_linha << 32) + d_coluna
+                pos = np.searchsorted(chaves_densas, vizinha)
+                pos = np.minimum(pos, len(chaves_densas) - 1)
+                existe = chaves_densas[pos] == vizinha
+                origem.append(np.flatnonzero(existe))
+                destino.append(pos[existe])
+        origem, destino = np.concatenate(origem), np.concatenate(destino)
+        grafo = coo_matrix((np.ones(len(origem), dtype=np.int8), (origem, destino)), shape=(len(densas),) * 2)
+        self.n, componente_densa = connected_components(grafo, directed=False)
+        self.rotulo_celula[densas] = componente_densa
+
+        totais = np.column_stack([
+            np.bincount(componente_densa, weights=self.somas[densas, i], minlength=self.n) for i in range(4)
+        ])
+        self.acidentes = totais[:, 0].astype(np.int64)
+        self.pesos = totais[:, 1]
+        self.latitude = totais[:, 2] / totais[:, 0]
+        self.longitude = totais[:, 3] / totais[:, 0]
+        self.celulas = np.bincount(componente_densa, minlength=self.n)
+        self.raio_km = np.zeros(self.n)
+
+    def rotulos(self, latitude, longitude):
+        # Hotspot de cada ponto (-1 = fora de célula densa)
+        latitude = np.asarray(latitude, dtype=np.float64)
+        longitude = np.asarray(longitude, dtype=np.float64)
+        rotulo = np.full(len(latitude), -1)
+        validos = np.flatnonzero(~(np.isnan(latitude) | np.isnan(longitude)))
+        if len(self.chaves) == 0 or len(validos) == 0:
+            return rotulo
+        chaves = self._chaves(latitude[validos], longitude[validos])
+        pos = np.minimum(np.searchsorted(self.chaves, chaves), len(self.chaves) - 1)
+        rotulo[validos] = np.where(self.chaves[pos] == chaves, self.rotulo_celula[pos], -1)
+        return rotulo
+
+    def medir_raio(self, latitude, longitude):
+        # Maior distância de um ponto ao centroide do seu hotspot
+        if self.n == 0:
+            return
+        rotulo = self.rotulos(latitude, longitude)
+        dentro = rotulo >= 0
+        rotulo = rotulo[dentro]
+        distancia = haversine_km(self.latitude[rotulo], self.longitude[rotulo],
+                                 np.asarray(latitude, dtype=np.float64)[dentro],
+                                 np.asarray(longitude, dtype=np.float64)[dentro])
+        np.maximum.at(self.raio_km, rotulo, distancia)
+
+    def resultado(self, top=50, peso="gravidade"):
+        if self.n == 0:
+            return pd.DataFrame(columns=["latitude", "longitude", "acidentes", peso, "celulas", "raio_km"])
+        resultado = pd.DataFrame({
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "acidentes": self.acidentes,
+            peso: self.pesos,
+            "celulas": self.celulas,
+            "raio_km": self.raio_km,
+        })
+        return resultado.sort_values([peso, "acidentes"], ascending=False, ignore_index=True).head(top)
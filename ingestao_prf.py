@@ -0,0 +1,375 @@
+# ingestao_prf.py
+# Carregamento compartilhado dos CSVs anuais da PRF com cache colunar (Parquet).
+# Cada ano é lido e limpo uma única vez; as execuções seguintes leem o Parquet
+# tipado, apenas com as colunas pedidas pelo script.
+
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+try:
+    import fcntl
+except ImportError:                      # Windows
+    fcntl = None
+
+from esquema_prf import NULAVEIS, formatar_problemas
+from limpeza_prf import abrir_csv_em_blocos, ler_e_limpar, limpar_tabela, somar_relatorios
+
+# === CONFIGURAÇÃO ===
+CAMINHO_DADOS = "dados"                  # CSVs originais (um por ano)
+CAMINHO_CACHE = os.path.join("cache", "anos")
+CAMINHO_MAPEADOS = os.path.join("cache", "mapeados")   # Arrow IPC sem compressão, lido por memory map
+VERSAO_CACHE = 6                         # incrementar sempre que a limpeza mudar
+LINHAS_POR_GRUPO = 65_536                # row groups do Parquet: limite de memória da leitura em blocos
+LINHAS_POR_BLOCO = 100_000               # linhas por bloco no modo streaming
+TAMANHO_BLOCO_CSV = 16 << 20             # bytes de CSV por bloco na conversão em streaming
+
+
+# === Localização dos arquivos ===
+def listar_arquivos(caminho=CAMINHO_DADOS):
+    return sorted(arq for arq in os.listdir(caminho) if arq.endswith(".csv") and "Radares" not in arq)
+
+
+def ano_do_arquivo(arquivo):
+    return int(arquivo[-8:-4])  # Extrai o ano do nome do arquivo
+
+
+def _hash_arquivo(caminho_arquivo, tamanho_bloco=1 << 20):
+    h = hashlib.sha1()
+    with open(caminho_arquivo, "rb") as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+# === Leitura e limpeza de um ano ===
+def ler_ano(caminho_arquivo):
+    # Lê o CSV direto para o Arrow e aplica a limpeza compartilhada (limpeza_prf)
+    return ler_e_limpar(caminho_arquivo, ano_do_arquivo(caminho_arquivo))
+
+
+# === Manifesto do cache ===
+# Para cada CSV guardamos tamanho, mtime e sha1. Tamanho + mtime iguais bastam
+# para reaproveitar o Parquet; se só o mtime mudou, o hash decide.
+def _caminho_manifesto(cache):
+    return os.path.join(cache, "manifesto.json")
+
+
+def _ler_manifesto(cache):
+    try:
+        with open(_caminho_manifesto(cache), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _atualizar_manifesto(cache, alteradas):
+    # Grava só as entradas alteradas, sob uma trava do manifesto inteiro: o
+    # dashboard e o cubo podem validar o cache ao mesmo tempo (workers do
+    # gunicorn, thread de carga), então o arquivo é relido dentro da trava
+    # para não apagar o que outro processo gravou, e substituído de uma vez
+    # (quem lê sem a trava nunca vê um arquivo pela metade)
+    with _trava(f"{_caminho_manifesto(cache)}.trava"):
+        manifesto = _ler_manifesto(cache)
+        manifesto.update(alteradas)
+        temporario = f"{_caminho_manifesto(cache)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(manifesto, f, indent=2)
+        os.replace(temporario, _caminho_manifesto(cache))
+
+
+def _entrada_valida(entrada, info, caminho_arquivo, destino):
+    if not entrada or entrada.get("versao") != VERSAO_CACHE or not os.path.exists(destino):
+        return False
+    if entrada["tamanho"] != info.st_size:
+        return False
+    if entrada["mtime"] == info.st_mtime:
+        return True
+    if entrada["sha1"] == _hash_arquivo(caminho_arquivo):
+        entrada["mtime"] = info.st_mtime  # arquivo só foi "tocado"
+        return True
+    return False
+
+
+def numero_processos(processos=None):
+    # Quantidade de processos da ingestão: argumento > PRF_PROCESSOS > núcleos
+    if processos is None:
+        processos = int(os.environ.get("PRF_PROCESSOS", 0)) or os.cpu_count() or 1
+    return max(1, processos)
+
+
+def _converter_em_blocos(caminho_arquivo, temporario, tamanho_bloco):
+    # Conversão com memória limitada ao bloco: cada bloco do CSV é limpo e
+    # gravado como row groups do Parquet. Devolve None se um bloco exigir um
+    # tipo mais largo que o dos blocos anteriores (estouro de int8/int16).
+    ano = ano_do_arquivo(caminho_arquivo)
+    relatorio = None
+    escritor = None
+    try:
+        for lote in abrir_csv_em_blocos(caminho_arquivo, tamanho_bloco):
+            tabela, parcial = limpar_tabela(pa.Table.from_batches([lote]), ano)
+            if escritor is None:
+                escritor = pq.ParquetWriter(temporario, tabela.schema)
+            try:
+                tabela = tabela.cast(escritor.schema)
+            except (pa.ArrowInvalid, ValueError):
+                return None
+            escritor.write_table(tabela, row_group_size=LINHAS_POR_GRUPO)
+            relatorio = somar_relatorios(relatorio, parcial)
+    finally:
+        if escritor is not None:
+            escritor.close()
+    return relatorio
+
+
+def converter_ano(caminho_arquivo, destino, tamanho_bloco=None):
+    # Executado em um processo de trabalho: lê, limpa e grava o Parquet do ano.
+    # Só metadados pequenos voltam ao processo principal; o DataFrame nunca é
+    # serializado entre processos. Com tamanho_bloco (bytes), o CSV é lido em
+    # blocos e o ano nunca fica inteiro na memória.
+    info = os.stat(caminho_arquivo)
+    # Temporário por processo e thread: dois workers que convertam o mesmo ano
+    # ao mesmo tempo não escrevem no mesmo arquivo (o último os.replace vale)
+    temporario = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+    relatorio = None
+    if tamanho_bloco:
+        relatorio = _converter_em_blocos(caminho_arquivo, temporario, tamanho_bloco)
+    if relatorio is None:
+        tabela, relatorio = ler_ano(caminho_arquivo)
+        pq.write_table(tabela, temporario, row_group_size=LINHAS_POR_GRUPO)
+    os.replace(temporario, destino)
+    return {
+        "tamanho": info.st_size,
+        "mtime": info.st_mtime,
+        "sha1": _hash_arquivo(caminho_arquivo),
+        "versao": VERSAO_CACHE,
+        "parquet": os.path.basename(destino),
+        "limpeza": relatorio["colunas"],
+        "problemas_esquema": relatorio["problemas"],
+    }
+
+
+def atualizar_cache(caminho=CAMINHO_DADOS, cache=CAMINHO_CACHE, processos=None, tamanho_bloco=None, arquivos=None):
+    # Converte para Parquet apenas os anos novos ou alterados (em paralelo,
+    # um ano por processo) e devolve os caminhos dos Parquets em ordem de ano.
+    # arquivos: restringe a alguns CSVs de `caminho` (padrão: todos).
+    os.makedirs(cache, exist_ok=True)
+    manifesto = _ler_manifesto(cache)
+    parquets = []
+    pendentes = {}
+    alteradas = {}                      # entradas a gravar no manifesto (nada muda: nada é gravado)
+
+    for arq in listar_arquivos(caminho) if arquivos is None else arquivos:
+        caminho_arquivo = os.path.join(caminho, arq)
+        destino = os.path.join(cache, f"{os.path.splitext(arq)[0]}.parquet")
+        info = os.stat(caminho_arquivo)
+
+        entrada = manifesto.get(arq)
+        mtime_anterior = entrada.get("mtime") if entrada else None
+        if not _entrada_valida(entrada, info, caminho_arquivo, destino):
+            pendentes[arq] = (caminho_arquivo, destino, tamanho_bloco)
+        elif entrada["mtime"] != mtime_anterior:
+            alteradas[arq] = entrada
+        parquets.append(destino)
+
+    processos = min(numero_processos(processos), len(pendentes))
+    if processos > 1 and "fork" in multiprocessing.get_all_start_methods():
+        # Com "spawn" (Windows) cada processo reexecutaria o script principal,
+        # que roda no nível do módulo; nesses sistemas a conversão é sequencial.
+        print(f"🔄 Convertendo {len(pendentes)} arquivo(s) para Parquet com {processos} processos...")
+        contexto = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as executor:
+            futuros = {executor.submit(converter_ano, *args): arq for arq, args in pendentes.items()}
+            for futuro in as_completed(futuros):
+                manifesto[futuros[futuro]] = futuro.result()
+    else:
+        for arq, args in pendentes.items():
+            print(f"🔄 Convertendo {arq} para Parquet...")
+            manifesto[arq] = converter_ano(*args)
+
+    for arq in pendentes:
+        alteradas[arq] = manifesto[arq]
+        if manifesto[arq]["problemas_esquema"]:
+            print(formatar_problemas(manifesto[arq]["problemas_esquema"], arq))
+
+    if alteradas:
+        _atualizar_manifesto(cache, alteradas)
+    return parquets
+
+
+def anos_em_cache(caminho=CAMINHO_DADOS, cache=CAMINHO_CACHE, processos=None):
+    # {ano: (parquet, versão)} com o cache atualizado; a versão muda sempre
+    # que o CSV ou a limpeza mudam e serve de chave para caches derivados
+    parquets = atualizar_cache(caminho, cache, processos)
+    manifesto = _ler_manifesto(cache)
+    anos = {}
+    for arq, destino in zip(listar_arquivos(caminho), parquets):
+        anos[ano_do_arquivo(arq)] = (destino, f"{manifesto[arq]['sha1']}-v{VERSAO_CACHE}")
+    return anos
+
+
+# === Carregamento ===
+def _restaurar_nulaveis(df):
+    # Inteiros com nulos (br, id, mes) voltam do Arrow como float; restaura os Int* do esquema
+    for col, tipo in NULAVEIS.items():
+        if col in df.columns:
+            try:
+                df[col] = df[col].astype(tipo)
+            except TypeError:            # promovida na limpeza (PROMOCAO_INTEIROS): não cabe no tipo declarado
+                df[col] = df[col].astype("Int64")
+    return df
+
+
+def para_pandas(tabela):
+    return _restaurar_nulaveis(tabela.to_pandas(split_blocks=True, self_destruct=True))
+
+
+def _ler_parquet(destino, colunas=None):
+    if colunas is None:
+        return pq.read_table(destino, memory_map=True)
+    disponiveis = set(pq.read_schema(destino).names)
+    return pq.read_table(destino, columns=[c for c in colunas if c in disponiveis], memory_map=True)
+
+
+def carregar_dados(colunas=None, caminho=CAMINHO_DADOS, cache=CAMINHO_CACHE, processos=None):
+    # colunas=None carrega todas; caso contrário só as colunas pedidas são lidas
+    # do disco (colunas ausentes em algum ano ficam nulas).
+    tabelas = [_ler_parquet(destino, colunas) for destino in atualizar_cache(caminho, cache, processos)]
+
+    # concat_tables só encadeia os blocos de cada ano (sem cópia) e unifica os
+    # dicionários das colunas categóricas; um pd.concat de categorias
+    # diferentes viraria coluna object. Na conversão para pandas, self_destruct
+    # libera cada coluna Arrow assim que ela é convertida, evitando ter duas
+    # cópias completas da base em memória.
+    tabela = pa.concat_tables(tabelas, promote_options="permissive")
+    del tabelas
+    return para_pandas(tabela)
+
+
+# === Anos mapeados em memória (vários processos, uma cópia) ===
+# O Parquet é comprimido: cada processo que o lê descomprime a sua própria
+# cópia. Para servidores com vários workers (ex.: gunicorn -w 4), o ano é
+# gravado uma única vez como Arrow IPC sem compressão e aberto por memory
+# map; os buffers das colunas são as páginas do arquivo, que o sistema
+# operacional compartilha entre todos os processos que o abrem.
+@contextmanager
+def _trava(caminho_trava):
+    # Trava exclusiva entre processos (flock); sem fcntl, sem trava
+    with open(caminho_trava, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _gravar_mapeado(tabela, destino):
+    # Um único bloco por coluna e decimais nulos como NaN: assim cada coluna
+    # numérica vira um array numpy apontando direto para o arquivo
+    tabela = tabela.combine_chunks()
+    colunas = [pc.fill_null(coluna, np.nan) if pa.types.is_floating(coluna.type) else coluna
+               for coluna in tabela.columns]
+    tabela = pa.table(colunas, names=tabela.column_names)
+    temporario = f"{destino}.{os.getpid()}.tmp"
+    with pa.OSFile(temporario, "wb") as arquivo, pa.ipc.new_file(arquivo, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+    os.replace(temporario, destino)
+
+
+def _coluna_sem_copia(coluna):
+    # Numéricas sem nulos: visão somente leitura sobre o arquivo mapeado.
+    # Categorias: só os códigos apontam para o arquivo (o dicionário é
+    # pequeno). O resto (texto, datas, inteiros com nulos) é copiado.
+    # (combine_chunks copiaria até uma coluna de um bloco só)
+    coluna = coluna.chunk(0) if coluna.num_chunks == 1 else coluna.combine_chunks()
+    if coluna.null_count == 0 and (pa.types.is_integer(coluna.type) or pa.types.is_floating(coluna.type)):
+        return coluna.to_numpy(zero_copy_only=True)
+    if pa.types.is_dictionary(coluna.type) and coluna.indices.null_count == 0:
+        categorias = pd.Index(coluna.dictionary.to_pandas())
+        return pd.Categorical.from_codes(coluna.indices.to_numpy(zero_copy_only=True), categories=categorias)
+    return coluna.to_pandas()
+
+
+def versao_parquet(destino):
+    # O Parquet é sempre substituído por inteiro: tamanho + mtime o identificam
+    info = os.stat(destino)
+    return hashlib.sha1(f"{VERSAO_CACHE}:{info.st_size}:{info.st_mtime_ns}".encode()).hexdigest()[:8]
+
+
+def remover_versoes_antigas(pasta, prefixo, atual):
+    # Arquivos derivados de versões anteriores de um Parquet (quem ainda os
+    # tem abertos continua lendo; o arquivo some ao ser fechado)
+    for antigo in os.listdir(pasta):
+        if antigo.startswith(prefixo) and antigo.endswith(".arrow") and antigo != os.path.basename(atual):
+            try:
+                os.remove(os.path.join(pasta, antigo))
+            except OSError:              # Windows: ainda aberto por outro processo
+                pass
+
+
+def mapear_ano(arquivo, colunas=None, caminho=CAMINHO_DADOS, cache=CAMINHO_CACHE, mapeados=CAMINHO_MAPEADOS):
+    # Um único ano (ex.: "datatran2023.csv"), convertendo só ele se preciso e
+    # no próprio processo; usado pela carga incremental do dashboard. O
+    # DataFrame aponta para o arquivo mapeado (sem cópia, somente leitura). O
+    # primeiro processo a pedir o ano converte e grava; os outros esperam na
+    # trava e só abrem o arquivo pronto.
+    os.makedirs(mapeados, exist_ok=True)
+    base = os.path.splitext(arquivo)[0]
+    with _trava(os.path.join(mapeados, f"{base}.trava")):
+        destino, = atualizar_cache(caminho, cache, processos=1, arquivos=[arquivo])
+        prefixo = f"{base}-{hashlib.sha1(repr(colunas).encode()).hexdigest()[:8]}-"
+        mapeado = os.path.join(mapeados, f"{prefixo}{versao_parquet(destino)}.arrow")
+        if not os.path.exists(mapeado):
+            _gravar_mapeado(_ler_parquet(destino, colunas), mapeado)
+            remover_versoes_antigas(mapeados, prefixo, mapeado)
+
+    tabela = pa.ipc.open_file(pa.memory_map(mapeado)).read_all()
+    return _restaurar_nulaveis(pd.DataFrame(
+        {nome: _coluna_sem_copia(tabela.column(nome)) for nome in tabela.column_names}, copy=False
+    ))
+
+
+def esquema_unificado(destinos, colunas=None):
+    # Esquema comum a todos os anos (mesma promoção de tipos e ordem de
+    # colunas do concat_tables de carregar_dados)
+    esquema = pa.unify_schemas([pq.read_schema(destino) for destino in destinos], promote_options="permissive")
+    if colunas is not None:
+        esquema = pa.schema([esquema.field(c) for c in colunas if c in esquema.names])
+    return esquema
+
+
+def iterar_tabelas(colunas=None, linhas_por_bloco=LINHAS_POR_BLOCO, caminho=CAMINHO_DADOS, cache=CAMINHO_CACHE):
+    # Modo streaming: percorre os anos em ordem, um bloco Arrow de até
+    # `linhas_por_bloco` linhas por vez, todos no esquema unificado (colunas
+    # ausentes em algum ano vêm nulas). A memória usada é limitada ao bloco (e
+    # ao row group do Parquet), não ao tamanho da base. Anos ainda não
+    # convertidos são lidos do CSV também em blocos, um arquivo por vez.
+    destinos = atualizar_cache(caminho, cache, processos=1, tamanho_bloco=TAMANHO_BLOCO_CSV)
+    esquema = esquema_unificado(destinos, colunas)
+    for destino in destinos:
+        arquivo = pq.ParquetFile(destino, memory_map=True)
+        nomes = set(arquivo.schema_arrow.names)
+        for lote in arquivo.iter_batches(batch_size=linhas_por_bloco, columns=[c for c in esquema.names if c in nomes]):
+            yield pa.table([
+                lote.column(campo.name).cast(campo.type) if campo.name in nomes else pa.nulls(lote.num_rows, campo.type)
+                for campo in esquema
+            ], schema=esquema)
+
+
+def iterar_blocos(colunas=None, linhas_por_bloco=LINHAS_POR_BLOCO, caminho=CAMINHO_DADOS, cache=CAMINHO_CACHE):
+    # Os blocos de iterar_tabelas como DataFrames, na mesma ordem de linhas e
+    # colunas de carregar_dados
+    for tabela in iterar_tabelas(colunas, linhas_por_bloco, caminho, cache):
+        yield para_pandas(tabela)
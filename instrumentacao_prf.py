@@ -0,0 +1,206 @@
+# instrumentacao_prf.py
+# Medição leve de cada etapa do pipeline: tempo de parede, tempo de CPU, pico
+# de memória (RSS) e linhas processadas, gravados em desempenho.json ao lado
+# do texto_analise.txt (o gerar_relatorio.py monta o apêndice de desempenho a
+# partir dele). Etapas podem ser aninhadas ("modelagem/busca") e qualquer uma
+# pode ser perfilada por amostragem (--perfil ou PRF_PERFIL), gerando pilhas
+# no formato "folded" dos flame graphs em perfis/.
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:                  # Windows
+    resource = None
+
+ARQUIVO_DESEMPENHO = "desempenho.json"
+CAMINHO_PERFIS = "perfis"
+INTERVALO_PERFIL = 0.005             # segundos entre amostras da pilha
+
+
+# === Memória ===
+def pico_memoria_mb():
+    # Pico de RSS desde o último zerar_pico_memoria() (VmHWM, Linux); nos
+    # demais sistemas, o pico desde o início do processo
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as f:
+            for linha in f:
+                if linha.startswith("VmHWM:"):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return float("nan")
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1 << 20) if sys.platform == "darwin" else pico / 1024
+
+
+def zerar_pico_memoria():
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _cpu_s():
+    # CPU deste processo + dos filhos já encerrados (ex.: pool de processos da ingestão)
+    cpu = time.process_time()
+    if resource is not None:
+        filhos = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu += filhos.ru_utime + filhos.ru_stime
+    return cpu
+
+
+def medir_chamada(funcao, *args, zerar_pico=True, **kwargs):
+    # Mede uma chamada isolada (usado nos processos de trabalho, ex.: gráficos).
+    # Devolve (resultado, medidas). No processo principal, dentro de uma
+    # etapa, use zerar_pico=False para não apagar o pico da etapa em curso.
+    if zerar_pico:
+        zerar_pico_memoria()
+    inicio, cpu = time.perf_counter(), _cpu_s()
+    resultado = funcao(*args, **kwargs)
+    return resultado, {
+        "segundos": time.perf_counter() - inicio,
+        "cpu_s": _cpu_s() - cpu,
+        "pico_mb": pico_memoria_mb(),
+    }
+
+
+# === Perfil por amostragem ===
+class AmostradorPerfil:
+    # Uma thread auxiliar lê a pilha da thread medida a cada `intervalo` s e
+    # conta as pilhas vistas; o custo fica na thread auxiliar, não no código
+    # perfilado
+    def __init__(self, intervalo=INTERVALO_PERFIL):
+        self.intervalo = intervalo
+        self.pilhas = Counter()
+
+    def __enter__(self):
+        self._alvo = threading.get_ident()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *excecao):
+        self._parar.set()
+        self._thread.join()
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo):
+            quadro = sys._current_frames().get(self._alvo)
+            pilha = []
+            while quadro is not None:
+                codigo = quadro.f_code
+                pilha.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})")
+                quadro = quadro.f_back
+            if pilha:
+                self.pilhas[";".join(reversed(pilha))] += 1
+
+    def mais_frequentes(self, n=10):
+        # Funções onde a thread estava (topo da pilha), em fração das amostras
+        total = sum(self.pilhas.values()) or 1
+        topo = Counter()
+        for pilha, contagem in self.pilhas.items():
+            topo[pilha.rsplit(";", 1)[-1]] += contagem
+        return [(funcao, contagem / total) for funcao, contagem in topo.most_common(n)]
+
+    def salvar(self, destino):
+        # Formato "folded" (pilha;...;função contagem), aceito por flamegraph.pl e speedscope
+        os.makedirs(os.path.dirname(destino) or ".", exist_ok=True)
+        with open(destino, "w", encoding="utf-8") as f:
+            for pilha, contagem in self.pilhas.most_common():
+                f.write(f"{pilha} {contagem}\n")
+        return destino
+
+
+# === Etapas ===
+class Instrumentacao:
+    # perfil: nomes de etapas a perfilar (nome simples ou caminho completo,
+    # ex.: "busca" ou "modelagem/busca"); padrão: PRF_PERFIL, separado por vírgulas
+    def __init__(self, perfil=None):
+        if perfil is None:
+            perfil = [nome for nome in os.environ.get("PRF_PERFIL", "").split(",") if nome]
+        self.perfil = set(perfil)
+        self.registros = []
+        self._abertas = []
+
+    def _atualizar_picos(self):
+        pico = pico_memoria_mb()
+        for registro in self._abertas:
+            registro["pico_mb"] = max(registro["pico_mb"], pico)
+
+    @contextmanager
+    def etapa(self, nome, linhas=None):
+        # O registro é devolvido para que a etapa informe as linhas ao final
+        # (registro["linhas"] = n). O pico de memória é zerado na entrada; as
+        # etapas de fora recebem o pico medido até ali, para não perdê-lo.
+        caminho = "/".join([r["etapa"] for r in self._abertas[-1:]] + [nome])
+        registro = {"etapa": caminho, "segundos": 0.0, "cpu_s": 0.0, "pico_mb": 0.0, "linhas": linhas}
+        self._atualizar_picos()
+        zerar_pico_memoria()
+        self._abertas.append(registro)
+        self.registros.append(registro)
+        amostrador = AmostradorPerfil() if {nome, caminho} & self.perfil else None
+        inicio, cpu = time.perf_counter(), _cpu_s()
+        try:
+            if amostrador is None:
+                yield registro
+            else:
+                with amostrador:
+                    yield registro
+        finally:
+            registro["segundos"] = time.perf_counter() - inicio
+            registro["cpu_s"] = _cpu_s() - cpu
+            self._atualizar_picos()
+            self._abertas.pop()
+            if amostrador is not None:
+                destino = amostrador.salvar(os.path.join(CAMINHO_PERFIS, caminho.replace("/", "__") + ".folded"))
+                print(f"\U0001F52C Perfil de '{caminho}' salvo em '{destino}'; mais frequentes:")
+                for funcao, fracao in amostrador.mais_frequentes(5):
+                    print(f"   {fracao:6.1%}  {funcao}")
+
+    def registrar(self, nome, medidas, linhas=None):
+        # Medidas feitas fora deste processo (ex.: medir_chamada num processo de trabalho)
+        caminho = "/".join([r["etapa"] for r in self._abertas[-1:]] + [nome])
+        self.registros.append({"etapa": caminho, "segundos": medidas["segundos"], "cpu_s": medidas["cpu_s"],
+                               "pico_mb": medidas["pico_mb"], "linhas": linhas})
+
+    def salvar(self, caminho=ARQUIVO_DESEMPENHO):
+        # Junta com o arquivo existente: cada etapa de primeiro nível desta
+        # execução substitui a da execução anterior (--etapas refaz só parte)
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                desempenho = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            desempenho = {"etapas": {}}
+        grupos = {}
+        for registro in self.registros:
+            grupo = registro["etapa"].split("/", 1)[0]
+            grupos.setdefault(grupo, []).append({
+                chave: round(valor, 3) if isinstance(valor, float) else valor for chave, valor in registro.items()
+            })
+        desempenho["etapas"].update(grupos)
+        desempenho["gerado_em"] = datetime.now().isoformat(timespec="seconds")
+        with open(caminho + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(desempenho, f, indent=2, ensure_ascii=False)
+        os.replace(caminho + ".tmp", caminho)
+        return caminho
+
+
+def carregar_desempenho(caminho=ARQUIVO_DESEMPENHO):
+    # Lista de registros na ordem das etapas, ou [] se ainda não há medições
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            desempenho = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+    return [registro for grupo in desempenho["etapas"].values() for registro in grupo]
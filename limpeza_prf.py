@@ -0,0 +1,243 @@
+# limpeza_prf.py
+# Etapa de limpeza compartilhada por todos os scripts. O CSV de cada ano é lido
+# direto para o Arrow e cada coluna é convertida em uma passada vetorizada
+# (tokens de nulo, vírgula decimal, datas em formato fixo) pelos kernels do
+# pyarrow.compute, sem criar um objeto str do Python por célula.
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+from esquema_prf import (
+    CATEGORICAS, CONTAGENS, DATAS, DECIMAIS, DERIVADAS, DIAS_SEMANA, INTEIROS_OPCIONAIS,
+    OBRIGATORIAS, COLUNAS_ESPERADAS, PROMOCAO_INTEIROS,
+)
+
+# === CONFIGURAÇÃO ===
+ENCODING = "latin1"
+SEPARADOR = ";"
+TOKENS_NULOS = ["(null)", ""]
+FORMATOS_DATA = ["%Y-%m-%d", "%d/%m/%Y", "%d/%m/%y"]   # tentados nesta ordem
+PREENCHIMENTOS = {"condicao_metereologica": "Ignorado"}
+REGEX_NUMERO = r"^-?\d+([.,]\d+)?$"
+
+TIPOS_ARROW = {"int8": pa.int8(), "int16": pa.int16(), "int32": pa.int32(), "int64": pa.int64()}
+
+
+# === Leitura ===
+def _colunas_cabecalho(caminho_arquivo):
+    with open(caminho_arquivo, "r", encoding=ENCODING) as f:
+        return [col.strip().strip('"') for col in f.readline().rstrip("\r\n").split(SEPARADOR)]
+
+
+def opcoes_csv(caminho_arquivo, tamanho_bloco=None):
+    # Todas as colunas chegam como texto do Arrow; os tokens de nulo já viram
+    # nulo no próprio leitor e a conversão de tipos fica com limpar_tabela.
+    leitura = pacsv.ReadOptions(encoding=ENCODING)
+    if tamanho_bloco:
+        leitura.block_size = tamanho_bloco
+    analise = pacsv.ParseOptions(delimiter=SEPARADOR)
+    conversao = pacsv.ConvertOptions(
+        column_types={col: pa.string() for col in _colunas_cabecalho(caminho_arquivo)},
+        null_values=TOKENS_NULOS,
+        strings_can_be_null=True,
+        quoted_strings_can_be_null=True,
+    )
+    return leitura, analise, conversao
+
+
+def ler_csv(caminho_arquivo):
+    return pacsv.read_csv(caminho_arquivo, *opcoes_csv(caminho_arquivo))
+
+
+def abrir_csv_em_blocos(caminho_arquivo, tamanho_bloco=64 << 20):
+    # Leitor incremental (um RecordBatch por bloco) para arquivos que não cabem na memória
+    return pacsv.open_csv(caminho_arquivo, *opcoes_csv(caminho_arquivo, tamanho_bloco))
+
+
+# === Relatório ===
+def _registrar(relatorio, coluna, nulos=0, invalidos=0, preenchidos=0, exemplos=None):
+    relatorio["colunas"][coluna] = {"nulos": nulos, "invalidos": invalidos, "preenchidos": preenchidos}
+    if invalidos:
+        relatorio["problemas"].append({
+            "coluna": coluna, "problema": "valores inválidos", "quantidade": invalidos,
+            "exemplos": [str(v) for v in exemplos],
+        })
+
+
+def _invalidos(original, convertido):
+    # Valores presentes no texto que não sobreviveram à conversão
+    mascara = pc.and_(pc.is_valid(original), pc.is_null(convertido))
+    quantidade = pc.sum(mascara).as_py() or 0
+    exemplos = pc.unique(pc.filter(original, mascara)).slice(0, 5).to_pylist() if quantidade else []
+    return quantidade, exemplos
+
+
+# === Conversões por coluna ===
+def _numero(texto):
+    aparado = pc.utf8_trim_whitespace(texto)
+    validos = pc.if_else(pc.match_substring_regex(aparado, REGEX_NUMERO), aparado, None)
+    return pc.cast(pc.replace_substring(validos, ",", "."), pa.float64())
+
+
+def _inteiro(numeros, coluna, tipo, relatorio):
+    fracionarios = pc.not_equal(numeros, pc.round(numeros))
+    quantidade = pc.sum(fracionarios).as_py() or 0
+    if quantidade:
+        relatorio["problemas"].append({
+            "coluna": coluna, "problema": "valores fracionários em coluna inteira", "quantidade": quantidade,
+            "exemplos": [str(v) for v in pc.unique(pc.filter(numeros, fracionarios)).slice(0, 5).to_pylist()],
+        })
+
+    base = tipo.lower()
+    arredondados = pc.round(numeros)
+    while True:
+        # Limites em float (exatos: potências de 2), comparados com os valores
+        # já arredondados; no int64 o máximo + 1 é 2**63
+        limites = np.iinfo(base)
+        fora = pc.or_(pc.greater_equal(arredondados, float(limites.max) + 1),
+                      pc.less(arredondados, float(limites.min)))
+        quantidade = pc.sum(fora).as_py() or 0
+        if not quantidade:
+            break
+        maior = PROMOCAO_INTEIROS.get(base)
+        exemplos = [str(v) for v in pc.unique(pc.filter(numeros, fora)).slice(0, 5).to_pylist()]
+        if maior is None:
+            # Nem o int64 comporta: esses valores viram nulos
+            relatorio["problemas"].append({
+                "coluna": coluna, "problema": f"valores fora do intervalo de {base}; substituídos por nulo",
+                "quantidade": quantidade, "exemplos": exemplos,
+            })
+            arredondados = pc.if_else(fora, pa.scalar(None, arredondados.type), arredondados)
+            break
+        relatorio["problemas"].append({
+            "coluna": coluna, "problema": f"valores fora do intervalo de {base}; usando {maior}",
+            "quantidade": quantidade, "exemplos": exemplos,
+        })
+        base = maior
+    return pc.cast(arredondados, TIPOS_ARROW[base])
+
+
+def _gravidade(mortos, feridos_graves):
+    # Soma em int64 e volta ao menor tipo, a partir do int16 do esquema, que
+    # comporta o resultado: as duas contagens podem ter sido promovidas por
+    # _inteiro, e a soma de dois int16 já pode estourar o int16
+    soma = pc.add(pc.cast(mortos, pa.int64()), pc.cast(feridos_graves, pa.int64()))
+    extremos = pc.min_max(soma)
+    menor, maior = extremos["min"].as_py() or 0, extremos["max"].as_py() or 0
+    base = "int16"
+    while base in PROMOCAO_INTEIROS and (maior > np.iinfo(base).max or menor < np.iinfo(base).min):
+        base = PROMOCAO_INTEIROS[base]
+    return pc.cast(soma, TIPOS_ARROW[base])
+
+
+def _data(texto):
+    aparado = pc.utf8_trim_whitespace(texto)
+    datas = None
+    for formato in FORMATOS_DATA:
+        convertidas = pc.strptime(aparado, format=formato, unit="s", error_is_null=True)
+        datas = convertidas if datas is None else pc.coalesce(datas, convertidas)
+        if datas.null_count == aparado.null_count:
+            break
+    return datas
+
+
+def _dia_semana(datas):
+    dicionario = pa.array(DIAS_SEMANA)
+    indices = pc.cast(pc.day_of_week(datas), pa.int8())   # segunda-feira = 0
+    return pa.chunked_array(
+        [pa.DictionaryArray.from_arrays(bloco, dicionario) for bloco in indices.chunks],
+        type=pa.dictionary(pa.int8(), pa.string()),
+    )
+
+
+# === Limpeza de uma tabela (um ano inteiro ou um bloco dele) ===
+def limpar_tabela(tabela, ano):
+    # Devolve (tabela, relatorio). O relatório traz, por coluna, quantos nulos
+    # vieram do arquivo, quantos valores eram inválidos e quantos nulos foram
+    # preenchidos com valor padrão; "problemas" lista o que não bate com o
+    # esquema (colunas ausentes/desconhecidas, valores inválidos, estouros).
+    relatorio = {"colunas": {}, "problemas": []}
+    colunas = {}
+
+    for col in COLUNAS_ESPERADAS:
+        if col not in tabela.column_names:
+            relatorio["problemas"].append({"coluna": col, "problema": "coluna ausente"})
+
+    for col in tabela.column_names:
+        texto = tabela.column(col)
+        nulos = texto.null_count
+
+        if col in CATEGORICAS:
+            preenchidos = 0
+            if col in PREENCHIMENTOS:
+                preenchidos = nulos
+                texto = pc.fill_null(texto, PREENCHIMENTOS[col])
+            colunas[col] = pc.dictionary_encode(texto)
+            _registrar(relatorio, col, nulos, preenchidos=preenchidos)
+        elif col in CONTAGENS or col in INTEIROS_OPCIONAIS:
+            numeros = _numero(texto)
+            invalidos, exemplos = _invalidos(texto, numeros)
+            preenchidos = 0
+            if col in CONTAGENS:
+                preenchidos = numeros.null_count
+                numeros = pc.fill_null(numeros, 0)
+            tipo = CONTAGENS.get(col) or INTEIROS_OPCIONAIS[col]
+            colunas[col] = _inteiro(numeros, col, tipo, relatorio)
+            _registrar(relatorio, col, nulos, invalidos, preenchidos, exemplos)
+        elif col in DECIMAIS:
+            numeros = _numero(texto)
+            invalidos, exemplos = _invalidos(texto, numeros)
+            colunas[col] = pc.cast(numeros, pa.float32())
+            _registrar(relatorio, col, nulos, invalidos, exemplos=exemplos)
+        elif col in DATAS:
+            datas = _data(texto)
+            invalidos, exemplos = _invalidos(texto, datas)
+            colunas[col] = datas
+            _registrar(relatorio, col, nulos, invalidos, exemplos=exemplos)
+        elif col in DERIVADAS:
+            continue   # recalculadas abaixo
+        else:
+            relatorio["problemas"].append({"coluna": col, "problema": "coluna fora do esquema (mantida como texto)"})
+            colunas[col] = texto
+
+    for col in OBRIGATORIAS:
+        if col not in colunas:
+            colunas[col] = pa.array(np.zeros(tabela.num_rows, dtype=CONTAGENS[col]))
+
+    # === Colunas derivadas ===
+    colunas["ano"] = pa.array(np.full(tabela.num_rows, ano, dtype=np.int16))
+    colunas["gravidade"] = _gravidade(colunas["mortos"], colunas["feridos_graves"])
+    if "data_inversa" in colunas:
+        colunas["mes"] = pc.cast(pc.month(colunas["data_inversa"]), pa.int8())
+        colunas["dia_semana"] = _dia_semana(colunas["data_inversa"])
+
+    return pa.table(colunas), relatorio
+
+
+def somar_relatorios(total, parcial):
+    # Junta o relatório de um bloco ao acumulado (contagens somadas, problemas
+    # iguais unificados) para a leitura em blocos
+    if total is None:
+        return parcial
+    for col, contagens in parcial["colunas"].items():
+        acumulado = total["colunas"].setdefault(col, dict.fromkeys(contagens, 0))
+        for chave, valor in contagens.items():
+            acumulado[chave] += valor
+
+    existentes = {(p["coluna"], p["problema"]): p for p in total["problemas"]}
+    for problema in parcial["problemas"]:
+        existente = existentes.get((problema["coluna"], problema["problema"]))
+        if existente is None:
+            total["problemas"].append(problema)
+            existentes[(problema["coluna"], problema["problema"])] = problema
+        elif "quantidade" in problema:
+            existente["quantidade"] += problema["quantidade"]
+            novos = [e for e in problema["exemplos"] if e not in existente["exemplos"]]
+            existente["exemplos"] = (existente["exemplos"] + novos)[:5]
+    return total
+
+
+def ler_e_limpar(caminho_arquivo, ano):
+    return limpar_tabela(ler_csv(caminho_arquivo), ano)
@@ -0,0 +1,93 @@
+# modelos_prf.py
+# Persistência dos modelos de gravidade: os modelos treinados, o
+# StandardScaler, as features e os valores usados no preenchimento de nulos
+# são gravados juntos, com metadados de versão, para que novos arquivos
+# possam ser pontuados sem retreinar (ver pontuar_prf.py).
+
+import os
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+from ingestao_prf import VERSAO_CACHE
+
+CAMINHO_MODELOS = "modelos"
+ARQUIVO_MODELOS = "modelos_gravidade.joblib"
+VERSAO_MODELOS = 2                        # incrementar se o formato do pacote mudar
+PRECISAM_ESCALA = {"logistica"}           # modelos treinados sobre as features padronizadas
+USAM_CATEGORICAS = {"hist_gradient_boosting", "logistica_hash"}   # pipelines de features_prf
+LIMIAR = 0.5                              # probabilidade a partir da qual gravidade_alta = 1
+
+
+def salvar_modelos(modelos, scaler, features, medianas, metricas=None, categoricas=(), pasta=CAMINHO_MODELOS):
+    # modelos: {nome: estimador ajustado}; medianas: {feature: valor} usado
+    # para preencher nulos, igual ao treino; categoricas: colunas de texto
+    # lidas pelos modelos de USAM_CATEGORICAS
+    os.makedirs(pasta, exist_ok=True)
+    pacote = {
+        "modelos": modelos,
+        "scaler": scaler,
+        "features": list(features),
+        "categoricas": list(categoricas),
+        "medianas": {col: float(valor) for col, valor in medianas.items()},
+        "metadados": {
+            "versao_modelos": VERSAO_MODELOS,
+            "versao_cache": VERSAO_CACHE,
+            "sklearn": sklearn.__version__,
+            "numpy": np.__version__,
+            "treinado_em": datetime.now().isoformat(timespec="seconds"),
+            "metricas": metricas or {},
+        },
+    }
+    destino = os.path.join(pasta, ARQUIVO_MODELOS)
+    joblib.dump(pacote, destino + ".tmp", compress=3)
+    os.replace(destino + ".tmp", destino)
+    return destino
+
+
+def carregar_modelos(pasta=CAMINHO_MODELOS):
+    origem = os.path.join(pasta, ARQUIVO_MODELOS)
+    if not os.path.exists(origem):
+        raise FileNotFoundError(f"Modelos '{origem}' não encontrados; execute antes a etapa modelagem")
+    pacote = joblib.load(origem)
+    metadados = pacote["metadados"]
+    if metadados["versao_modelos"] != VERSAO_MODELOS:
+        raise ValueError(f"Pacote de modelos na versão {metadados['versao_modelos']}, esperado {VERSAO_MODELOS}; retreine")
+    if metadados["sklearn"] != sklearn.__version__:
+        print(f"⚠️ Modelos treinados com scikit-learn {metadados['sklearn']}, em uso {sklearn.__version__}")
+    if metadados["versao_cache"] != VERSAO_CACHE:
+        print(f"⚠️ Modelos treinados com a limpeza v{metadados['versao_cache']}, em uso v{VERSAO_CACHE}")
+    return pacote
+
+
+# === Pontuação ===
+def matriz_features(colunas, pacote):
+    # colunas: {feature: array numérico com NaN nos nulos}. Preenche os nulos
+    # com as medianas do treino; linhas que ainda tiverem nulo (ex.: sem
+    # mortos/feridos_graves) ficam marcadas como inválidas.
+    X = np.column_stack([np.asarray(colunas[col], dtype=np.float64) for col in pacote["features"]])
+    for i, col in enumerate(pacote["features"]):
+        if col in pacote["medianas"]:
+            X[np.isnan(X[:, i]), i] = pacote["medianas"][col]
+    validas = ~np.isnan(X).any(axis=1)
+    return X, validas
+
+
+def probabilidades(pacote, nome_modelo, X, validas, categoricas=None):
+    # Probabilidade de gravidade_alta (NaN nas linhas inválidas).
+    # categoricas: {coluna: pd.Series}, exigido pelos modelos de USAM_CATEGORICAS
+    modelo = pacote["modelos"][nome_modelo]
+    entrada = pd.DataFrame(X[validas], columns=pacote["features"])   # treinados com nomes de colunas
+    if nome_modelo in USAM_CATEGORICAS:
+        posicoes = np.flatnonzero(validas)
+        for col in pacote["categoricas"]:
+            entrada[col] = categoricas[col].iloc[posicoes].array
+    if nome_modelo in PRECISAM_ESCALA:
+        entrada = pacote["scaler"].transform(entrada)
+    resultado = np.full(len(X), np.nan)
+    if len(entrada):
+        resultado[validas] = modelo.predict_proba(entrada)[:, 1]
+    return resultado
@@ -0,0 +1,47 @@
+# particoes_prf.py
+# Índice de partições por ano: o DataFrame é ordenado uma única vez por ano e
+# cada ano vira uma fatia contígua, acessada em O(1) sem varrer a base. Filtros
+# adicionais (uf, br) usam índices posicionais montados sob demanda e
+# guardados para as próximas consultas. Uma base já em ordem de ano (ex.: o
+# ano mapeado em memória do dashboard) é usada como está, sem cópia.
+
+import numpy as np
+
+
+class IndiceParticoes:
+    def __init__(self, df, chave="ano"):
+        self.chave = chave
+        ordenada = df[chave].is_monotonic_increasing
+        self.df = df if ordenada else df.sort_values(chave, kind="stable", ignore_index=True)
+
+        valores = self.df[chave].to_numpy()
+        chaves, inicios = np.unique(valores, return_index=True)
+        fins = np.append(inicios[1:], len(valores))
+        self.fatias = {k.item(): slice(i, f) for k, i, f in zip(chaves, inicios, fins)}
+        self._posicoes = {}   # coluna -> {(ano, valor): posições na base ordenada}
+
+    @property
+    def chaves(self):
+        return list(self.fatias)
+
+    def particao(self, valor):
+        # Fatia do ano (view, sem cópia); ano inexistente devolve fatia vazia
+        return self.df.iloc[self.fatias.get(valor, slice(0, 0))]
+
+    def _indice_coluna(self, coluna):
+        if coluna not in self._posicoes:
+            grupos = self.df.groupby([self.chave, coluna], observed=True, sort=False).indices
+            self._posicoes[coluna] = {chave: np.sort(posicoes) for chave, posicoes in grupos.items()}
+        return self._posicoes[coluna]
+
+    def filtrar(self, valor, **filtros):
+        # Ex.: filtrar(2023, uf="MG", br=381). Cada filtro é resolvido pelo
+        # índice (ano, coluna) e as posições são intersectadas.
+        if not filtros:
+            return self.particao(valor)
+
+        posicoes = None
+        for coluna, alvo in filtros.items():
+            encontradas = self._indice_coluna(coluna).get((valor, alvo), np.empty(0, dtype=np.intp))
+            posicoes = encontradas if posicoes is None else np.intersect1d(posicoes, encontradas, assume_unique=True)
+        return self.df.iloc[posicoes]
@@ -0,0 +1,125 @@
+# pontuar_prf.py
+# Pontuação em lote de novos arquivos da PRF com os modelos salvos pela etapa
+# de modelagem de analise_prf_completo.py. Cada CSV é lido em blocos, passa
+# pela mesma limpeza da ingestão (limpeza_prf) e recebe a probabilidade de
+# gravidade_alta; o arquivo nunca é carregado inteiro na memória.
+#
+# Uso: python pontuar_prf.py dados/novos/*.csv --saida pontuacoes
+
+import argparse
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+from ingestao_prf import numero_processos
+from limpeza_prf import abrir_csv_em_blocos, limpar_tabela
+from modelos_prf import LIMIAR, USAM_CATEGORICAS, carregar_modelos, matriz_features, probabilidades
+
+TAMANHO_BLOCO = 16 << 20                                # bytes de CSV por bloco
+COLUNAS_IDENTIFICACAO = ["id", "data_inversa", "uf", "br", "km", "municipio"]
+
+
+def _ano(caminho_arquivo):
+    # Ano do nome do arquivo (datatran2024.csv), se houver
+    anos = re.findall(r"(?:19|20)\d{2}", os.path.basename(caminho_arquivo))
+    return int(anos[-1]) if anos else 0
+
+
+def _para_csv(coluna):
+    # Dicionários viram texto (cada bloco tem o seu) e datas saem sem horário
+    if pa.types.is_dictionary(coluna.type):
+        return coluna.cast(coluna.type.value_type)
+    if pa.types.is_timestamp(coluna.type):
+        return coluna.cast(pa.date32())
+    return coluna
+
+
+def pontuar_arquivo(caminho_arquivo, pacote, nome_modelo, destino, tamanho_bloco=TAMANHO_BLOCO):
+    # Grava em `destino` (CSV) as colunas de identificação presentes, a
+    # probabilidade e a previsão; devolve (linhas, segundos)
+    inicio = time.perf_counter()
+    linhas = 0
+    escritor = None
+    temporario = destino + ".tmp"
+    try:
+        for lote in abrir_csv_em_blocos(caminho_arquivo, tamanho_bloco):
+            tabela, _ = limpar_tabela(pa.Table.from_batches([lote]), _ano(caminho_arquivo))
+            colunas = {
+                col: tabela.column(col).to_numpy(zero_copy_only=False).astype(np.float64)
+                if col in tabela.column_names else np.full(tabela.num_rows, np.nan)
+                for col in pacote["features"]
+            }
+            X, validas = matriz_features(colunas, pacote)
+            categoricas = None
+            if nome_modelo in USAM_CATEGORICAS:
+                # Dicionários do Arrow viram pd.Categorical: os modelos codificam cada categoria uma vez
+                categoricas = {
+                    col: tabela.column(col).to_pandas() if col in tabela.column_names
+                    else pd.Series([None] * tabela.num_rows, dtype="object")
+                    for col in pacote["categoricas"]
+                }
+            prob = probabilidades(pacote, nome_modelo, X, validas, categoricas)
+
+            identificacao = [c for c in COLUNAS_IDENTIFICACAO if c in tabela.column_names]
+            saida = tabela.select(identificacao)
+            saida = pa.table([_para_csv(c) for c in saida.columns], names=identificacao)
+            saida = saida.append_column("prob_gravidade_alta", pa.array(prob, mask=np.isnan(prob)))
+            previsao = pa.array((prob >= LIMIAR).astype(np.int8), mask=np.isnan(prob))
+            saida = saida.append_column("gravidade_alta_prevista", previsao)
+
+            if escritor is None:
+                escritor = pacsv.CSVWriter(temporario, saida.schema)
+            escritor.write_table(saida)
+            linhas += tabela.num_rows
+    except BaseException:
+        # Falha no meio da pontuação: o temporário pela metade não fica no disco
+        try:
+            if escritor is not None:
+                escritor.close()
+        finally:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+        raise
+    if escritor is not None:
+        escritor.close()
+        os.replace(temporario, destino)
+    return linhas, time.perf_counter() - inicio
+
+
+# === Linha de comando ===
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pontua novos CSVs da PRF com os modelos salvos")
+    parser.add_argument("arquivos", nargs="+", help="CSVs no formato dos dados da PRF")
+    parser.add_argument("--saida", default="pontuacoes", help="pasta dos CSVs pontuados")
+    parser.add_argument("--modelo", default="random_forest_otimizado",
+                        help="modelo salvo a usar (logistica, random_forest, random_forest_otimizado, "
+                             "hist_gradient_boosting, logistica_hash)")
+    parser.add_argument("--tamanho-bloco", type=int, default=TAMANHO_BLOCO, help="bytes de CSV por bloco")
+    args = parser.parse_args()
+
+    pacote = carregar_modelos()
+    if args.modelo not in pacote["modelos"]:
+        parser.error(f"modelo '{args.modelo}' não está no pacote ({', '.join(pacote['modelos'])})")
+    modelo = pacote["modelos"][args.modelo]
+    if "n_jobs" in modelo.get_params():
+        modelo.set_params(n_jobs=numero_processos())
+    print(f"📦 Modelo '{args.modelo}' treinado em {pacote['metadados']['treinado_em']}")
+
+    os.makedirs(args.saida, exist_ok=True)
+    total_linhas, total_segundos = 0, 0.0
+    for caminho_arquivo in args.arquivos:
+        nome = os.path.splitext(os.path.basename(caminho_arquivo))[0]
+        destino = os.path.join(args.saida, f"{nome}_pontuado.csv")
+        linhas, segundos = pontuar_arquivo(caminho_arquivo, pacote, args.modelo, destino, args.tamanho_bloco)
+        total_linhas += linhas
+        total_segundos += segundos
+        print(f"✅ {caminho_arquivo}: {linhas} linhas em {segundos:.2f}s "
+              f"({linhas / max(segundos, 1e-9):,.0f} linhas/s) → {destino}")
+
+    print(f"\n⚡ Total: {total_linhas} linhas em {total_segundos:.2f}s "
+          f"({total_linhas / max(total_segundos, 1e-9):,.0f} linhas/s)")
@@ -0,0 +1,143 @@
+# recortes_prf.py
+# Agregados por recorte (UF ou BR) para os relatórios regionais. Uma única
+# passada em blocos sobre a base limpa (artefatos/base_limpa.arrow) acumula,
+# para todos os recortes ao mesmo tempo, as contagens e somas de que cada
+# relatório precisa. Cada relatório recebe só a sua fatia (algumas centenas
+# de linhas agregadas), nunca a base.
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from agregacao_prf import Agregados, resumo_boxplot
+from artefatos_prf import CAMINHO_ARTEFATOS, iterar_artefato
+from esquema_prf import DIAS_SEMANA
+from graficos_prf import boxplot_gravidade_fds, histograma_gravidade, pizza_mortos, serie_temporal_gravidade
+from ingestao_prf import LINHAS_POR_BLOCO
+
+BASE_LIMPA = "base_limpa"
+COLUNAS = ["ano", "mes", "dia_semana", "causa_acidente", "mortos", "feridos_graves", "gravidade"]
+FIM_DE_SEMANA = DIAS_SEMANA[5:]
+TOP_CAUSAS = 10
+
+
+def _grupos(por):
+    # Todos os grupos começam pelo recorte; o resto das chaves é o que cada
+    # tabela ou gráfico do relatório usa
+    return {
+        "anual": ([por, "ano"], "mortos"),
+        "anual_feridos": ([por, "ano"], "feridos_graves"),
+        "mensal": ([por, "ano", "mes"], "gravidade"),
+        "tipo_dia": ([por, "tipo_dia", "gravidade"], None),
+        "mortos_tipo_dia": ([por, "tipo_dia"], "mortos"),
+        "com_mortos": ([por, "com_mortos"], None),
+        "causas": ([por, "causa_acidente"], "gravidade"),
+    }
+
+
+# === Agregação ===
+def agregar_recortes(por, linhas_por_bloco=LINHAS_POR_BLOCO, pasta=CAMINHO_ARTEFATOS):
+    agregados = Agregados(grupos=_grupos(por))
+    for bloco in iterar_artefato(BASE_LIMPA, COLUNAS + [por], linhas_por_bloco, pasta):
+        bloco["tipo_dia"] = np.where(bloco["dia_semana"].isin(FIM_DE_SEMANA), "Fim de Semana", "Dia Útil")
+        bloco["com_mortos"] = bloco["mortos"] > 0
+        agregados.atualizar(bloco)
+    return agregados
+
+
+def fatiar(agregados):
+    # {recorte: {grupo: tabela do recorte, sem o nível do recorte}}
+    fatias = {}
+    for nome in agregados.grupos:
+        for recorte, parte in agregados.tabela(nome).groupby(level=0):
+            recorte = recorte.item() if isinstance(recorte, np.generic) else recorte
+            fatias.setdefault(recorte, {})[nome] = parte.droplevel(0)
+    return dict(sorted(fatias.items()))
+
+
+def fatia_total(agregados):
+    # A mesma estrutura de uma fatia, somando todos os recortes (o país)
+    total = {}
+    for nome in agregados.grupos:
+        tabela = agregados.tabela(nome)
+        total[nome] = tabela.groupby(level=list(range(1, tabela.index.nlevels))).sum()
+    return total
+
+
+def rotulo(por, recorte):
+    return f"BR-{int(recorte):03d}" if por == "br" else f"UF {recorte}"
+
+
+# === Resultados de uma fatia ===
+def resumo(fatia):
+    anual = fatia["anual"]
+    acidentes = int(anual["n"].sum())
+    mortos = int(anual["soma"].sum())
+    contagens = fatia["tipo_dia"]["n"].groupby(level="gravidade").sum()
+    gravidade = float((contagens.index.to_numpy(dtype=float) * contagens.to_numpy()).sum())
+    return {
+        "acidentes": acidentes,
+        "mortos": mortos,
+        "feridos_graves": int(fatia["anual_feridos"]["soma"].sum()),
+        "gravidade_media": gravidade / max(acidentes, 1),
+        "mortos_por_100": 100 * mortos / max(acidentes, 1),
+    }
+
+
+def teste_t_fim_de_semana(fatia):
+    # Welch a partir de n, soma e soma dos quadrados dos mortos por tipo de
+    # dia; None quando algum dos dois grupos tem menos de 2 acidentes
+    tabela = fatia["mortos_tipo_dia"]
+    if not {"Fim de Semana", "Dia Útil"} <= set(tabela.index) or (tabela["n"] < 2).any():
+        return None
+    media = tabela["soma"] / tabela["n"]
+    desvio = np.sqrt((tabela["soma_quadrados"] - tabela["n"] * media ** 2) / (tabela["n"] - 1))
+    return stats.ttest_ind_from_stats(
+        media["Fim de Semana"], desvio["Fim de Semana"], tabela.loc["Fim de Semana", "n"],
+        media["Dia Útil"], desvio["Dia Útil"], tabela.loc["Dia Útil", "n"],
+        equal_var=False,
+    )
+
+
+def tabela_anual(fatia):
+    anual = fatia["anual"]
+    return pd.DataFrame({
+        "acidentes": anual["n"],
+        "mortos": anual["soma"],
+        "feridos_graves": fatia["anual_feridos"]["soma"],
+    }).sort_index()
+
+
+def principais_causas(fatia, top=TOP_CAUSAS):
+    causas = fatia["causas"]
+    causas = causas[causas["n"] > 0]
+    return pd.DataFrame({
+        "acidentes": causas["n"],
+        "gravidade_media": causas["soma"] / causas["n"],
+    }).sort_values("acidentes", ascending=False, kind="stable").head(top)
+
+
+def graficos_fatia(fatia):
+    # {arquivo: (funcao, dados)} para graficos_prf.renderizar, com as mesmas
+    # funções de desenho do relatório nacional
+    graficos = {}
+    contagem_tipo_dia = fatia["tipo_dia"]["n"]
+    contagem_gravidade = contagem_tipo_dia.groupby(level="gravidade").sum().sort_index()
+    graficos["histograma_gravidade.png"] = (histograma_gravidade, {
+        "valores": contagem_gravidade.index.to_numpy(dtype=float), "contagens": contagem_gravidade.to_numpy(),
+    })
+    resumos = [
+        resumo_boxplot(contagens.index.get_level_values("gravidade"), contagens.to_numpy(), tipo_dia)
+        for tipo_dia, contagens in contagem_tipo_dia.groupby(level="tipo_dia", sort=True)
+    ]
+    graficos["boxplot_gravidade_fds.png"] = (boxplot_gravidade_fds, {"resumos": resumos})
+
+    mensal = fatia["mensal"]["soma"].rename("gravidade").reset_index().sort_values(["ano", "mes"])
+    mensal["data"] = pd.to_datetime(mensal.rename(columns={"ano": "year", "mes": "month"}).assign(day=1)[["year", "month", "day"]])
+    graficos["serie_temporal_gravidade.png"] = (serie_temporal_gravidade, {"mensal": mensal[["data", "gravidade"]]})
+
+    com_mortos = fatia["com_mortos"]["n"]
+    graficos["pizza_mortos.png"] = (pizza_mortos, {
+        "mortos": int(com_mortos.get(True, 0)), "sem_mortos": int(com_mortos.get(False, 0)),
+    })
+    return graficos
@@ -0,0 +1,258 @@
+# testes_prf.py
+# Testes de hipótese por grupo, vetorizados: em vez de chamar o scipy.stats
+# uma vez por grupo (UF × ano, BR...), os momentos de todos os grupos saem de
+# uma passada de bincount, o teste t de Welch e o teste de normalidade de
+# D'Agostino-Pearson são calculados sobre esses momentos em arrays, e o
+# bootstrap sorteia todas as reamostras de todos os grupos em lote.
+#
+# A entrada pode ser a base (uma linha por acidente) ou uma tabela de
+# contagens (coluna "n": quantas linhas têm aquela combinação), como as de
+# agregacao_prf. Com contagens, a reamostragem de um grupo é um sorteio
+# multinomial sobre os seus valores distintos, equivalente a sortear índices
+# de linhas, e o custo não depende do número de acidentes.
+
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy import special
+
+REAMOSTRAS = 1000
+NIVEL = 0.95
+CORRECOES = ["bh", "holm", "bonferroni", "nenhuma"]
+MAX_ELEMENTOS_LOTE = 1 << 22             # elementos sorteados por lote de reamostras (limita a memória)
+MAX_VALORES_MULTINOMIAL = 256            # acima disso (por grupo) o bootstrap sorteia índices de linhas
+MIN_LINHAS_NORMALIDADE = 20              # abaixo disso o teste de curtose não vale (como no scipy)
+
+
+# === Momentos por grupo ===
+def momentos(codigos, valores, pesos, n_grupos):
+    # n, média, variância (amostral) e os coeficientes de assimetria e de
+    # curtose calculados com os momentos centrais divididos por n (os mesmos
+    # do stats.normaltest) por grupo. As potências são somadas em torno da
+    # média geral, para não perder precisão com valores grandes.
+    valores = np.asarray(valores, dtype=np.float64)
+    pesos = np.asarray(pesos, dtype=np.float64)
+    centro = np.average(valores, weights=pesos) if pesos.sum() > 0 else 0.0
+    x = valores - centro
+    somas = [np.bincount(codigos, weights=pesos * x ** k, minlength=n_grupos) for k in range(5)]
+    n = somas[0]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        m = somas[1] / n                                 # média deslocada
+        m2 = somas[2] / n - m ** 2
+        m3 = somas[3] / n - 3 * m * somas[2] / n + 2 * m ** 3
+        m4 = somas[4] / n - 4 * m * somas[3] / n + 6 * m ** 2 * somas[2] / n - 3 * m ** 4
+        m2 = np.maximum(m2, 0.0)
+        constante = m2 <= 1e-12 * np.maximum(1.0, (m + centro) ** 2)
+        return pd.DataFrame({
+            "n": n,
+            "media": m + centro,
+            "variancia": m2 * n / (n - 1),
+            "assimetria": np.where(constante, np.nan, m3 / m2 ** 1.5),
+            "curtose": np.where(constante, np.nan, m4 / m2 ** 2),   # de Pearson (normal = 3)
+        })
+
+
+# === Testes a partir dos momentos ===
+def welch(n_a, media_a, var_a, n_b, media_b, var_b):
+    # Teste t de Welch bicaudal, grupo a grupo (igual a ttest_ind_from_stats
+    # com equal_var=False); NaN onde um dos lados tem menos de 2 linhas
+    with np.errstate(invalid="ignore", divide="ignore"):
+        erro_a, erro_b = var_a / n_a, var_b / n_b
+        erro = erro_a + erro_b
+        t = (media_a - media_b) / np.sqrt(erro)
+        gl = erro ** 2 / (erro_a ** 2 / (n_a - 1) + erro_b ** 2 / (n_b - 1))
+        validos = (n_a >= 2) & (n_b >= 2) & (erro > 0)
+        t, gl = np.where(validos, t, np.nan), np.where(validos, gl, np.nan)
+        p = 2 * special.stdtr(gl, -np.abs(t))
+    return t, gl, p
+
+
+def normalidade(n, assimetria, curtose):
+    # D'Agostino-Pearson (K² = Z_assimetria² + Z_curtose², como stats.normaltest),
+    # vetorizado sobre os grupos; NaN com menos de MIN_LINHAS_NORMALIDADE linhas
+    n = np.asarray(n, dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Assimetria
+        y = assimetria * np.sqrt((n + 1) * (n + 3) / (6.0 * (n - 2)))
+        beta2 = 3.0 * (n ** 2 + 27 * n - 70) * (n + 1) * (n + 3) / ((n - 2.0) * (n + 5) * (n + 7) * (n + 9))
+        w2 = -1 + np.sqrt(2 * (beta2 - 1))
+        delta = 1 / np.sqrt(0.5 * np.log(w2))
+        alfa = np.sqrt(2.0 / (w2 - 1))
+        y = np.where(y == 0, 1, y)
+        z_assimetria = delta * np.log(y / alfa + np.sqrt((y / alfa) ** 2 + 1))
+
+        # Curtose
+        esperada = 3.0 * (n - 1) / (n + 1)
+        variancia = 24.0 * n * (n - 2) * (n - 3) / ((n + 1) * (n + 1.0) * (n + 3) * (n + 5))
+        x = (curtose - esperada) / np.sqrt(variancia)
+        raiz_beta1 = 6.0 * (n * n - 5 * n + 2) / ((n + 7) * (n + 9)) * np.sqrt(6.0 * (n + 3) * (n + 5) / (n * (n - 2) * (n - 3)))
+        a = 6.0 + 8.0 / raiz_beta1 * (2.0 / raiz_beta1 + np.sqrt(1 + 4.0 / raiz_beta1 ** 2))
+        termo1 = 1 - 2 / (9.0 * a)
+        denominador = 1 + x * np.sqrt(2 / (a - 4.0))
+        termo2 = np.sign(denominador) * np.where(denominador == 0.0, np.nan,
+                                                 ((1 - 2.0 / a) / np.abs(denominador)) ** (1 / 3.0))
+        z_curtose = (termo1 - termo2) / np.sqrt(2 / (9.0 * a))
+
+        k2 = z_assimetria ** 2 + z_curtose ** 2
+        k2 = np.where(n >= MIN_LINHAS_NORMALIDADE, k2, np.nan)
+    return k2, special.chdtrc(2, k2)
+
+
+def corrigir_pvalores(p, metodo="bh"):
+    # Correção para múltiplos testes sobre todos os p-valores não nulos:
+    # Benjamini-Hochberg (taxa de falsas descobertas), Holm ou Bonferroni
+    # (erro por família). NaN continua NaN e não conta como teste.
+    p = np.asarray(p, dtype=np.float64)
+    ajustado = np.full_like(p, np.nan)
+    validos = np.flatnonzero(~np.isnan(p))
+    m = len(validos)
+    if m == 0 or metodo == "nenhuma":
+        ajustado[validos] = p[validos]
+        return ajustado
+    if metodo == "bonferroni":
+        ajustado[validos] = np.minimum(p[validos] * m, 1.0)
+        return ajustado
+
+    ordem = validos[np.argsort(p[validos], kind="stable")]
+    ordenados = p[ordem]
+    posicao = np.arange(1, m + 1)
+    if metodo == "bh":
+        # p(i) * m / i, tornado monótono de trás para frente
+        valores = np.minimum.accumulate((ordenados * m / posicao)[::-1])[::-1]
+    elif metodo == "holm":
+        valores = np.maximum.accumulate(ordenados * (m - posicao + 1))
+    else:
+        raise ValueError(f"Correção desconhecida: {metodo} (use {', '.join(CORRECOES)})")
+    ajustado[ordem] = np.minimum(valores, 1.0)
+    return ajustado
+
+
+# === Bootstrap em lote ===
+def _medias_multinomial(celulas, valores, pesos, n_celulas, reamostras, rng):
+    # Cada célula vira uma linha de probabilidades sobre os seus valores
+    # distintos (preenchida com zeros até o maior número de valores); um único
+    # multinomial sorteia as contagens de todas as reamostras e células
+    ordem = np.argsort(celulas, kind="stable")
+    celulas, valores, pesos = celulas[ordem], valores[ordem], pesos[ordem]
+    inicio = np.searchsorted(celulas, np.arange(n_celulas))
+    coluna = np.arange(len(celulas)) - inicio[celulas]
+    largura = int(coluna.max()) + 1
+    matriz_valores = np.zeros((n_celulas, largura))
+    matriz_pesos = np.zeros((n_celulas, largura))
+    matriz_valores[celulas, coluna] = valores
+    matriz_pesos[celulas, coluna] = pesos
+    n = matriz_pesos.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        probabilidades = np.where(n[:, None] > 0, matriz_pesos / n[:, None], 0.0)
+    probabilidades[n == 0, 0] = 1.0                       # célula vazia: sorteia 0 de um valor qualquer
+    n_inteiro = np.rint(n).astype(np.int64)
+
+    medias = np.empty((reamostras, n_celulas))
+    lote = max(1, MAX_ELEMENTOS_LOTE // (n_celulas * largura))
+    for inicio_lote in range(0, reamostras, lote):
+        tamanho = min(lote, reamostras - inicio_lote)
+        contagens = rng.multinomial(n_inteiro, probabilidades, size=(tamanho, n_celulas))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            medias[inicio_lote:inicio_lote + tamanho] = (contagens * matriz_valores).sum(axis=2) / n
+    return medias
+
+
+def _medias_indices(celulas, valores, n_celulas, reamostras, rng):
+    # Uma linha por observação: cada reamostra sorteia, para cada posição de
+    # cada célula, um índice de linha da mesma célula; as somas por célula
+    # saem de um reduceat sobre a matriz (reamostras do lote × linhas)
+    ordem = np.argsort(celulas, kind="stable")
+    celulas, valores = celulas[ordem], valores[ordem]
+    tamanhos = np.bincount(celulas, minlength=n_celulas)
+    inicio = np.concatenate([[0], np.cumsum(tamanhos)[:-1]])
+    presentes = np.flatnonzero(tamanhos)
+    base, tamanho_linha = inicio[celulas], tamanhos[celulas]
+
+    medias = np.full((reamostras, n_celulas), np.nan)
+    lote = max(1, MAX_ELEMENTOS_LOTE // max(len(valores), 1))
+    for inicio_lote in range(0, reamostras, lote):
+        tamanho = min(lote, reamostras - inicio_lote)
+        indices = base + (rng.random((tamanho, len(valores))) * tamanho_linha).astype(np.int64)
+        somas = np.add.reduceat(valores[indices], inicio[presentes], axis=1)
+        medias[inicio_lote:inicio_lote + tamanho, presentes] = somas / tamanhos[presentes]
+    return medias
+
+
+def medias_bootstrap(celulas, valores, pesos, n_celulas, reamostras=REAMOSTRAS, semente=42):
+    # Matriz (reamostras × células) com a média de cada reamostra de cada
+    # célula. Tabelas de contagens (poucos valores distintos por célula) usam
+    # o sorteio multinomial; dados linha a linha, índices sorteados em lote.
+    # As linhas são antes reduzidas a pares (célula, valor) com os pesos
+    # somados: uma tabela com chaves extras (ex.: município) repete o mesmo
+    # valor em várias linhas da célula, e o que decide o caminho é o número
+    # de valores distintos, não de linhas.
+    rng = np.random.default_rng(semente)
+    celulas = np.asarray(celulas, dtype=np.int64)
+    valores = np.asarray(valores, dtype=np.float64)
+    pesos = np.asarray(pesos, dtype=np.float64)
+    unicos, codigos_valor = np.unique(valores, return_inverse=True)
+    pares, por_par = np.unique(celulas * len(unicos) + codigos_valor, return_inverse=True)
+    celulas_pares = pares // max(len(unicos), 1)
+    distintos = np.bincount(celulas_pares, minlength=n_celulas).max() if len(pares) else 0
+    if distintos <= MAX_VALORES_MULTINOMIAL:
+        pesos_pares = np.bincount(por_par, weights=pesos, minlength=len(pares))
+        valores_pares = unicos[pares % max(len(unicos), 1)]
+        return _medias_multinomial(celulas_pares, valores_pares, pesos_pares, n_celulas, reamostras, rng)
+    if not np.all(pesos == 1):
+        raise ValueError("Bootstrap por índices exige uma linha por observação (pesos iguais a 1)")
+    return _medias_indices(celulas, valores, n_celulas, reamostras, rng)
+
+
+# === Comparação de dois lados em cada grupo ===
+def comparar_lados(tabela, chaves, lado, valor, a, b, rotulos=None, reamostras=REAMOSTRAS, nivel=NIVEL,
+                   correcao="bh", semente=42):
+    # Para cada grupo definido por `chaves`, compara a média de `valor` entre
+    # as linhas com lado == a e lado == b: teste t de Welch, IC bootstrap
+    # (percentil) da diferença a - b, normalidade de `valor` no grupo e
+    # p-valor corrigido para o número de grupos testados. `tabela` tem uma
+    # linha por observação ou uma coluna "n" com as contagens. Devolve uma
+    # linha por grupo (tabela "tidy"); `rotulos` nomeia os lados nas colunas.
+    rotulo_a, rotulo_b = rotulos or (a, b)
+    if correcao not in CORRECOES:
+        raise ValueError(f"Correção desconhecida: {correcao} (use {', '.join(CORRECOES)})")
+    tabela = tabela[tabela[lado].isin([a, b]) & tabela[valor].notna() & tabela[chaves].notna().all(axis=1)]
+    if "n" in tabela.columns:
+        tabela = tabela[tabela["n"] > 0]
+    pesos = tabela["n"].to_numpy(dtype=np.float64) if "n" in tabela.columns else np.ones(len(tabela))
+    agrupado = tabela.groupby(chaves, sort=True, observed=True)
+    codigos = agrupado.ngroup().to_numpy()
+    grupos = agrupado.size().index
+    n_grupos = len(grupos)
+    celulas = codigos * 2 + (tabela[lado] == b).to_numpy()
+    valores = tabela[valor].to_numpy(dtype=np.float64)
+
+    por_lado = momentos(celulas, valores, pesos, 2 * n_grupos)
+    lado_a, lado_b = por_lado.iloc[0::2].reset_index(drop=True), por_lado.iloc[1::2].reset_index(drop=True)
+    t, gl, p = welch(lado_a["n"], lado_a["media"], lado_a["variancia"], lado_b["n"], lado_b["media"], lado_b["variancia"])
+    grupo = momentos(codigos, valores, pesos, n_grupos)
+    k2, p_normalidade = normalidade(grupo["n"], grupo["assimetria"], grupo["curtose"])
+
+    medias = medias_bootstrap(celulas, valores, pesos, 2 * n_grupos, reamostras, semente)
+    diferencas = medias[:, 0::2] - medias[:, 1::2]
+    cauda = (1 - nivel) / 2
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)     # grupos sem um dos lados: IC nulo
+        ic = np.nanquantile(diferencas, [cauda, 1 - cauda], axis=0) if reamostras else np.full((2, n_grupos), np.nan)
+
+    resultado = grupos.to_frame(index=False)
+    resultado[f"n_{rotulo_a}"] = lado_a["n"].astype(np.int64)
+    resultado[f"n_{rotulo_b}"] = lado_b["n"].astype(np.int64)
+    resultado[f"media_{rotulo_a}"] = lado_a["media"]
+    resultado[f"media_{rotulo_b}"] = lado_b["media"]
+    resultado["diferenca"] = lado_a["media"] - lado_b["media"]
+    resultado["ic_inferior"] = ic[0]
+    resultado["ic_superior"] = ic[1]
+    resultado["t"] = t
+    resultado["gl"] = gl
+    resultado["p_valor"] = p
+    resultado["p_ajustado"] = corrigir_pvalores(p, correcao)
+    resultado["significativo"] = resultado["p_ajustado"] < 1 - nivel
+    resultado["k2_normalidade"] = k2
+    resultado["p_normalidade"] = p_normalidade
+    return resultado
@@ -0,0 +1,213 @@
+# trechos_prf.py
+# Trechos críticos das rodovias: em vez de ordenar BRs inteiras, percorre
+# cada BR com janelas deslizantes de km (ex.: 1 km a cada 100 m) e soma
+# acidentes, mortos, feridos graves e gravidade em cada janela. Os acidentes
+# são ordenados uma vez por (BR, km); a contagem e as somas de todas as
+# janelas de todas as BRs saem de searchsorted + somas acumuladas, sem laço
+# por janela. O resultado (os melhores trechos de cada BR, no país e em cada
+# ano) vai para resultados/trechos_criticos.csv, lido pelo dashboard e pelos
+# relatórios. Ao lado dele, trechos_criticos.json guarda a versão de cada ano
+# e os parâmetros usados: enquanto nada disso muda, o CSV é reaproveitado.
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from ingestao_prf import CAMINHO_CACHE, CAMINHO_DADOS, LINHAS_POR_BLOCO, anos_em_cache, iterar_blocos
+
+JANELA_KM = 1.0
+PASSO_KM = 0.1
+TOP_POR_BR = 10                          # trechos guardados por BR (e por ano)
+ARQUIVO_TRECHOS = os.path.join("resultados", "trechos_criticos.csv")
+COLUNAS = ["ano", "br", "km", "mortos", "feridos_graves", "gravidade"]
+MEDIDAS = ["mortos", "feridos_graves", "gravidade"]
+METROS_POR_KM = 1000                     # posições em metros inteiros: a grade de janelas é exata
+DESLOCAMENTO_BR = 10 ** 8                # chave (BR, km) = br * DESLOCAMENTO_BR + metros
+
+
+# === Leitura ===
+def ler_posicoes(linhas_por_bloco=LINHAS_POR_BLOCO, caminho=CAMINHO_DADOS, cache=CAMINHO_CACHE):
+    # Só as colunas numéricas de que as janelas precisam, bloco a bloco;
+    # acidentes sem BR ou km (ou com km negativo) ficam de fora
+    partes = {coluna: [] for coluna in ["ano", "br", "metros"] + MEDIDAS}
+    for bloco in iterar_blocos(COLUNAS, linhas_por_bloco, caminho, cache):
+        km = bloco["km"].to_numpy(dtype=float, na_value=np.nan)
+        br = bloco["br"].to_numpy(dtype=float, na_value=np.nan)
+        validos = ~np.isnan(br) & (km >= 0)
+        partes["ano"].append(bloco["ano"].to_numpy()[validos].astype(np.int16))
+        partes["br"].append(br[validos].astype(np.int16))
+        partes["metros"].append(np.rint(km[validos] * METROS_POR_KM).astype(np.int64))
+        for medida in MEDIDAS:
+            partes[medida].append(bloco[medida].to_numpy()[validos].astype(np.int32))
+    return {coluna: np.concatenate(valores) if valores else np.empty(0, np.int64) for coluna, valores in partes.items()}
+
+
+# === Janelas ===
+def janelas(br, metros, medidas, janela_km=JANELA_KM, passo_km=PASSO_KM):
+    # Todas as janelas [início, início + janela) da grade de passo `passo_km`
+    # que contêm algum acidente, em todas as BRs de uma vez
+    janela, passo = round(janela_km * METROS_POR_KM), round(passo_km * METROS_POR_KM)
+    colunas = ["br", "km_inicial", "km_final", "acidentes"] + list(medidas)
+    if not len(br):
+        return pd.DataFrame(columns=colunas)
+    ordem = np.lexsort((metros, br))
+    br, metros = br[ordem], metros[ordem]
+    chave = br.astype(np.int64) * DESLOCAMENTO_BR + metros
+
+    # Janelas que contêm cada acidente: as que começam em (km - janela, km].
+    # Com os acidentes em ordem, cada um só acrescenta as janelas que o
+    # anterior da mesma BR ainda não tinha gerado, então só as janelas
+    # ocupadas são enumeradas (nunca os trechos vazios da rodovia).
+    k_ultimo = metros // passo
+    k_primeiro = np.maximum((metros - janela) // passo + 1, 0)
+    nova_br = np.r_[True, br[1:] != br[:-1]]
+    k_primeiro = np.where(nova_br, k_primeiro, np.maximum(k_primeiro, np.r_[-1, k_ultimo[:-1]] + 1))
+    n = np.maximum(k_ultimo - k_primeiro + 1, 0)
+    origem = np.repeat(np.arange(len(br)), n)
+    inicio = (np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n) + k_primeiro[origem]) * passo
+    rodovia = br[origem]
+
+    base = rodovia.astype(np.int64) * DESLOCAMENTO_BR + inicio
+    de = np.searchsorted(chave, base, "left")
+    ate = np.searchsorted(chave, base + janela, "left")
+
+    resultado = {
+        "br": rodovia,
+        "km_inicial": inicio / METROS_POR_KM,
+        "km_final": (inicio + janela) / METROS_POR_KM,
+        "acidentes": (ate - de).astype(np.int64),
+    }
+    for medida, valores in medidas.items():
+        acumulado = np.concatenate([[0], np.cumsum(valores[ordem], dtype=np.int64)])
+        resultado[medida] = acumulado[ate] - acumulado[de]
+    return pd.DataFrame(resultado, columns=colunas)
+
+
+def melhores_trechos(tabela, top=TOP_POR_BR, janela_km=JANELA_KM):
+    # Os `top` trechos mais graves de cada BR (gravidade, depois acidentes),
+    # sem sobreposição: janelas vizinhas de um mesmo trecho ficam de fora.
+    # Cada escolhida descarta no máximo 2 × janela/passo candidatas, então o
+    # laço percorre poucas linhas por BR.
+    if tabela.empty:
+        return tabela.assign(posicao=pd.Series(dtype=np.int64))
+    br = tabela["br"].to_numpy()
+    inicio = tabela["km_inicial"].to_numpy()
+    ordem = np.lexsort((-tabela["acidentes"].to_numpy(), -tabela["gravidade"].to_numpy(), br))
+    limites = np.flatnonzero(np.diff(br[ordem])) + 1
+    escolhidas, posicoes = [], []
+    for candidatas in np.split(ordem, limites):
+        inicios = []
+        for linha in candidatas:
+            if all(abs(inicio[linha] - outro) >= janela_km - 1e-9 for outro in inicios):
+                inicios.append(inicio[linha])
+                escolhidas.append(linha)
+                posicoes.append(len(inicios))
+                if len(inicios) == top:
+                    break
+    return tabela.iloc[escolhidas].assign(posicao=posicoes).reset_index(drop=True)
+
+
+def trechos_criticos(janela_km=JANELA_KM, passo_km=PASSO_KM, top=TOP_POR_BR, linhas_por_bloco=LINHAS_POR_BLOCO,
+                     caminho=CAMINHO_DADOS, cache=CAMINHO_CACHE):
+    # Melhores trechos de cada BR considerando todos os anos ("nacional") e
+    # em cada ano ("anual"). Os anos são processados um por vez para limitar
+    # a memória das janelas.
+    posicoes = ler_posicoes(linhas_por_bloco, caminho, cache)
+    escopos = [("nacional", pd.NA, np.ones(len(posicoes["ano"]), dtype=bool))]
+    escopos += [("anual", int(ano), posicoes["ano"] == ano) for ano in np.unique(posicoes["ano"])]
+    partes = []
+    for escopo, ano, selecao in escopos:
+        tabela = janelas(posicoes["br"][selecao], posicoes["metros"][selecao],
+                         {medida: posicoes[medida][selecao] for medida in MEDIDAS}, janela_km, passo_km)
+        partes.append(melhores_trechos(tabela, top, janela_km).assign(escopo=escopo, ano=ano))
+    trechos = pd.concat(partes, ignore_index=True)
+    trechos["ano"] = trechos["ano"].astype("Int16")
+    return trechos[["escopo", "ano", "br", "posicao", "km_inicial", "km_final", "acidentes"] + MEDIDAS]
+
+
+# === Arquivo de resultados ===
+def _arquivo_chave(destino):
+    return f"{os.path.splitext(destino)[0]}.json"
+
+
+def chave_trechos(janela_km=JANELA_KM, passo_km=PASSO_KM, top=TOP_POR_BR, caminho=CAMINHO_DADOS,
+                  cache=CAMINHO_CACHE):
+    # Muda quando algum ano (CSV ou limpeza) ou os parâmetros das janelas mudam
+    anos = anos_em_cache(caminho, cache)
+    return {"anos": {str(ano): versao for ano, (_, versao) in sorted(anos.items())},
+            "janela_km": janela_km, "passo_km": passo_km, "top": top}
+
+
+def salvar_trechos(trechos, destino=ARQUIVO_TRECHOS, chave=None):
+    # chave: a de chave_trechos, gravada ao lado do CSV para ele ser reaproveitado
+    os.makedirs(os.path.dirname(destino) or ".", exist_ok=True)
+    trechos.to_csv(destino, index=False)
+    arquivo_chave = _arquivo_chave(destino)
+    if chave is None:
+        if os.path.exists(arquivo_chave):
+            os.remove(arquivo_chave)
+        return destino
+    with open(arquivo_chave + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(chave, f, indent=2)
+    os.replace(arquivo_chave + ".tmp", arquivo_chave)
+    return destino
+
+
+def carregar_trechos(destino=ARQUIVO_TRECHOS):
+    # None quando os trechos ainda não foram calculados
+    if not os.path.exists(destino):
+        return None
+    return pd.read_csv(destino, dtype={"escopo": str, "ano": "Int16", "br": "Int16"})
+
+
+def trechos_atualizados(janela_km=JANELA_KM, passo_km=PASSO_KM, top=TOP_POR_BR, linhas_por_bloco=LINHAS_POR_BLOCO,
+                        caminho=CAMINHO_DADOS, cache=CAMINHO_CACHE, destino=ARQUIVO_TRECHOS, recalcular=False):
+    # (trechos, recalculados): o CSV salvo quando foi gerado com os mesmos
+    # anos e parâmetros; senão uma nova passada por toda a base, salva
+    chave = chave_trechos(janela_km, passo_km, top, caminho, cache)
+    if not recalcular and os.path.exists(destino):
+        try:
+            with open(_arquivo_chave(destino), "r", encoding="utf-8") as f:
+                atual = json.load(f) == chave
+        except (OSError, ValueError):
+            atual = False
+        if atual:
+            return carregar_trechos(destino), False
+    trechos = trechos_criticos(janela_km, passo_km, top, linhas_por_bloco, caminho, cache)
+    salvar_trechos(trechos, destino, chave)
+    return trechos, True
+
+
+def ranking(trechos, ano=None, br=None, top=10):
+    # Trechos mais graves do país (ano=None: todos os anos) ou de um ano,
+    # opcionalmente de uma só BR. Como os trechos não se sobrepõem dentro de
+    # cada BR, os `top` do país estão entre os `top` de cada BR.
+    selecao = trechos["escopo"].eq("nacional") if ano is None else trechos["ano"].eq(ano).fillna(False)
+    if br is not None:
+        selecao &= trechos["br"].eq(int(br))
+    return trechos[selecao].sort_values(["gravidade", "acidentes"], ascending=False, kind="stable").head(top)
+
+
+def rotulo_trecho(linha):
+    return f"BR-{int(linha.br):03d} km {linha.km_inicial:.1f}-{linha.km_final:.1f}".replace(".", ",")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trechos críticos (BR + km) por janelas deslizantes")
+    parser.add_argument("--janela-km", type=float, default=JANELA_KM, help="comprimento de cada trecho")
+    parser.add_argument("--passo-km", type=float, default=PASSO_KM, help="deslocamento entre janelas")
+    parser.add_argument("--top-por-br", type=int, default=TOP_POR_BR, help="trechos guardados por BR e por ano")
+    parser.add_argument("--saida", default=ARQUIVO_TRECHOS)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    trechos, _ = trechos_atualizados(args.janela_km, args.passo_km, args.top_por_br, destino=args.saida,
+                                     recalcular=True)
+    print(f"✅ Trechos críticos salvos em '{args.saida}' ({time.perf_counter() - inicio:.1f} s)")
+    print("\nTop 10 Trechos mais graves (todos os anos):")
+    for linha in ranking(trechos).itertuples():
+        print(f"{rotulo_trecho(linha)}: {linha.acidentes} acidentes, gravidade {linha.gravidade}")
@@ -0,0 +1,177 @@
+# treino_prf.py
+# Motor de treino dos modelos: um único conjunto de dobras estratificadas é
+# compartilhado por todos os modelos e pela busca de hiperparâmetros, dobras e
+# candidatos rodam em paralelo (PRF_PROCESSOS), a busca pode ser exaustiva,
+# por halving sucessivo ou limitada por tempo, e bases muito grandes são
+# treinadas numa subamostra estratificada, com a curva de aprendizado dela.
+
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (habilita HalvingGridSearchCV)
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import (GridSearchCV, HalvingGridSearchCV, ParameterGrid, StratifiedKFold,
+                                     cross_validate, train_test_split)
+
+from ingestao_prf import numero_processos
+
+MODOS_BUSCA = ["grade", "halving", "tempo"]
+MAX_LINHAS_TREINO = 2_000_000
+FRACOES_CURVA = (0.25, 0.5, 1.0)
+
+
+# === Dobras ===
+class Dobras:
+    # Dobras estratificadas calculadas uma vez e reutilizadas por todos os
+    # modelos; `divisor` (mesma semente) é usado onde o scikit-learn precisa
+    # redividir subconjuntos, como no halving
+    def __init__(self, X, y, n_dobras=5, semente=42):
+        self.divisor = StratifiedKFold(n_splits=n_dobras, shuffle=True, random_state=semente)
+        self.indices = list(self.divisor.split(X, y))
+
+    def __len__(self):
+        return len(self.indices)
+
+
+def _serial(modelo):
+    # Com dobras/candidatos em paralelo, o modelo roda num núcleo só
+    # (evita processos x threads além do número de núcleos). A
+    # LogisticRegression fica de fora: nela n_jobs não tem efeito desde o
+    # scikit-learn 1.8 e só gera FutureWarning a cada ajuste.
+    modelo = clone(modelo)
+    if "n_jobs" in modelo.get_params() and not isinstance(modelo, LogisticRegression):
+        modelo.set_params(n_jobs=1)
+    return modelo
+
+
+def validar(modelo, X, y, dobras, processos=None):
+    # Validação cruzada nas dobras compartilhadas, dobras em paralelo
+    resultado = cross_validate(_serial(modelo), X, y, cv=dobras.indices, scoring="accuracy",
+                               n_jobs=numero_processos(processos))
+    return resultado["test_score"]
+
+
+# === Subamostra ===
+def subamostra_estratificada(X, y, max_linhas=MAX_LINHAS_TREINO, semente=42):
+    # Devolve (X, y, reduzida); a proporção das classes é mantida
+    if len(X) <= max_linhas:
+        return X, y, False
+    X_sub, _, y_sub, _ = train_test_split(X, y, train_size=max_linhas, stratify=y, random_state=semente)
+    return X_sub, y_sub, True
+
+
+def curva_subamostra(modelo, X, y, X_teste, y_teste, fracoes=FRACOES_CURVA, semente=42):
+    # Curva de aprendizado no conjunto de teste: acurácia treinando com
+    # frações crescentes da (sub)amostra. O ganho entre os dois últimos
+    # pontos mostra se a curva ainda sobe ao dobrar os dados; a acurácia
+    # perdida em relação à base inteira sai de custo_subamostra.
+    linhas = []
+    for fracao in fracoes:
+        if fracao < 1:
+            X_f, _, y_f, _ = train_test_split(X, y, train_size=fracao, stratify=y, random_state=semente)
+        else:
+            X_f, y_f = X, y
+        inicio = time.perf_counter()
+        ajustado = clone(modelo).fit(X_f, y_f)
+        tempo = time.perf_counter() - inicio
+        linhas.append({"linhas": len(X_f), "acuracia": accuracy_score(y_teste, ajustado.predict(X_teste)),
+                       "tempo_ajuste_s": tempo})
+    return pd.DataFrame(linhas)
+
+
+def custo_subamostra(modelo, X_sub, y_sub, X, y, X_teste, y_teste):
+    # Custo de treinar na subamostra: o mesmo modelo ajustado nela e em todas
+    # as linhas de treino, avaliados no mesmo conjunto de teste. custo > 0 é a
+    # acurácia que a subamostra deixou de ganhar.
+    resultado = {}
+    for nome, (X_f, y_f) in {"subamostra": (X_sub, y_sub), "completo": (X, y)}.items():
+        inicio = time.perf_counter()
+        ajustado = clone(modelo).fit(X_f, y_f)
+        resultado[f"tempo_{nome}_s"] = time.perf_counter() - inicio
+        resultado[f"acuracia_{nome}"] = accuracy_score(y_teste, ajustado.predict(X_teste))
+    resultado["custo"] = resultado["acuracia_completo"] - resultado["acuracia_subamostra"]
+    return resultado
+
+
+# === Busca de hiperparâmetros ===
+class BuscaPorTempo:
+    # Avalia candidatos da grade em ordem aleatória até esgotar o orçamento
+    # (segundos); cada candidato é validado nas dobras em paralelo. A
+    # interface imita a do GridSearchCV (best_params_, best_estimator_,
+    # cv_results_).
+    def __init__(self, estimador, grade, dobras, orcamento_s=60, processos=None, semente=42):
+        self.estimador = estimador
+        self.grade = grade
+        self.dobras = dobras
+        self.orcamento_s = orcamento_s
+        self.processos = processos
+        self.semente = semente
+
+    def fit(self, X, y):
+        candidatos = list(ParameterGrid(self.grade))
+        np.random.default_rng(self.semente).shuffle(candidatos)
+        resultados = {"params": [], "mean_fit_time": [], "mean_test_score": [], "std_test_score": []}
+        inicio = time.perf_counter()
+        for params in candidatos:
+            if resultados["params"] and time.perf_counter() - inicio > self.orcamento_s:
+                break
+            avaliacao = cross_validate(_serial(self.estimador).set_params(**params), X, y, cv=self.dobras.indices,
+                                       scoring="accuracy", n_jobs=numero_processos(self.processos))
+            resultados["params"].append(params)
+            resultados["mean_fit_time"].append(avaliacao["fit_time"].mean())
+            resultados["mean_test_score"].append(avaliacao["test_score"].mean())
+            resultados["std_test_score"].append(avaliacao["test_score"].std())
+
+        self.cv_results_ = {chave: np.asarray(valor) if chave != "params" else valor
+                            for chave, valor in resultados.items()}
+        self.n_candidatos_ = len(candidatos)
+        melhor = int(np.argmax(self.cv_results_["mean_test_score"]))
+        self.best_params_ = self.cv_results_["params"][melhor]
+        self.best_score_ = self.cv_results_["mean_test_score"][melhor]
+        self.best_estimator_ = clone(self.estimador).set_params(**self.best_params_).fit(X, y)
+        return self
+
+
+def buscar(estimador, grade, X, y, dobras, modo="halving", orcamento_s=60, processos=None):
+    # Candidatos em paralelo nas dobras compartilhadas
+    n_jobs = numero_processos(processos)
+    if modo == "grade":
+        busca = GridSearchCV(_serial(estimador), grade, cv=dobras.indices, n_jobs=n_jobs)
+    elif modo == "halving":
+        # Halving sucessivo: todos os candidatos começam com poucas linhas e
+        # só o melhor terço de cada rodada recebe 3x mais dados
+        busca = HalvingGridSearchCV(_serial(estimador), grade, cv=dobras.divisor, factor=3,
+                                    random_state=42, n_jobs=n_jobs)
+    elif modo == "tempo":
+        busca = BuscaPorTempo(estimador, grade, dobras, orcamento_s, processos)
+    else:
+        raise ValueError(f"Modo de busca desconhecido: {modo} (use {', '.join(MODOS_BUSCA)})")
+    return busca.fit(X, y)
+
+
+def descrever_busca(modo, n_dobras, orcamento_s=60):
+    # Frase para os relatórios sobre a busca que de fato rodou
+    if modo == "grade":
+        return f"Busca exaustiva em grade (GridSearchCV): todos os candidatos avaliados nas {n_dobras} dobras."
+    if modo == "halving":
+        return ("Busca por halving sucessivo (HalvingGridSearchCV): todos os candidatos começam com poucas linhas "
+                f"e só o melhor terço de cada rodada recebe 3x mais dados ({n_dobras} dobras).")
+    return (f"Busca limitada por tempo: candidatos da grade em ordem aleatória, cada um validado nas {n_dobras} "
+            f"dobras, até esgotar o orçamento de {orcamento_s:.0f} s.")
+
+
+def tabela_tempos(busca):
+    # Tempo médio de ajuste e acurácia de cada candidato avaliado (no halving,
+    # uma linha por candidato e rodada, com o número de linhas usadas)
+    resultados = busca.cv_results_
+    tabela = pd.DataFrame({
+        "parametros": [str(p) for p in resultados["params"]],
+        "tempo_ajuste_s": resultados["mean_fit_time"],
+        "acuracia": resultados["mean_test_score"],
+    })
+    if "n_resources" in resultados:
+        tabela.insert(1, "linhas", resultados["n_resources"])
+    return tabela